@@ -0,0 +1,8 @@
+INSERT INTO arm (
+    junction_id, direction, vehicles_per_hour, exit_north, exit_east, exit_south, exit_west,
+    left_right_lane, left_right_straight_lane, left_lane_count, right_lane_count,
+    straight_right_lane_count, straight_left_lane_count, straight_lane_count, priority, buses_per_hour
+) VALUES (
+    ?, ?, ?, ?, ?, ?, ?,
+    ?, ?, ?, ?, ?, ?, ?, ?, ?
+);
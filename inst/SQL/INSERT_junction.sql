@@ -0,0 +1,3 @@
+INSERT INTO junction (junction_id, has_pedestrian_crossing, crossing_requests_per_hour, crossing_duration) VALUES (
+    ?, ?, ?, ?
+);
@@ -0,0 +1,3 @@
+INSERT OR REPLACE INTO queue_series (junction_id, series) VALUES (
+    ?, ?
+);
@@ -0,0 +1,3 @@
+INSERT INTO simulation_job (job_id, payload) VALUES (
+    ?, ?
+);
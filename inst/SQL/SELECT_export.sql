@@ -0,0 +1,68 @@
+-- Every stored run with its junction configuration and traffic flows, oldest first
+-- (the columns are those of the former junction_config and traffic_flow_<arm> tables, see create_views.sql)
+SELECT
+    efficiency_score_table.junction_id,
+    efficiency_score_table.create_time,
+    efficiency_score_table.efficiency_score,
+    north.left_right_lane AS north_left_right_lane,
+    north.left_right_straight_lane AS north_left_right_straight_lane,
+    north.left_lane_count AS north_left_lane_count,
+    north.right_lane_count AS north_right_lane_count,
+    north.straight_right_lane_count AS north_straight_right_lane_count,
+    north.straight_left_lane_count AS north_straight_left_lane_count,
+    north.straight_lane_count AS north_straight_lane_count,
+    north.priority AS north_priority,
+    north.buses_per_hour AS north_buses_per_hour,
+    east.left_right_lane AS east_left_right_lane,
+    east.left_right_straight_lane AS east_left_right_straight_lane,
+    east.left_lane_count AS east_left_lane_count,
+    east.right_lane_count AS east_right_lane_count,
+    east.straight_right_lane_count AS east_straight_right_lane_count,
+    east.straight_left_lane_count AS east_straight_left_lane_count,
+    east.straight_lane_count AS east_straight_lane_count,
+    east.priority AS east_priority,
+    east.buses_per_hour AS east_buses_per_hour,
+    south.left_right_lane AS south_left_right_lane,
+    south.left_right_straight_lane AS south_left_right_straight_lane,
+    south.left_lane_count AS south_left_lane_count,
+    south.right_lane_count AS south_right_lane_count,
+    south.straight_right_lane_count AS south_straight_right_lane_count,
+    south.straight_left_lane_count AS south_straight_left_lane_count,
+    south.straight_lane_count AS south_straight_lane_count,
+    south.priority AS south_priority,
+    south.buses_per_hour AS south_buses_per_hour,
+    west.left_right_lane AS west_left_right_lane,
+    west.left_right_straight_lane AS west_left_right_straight_lane,
+    west.left_lane_count AS west_left_lane_count,
+    west.right_lane_count AS west_right_lane_count,
+    west.straight_right_lane_count AS west_straight_right_lane_count,
+    west.straight_left_lane_count AS west_straight_left_lane_count,
+    west.straight_lane_count AS west_straight_lane_count,
+    west.priority AS west_priority,
+    west.buses_per_hour AS west_buses_per_hour,
+    junction.has_pedestrian_crossing,
+    junction.crossing_requests_per_hour AS pedestrian_crossing_duration,
+    junction.crossing_duration AS crossing_requests_per_hour,
+    north.vehicles_per_hour AS north_vehicles_per_hour_enter_north,
+    north.exit_north AS north_vehicles_per_hour_exit_south,
+    north.exit_east AS north_vehicles_per_hour_exit_west,
+    north.exit_west AS north_vehicles_per_hour_exit_east,
+    east.vehicles_per_hour AS east_vehicles_per_hour_exit_north,
+    east.exit_north AS east_vehicles_per_hour_exit_south,
+    east.exit_east AS east_vehicles_per_hour_exit_west,
+    east.exit_south AS east_vehicles_per_hour_enter_east,
+    south.vehicles_per_hour AS south_vehicles_per_hour_exit_north,
+    south.exit_south AS south_vehicles_per_hour_enter_south,
+    south.exit_east AS south_vehicles_per_hour_exit_west,
+    south.exit_west AS south_vehicles_per_hour_exit_east,
+    west.vehicles_per_hour AS west_vehicles_per_hour_exit_north,
+    west.exit_west AS west_vehicles_per_hour_exit_south,
+    west.exit_north AS west_vehicles_per_hour_enter_west,
+    west.exit_south AS west_vehicles_per_hour_exit_east
+FROM efficiency_score_table
+LEFT JOIN junction ON junction.junction_id = efficiency_score_table.junction_id
+LEFT JOIN arm AS north ON north.junction_id = efficiency_score_table.junction_id AND north.direction = 'north'
+LEFT JOIN arm AS east ON east.junction_id = efficiency_score_table.junction_id AND east.direction = 'east'
+LEFT JOIN arm AS south ON south.junction_id = efficiency_score_table.junction_id AND south.direction = 'south'
+LEFT JOIN arm AS west ON west.junction_id = efficiency_score_table.junction_id AND west.direction = 'west'
+ORDER BY efficiency_score_table.create_time, efficiency_score_table.junction_id;
\ No newline at end of file
@@ -0,0 +1,23 @@
+-- Every arm of a junction with the junction wide settings, one row per direction
+SELECT
+    arm.direction,
+    arm.vehicles_per_hour,
+    arm.exit_north,
+    arm.exit_east,
+    arm.exit_south,
+    arm.exit_west,
+    arm.left_right_lane,
+    arm.left_right_straight_lane,
+    arm.left_lane_count,
+    arm.right_lane_count,
+    arm.straight_right_lane_count,
+    arm.straight_left_lane_count,
+    arm.straight_lane_count,
+    arm.priority,
+    arm.buses_per_hour,
+    junction.has_pedestrian_crossing,
+    junction.crossing_requests_per_hour,
+    junction.crossing_duration
+FROM junction
+JOIN arm ON arm.junction_id = junction.junction_id
+WHERE junction.junction_id = ?;
@@ -0,0 +1 @@
+SELECT series FROM queue_series WHERE junction_id = ?;
@@ -0,0 +1,105 @@
+-- Summary tables of the dashboard, kept up to date by triggers on every insert into and delete from efficiency_score_table,
+-- so the dashboard reads a handful of rows however long the history is. Rows are only deleted when junctions are re-keyed.
+-- Run once per database (while the delete trigger does not exist yet), as filling the tables scans the history.
+BEGIN IMMEDIATE;
+
+CREATE TABLE IF NOT EXISTS score_summary (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    runs INT NOT NULL DEFAULT 0,
+    score_total INT NOT NULL DEFAULT 0,
+    min_score INT,
+    max_score INT
+);
+
+-- Runs per score band: band 0 holds scores 0-9, band 9 scores 90-100
+CREATE TABLE IF NOT EXISTS score_histogram (
+    band INTEGER PRIMARY KEY,
+    runs INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS runs_per_day (
+    day TEXT PRIMARY KEY,
+    runs INT NOT NULL DEFAULT 0,
+    score_total INT NOT NULL DEFAULT 0
+);
+
+-- The 10 lowest scoring junctions
+CREATE TABLE IF NOT EXISTS worst_junctions (
+    junction_id TEXT PRIMARY KEY,
+    efficiency_score INT NOT NULL,
+    create_time TIMESTAMP
+);
+
+-- Fill the tables from the history (unless another connection has already done so)
+INSERT INTO score_histogram (band, runs)
+SELECT MIN(efficiency_score / 10, 9), COUNT(*)
+FROM efficiency_score_table
+WHERE NOT EXISTS (SELECT 1 FROM score_summary)
+GROUP BY MIN(efficiency_score / 10, 9);
+
+INSERT INTO runs_per_day (day, runs, score_total)
+SELECT date(create_time), COUNT(*), SUM(efficiency_score)
+FROM efficiency_score_table
+WHERE NOT EXISTS (SELECT 1 FROM score_summary)
+GROUP BY date(create_time);
+
+INSERT INTO worst_junctions (junction_id, efficiency_score, create_time)
+SELECT junction_id, efficiency_score, create_time
+FROM efficiency_score_table
+WHERE NOT EXISTS (SELECT 1 FROM score_summary)
+ORDER BY efficiency_score, create_time
+LIMIT 10;
+
+INSERT OR IGNORE INTO score_summary (id, runs, score_total, min_score, max_score)
+SELECT 1, COUNT(*), COALESCE(SUM(efficiency_score), 0), MIN(efficiency_score), MAX(efficiency_score)
+FROM efficiency_score_table
+WHERE NOT EXISTS (SELECT 1 FROM score_summary);
+
+CREATE TRIGGER IF NOT EXISTS efficiency_score_dashboard AFTER INSERT ON efficiency_score_table
+BEGIN
+    UPDATE score_summary
+    SET runs = runs + 1,
+        score_total = score_total + NEW.efficiency_score,
+        min_score = MIN(COALESCE(min_score, NEW.efficiency_score), NEW.efficiency_score),
+        max_score = MAX(COALESCE(max_score, NEW.efficiency_score), NEW.efficiency_score)
+    WHERE id = 1;
+
+    INSERT INTO score_histogram (band, runs) VALUES (MIN(NEW.efficiency_score / 10, 9), 1)
+    ON CONFLICT (band) DO UPDATE SET runs = runs + 1;
+
+    INSERT INTO runs_per_day (day, runs, score_total) VALUES (date(NEW.create_time), 1, NEW.efficiency_score)
+    ON CONFLICT (day) DO UPDATE SET runs = runs + 1, score_total = score_total + excluded.score_total;
+
+    INSERT INTO worst_junctions (junction_id, efficiency_score, create_time) VALUES (NEW.junction_id, NEW.efficiency_score, NEW.create_time);
+    DELETE FROM worst_junctions
+    WHERE (SELECT COUNT(*) FROM worst_junctions) > 10
+    AND junction_id = (SELECT junction_id FROM worst_junctions ORDER BY efficiency_score DESC, create_time DESC LIMIT 1);
+END;
+
+-- The minimum and maximum are only looked up again when the deleted score was one of them
+CREATE TRIGGER IF NOT EXISTS efficiency_score_dashboard_delete AFTER DELETE ON efficiency_score_table
+BEGIN
+    UPDATE score_summary
+    SET runs = runs - 1,
+        score_total = score_total - OLD.efficiency_score,
+        min_score = CASE WHEN OLD.efficiency_score <= min_score THEN (SELECT MIN(efficiency_score) FROM efficiency_score_table) ELSE min_score END,
+        max_score = CASE WHEN OLD.efficiency_score >= max_score THEN (SELECT MAX(efficiency_score) FROM efficiency_score_table) ELSE max_score END
+    WHERE id = 1;
+
+    UPDATE score_histogram SET runs = runs - 1 WHERE band = MIN(OLD.efficiency_score / 10, 9);
+
+    UPDATE runs_per_day SET runs = runs - 1, score_total = score_total - OLD.efficiency_score WHERE day = date(OLD.create_time);
+    DELETE FROM runs_per_day WHERE day = date(OLD.create_time) AND runs <= 0;
+
+    -- A deleted worst junction is replaced by the lowest scoring junction of the history not already kept
+    DELETE FROM worst_junctions WHERE junction_id = OLD.junction_id;
+    INSERT INTO worst_junctions (junction_id, efficiency_score, create_time)
+    SELECT junction_id, efficiency_score, create_time
+    FROM efficiency_score_table
+    WHERE (SELECT COUNT(*) FROM worst_junctions) < 10
+    AND junction_id NOT IN (SELECT junction_id FROM worst_junctions)
+    ORDER BY efficiency_score, create_time
+    LIMIT 1;
+END;
+
+COMMIT;
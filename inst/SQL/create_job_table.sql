@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS simulation_job (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'queued', -- queued, running, done or failed
+    payload TEXT NOT NULL, -- the submitted junction_info as JSON
+    result TEXT, -- the results page context as JSON once the job is done
+    error TEXT,
+    submit_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    start_time TIMESTAMP,
+    finish_time TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS simulation_job_status ON simulation_job (status, submit_time);
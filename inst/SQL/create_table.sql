@@ -1,90 +1,38 @@
-CREATE TABLE IF NOT EXISTS junction_config (
-    junction_id TEXT PRIMARY KEY, 
-
-    north_left_right_lane INT DEFAULT 0,
-    north_left_right_straight_lane INT DEFAULT 0,
-    north_left_lane_count INT DEFAULT 0,
-    north_right_lane_count INT DEFAULT 0,
-    north_straight_right_lane_count INT DEFAULT 0,
-    north_straight_left_lane_count INT DEFAULT 0,
-    north_straight_lane_count INT DEFAULT 1,
-
-    north_priority INT DEFAULT 0,
-    north_buses_per_hour INT DEFAULT 0,
-
-    east_left_right_lane INT DEFAULT 0,
-    east_left_right_straight_lane INT DEFAULT 0,
-    east_left_lane_count INT DEFAULT 0,
-    east_right_lane_count INT DEFAULT 0,
-    east_straight_right_lane_count INT DEFAULT 0,
-    east_straight_left_lane_count INT DEFAULT 0,
-    east_straight_lane_count INT DEFAULT 0,
-
-    east_priority INT DEFAULT 0,
-    east_buses_per_hour INT DEFAULT 0,
-
-    south_left_right_lane INT DEFAULT 0,
-    south_left_right_straight_lane INT DEFAULT 0,
-    south_left_lane_count INT DEFAULT 0,
-    south_right_lane_count INT DEFAULT 0,
-    south_straight_right_lane_count INT DEFAULT 0,
-    south_straight_left_lane_count INT DEFAULT 0,
-    south_straight_lane_count INT DEFAULT 0,
-
-    south_priority INT DEFAULT 0,
-    south_buses_per_hour INT DEFAULT 0,
-
-    west_left_right_lane INT DEFAULT 0,
-    west_left_right_straight_lane INT DEFAULT 0,
-    west_left_lane_count INT DEFAULT 0,
-    west_right_lane_count INT DEFAULT 0,
-    west_straight_right_lane_count INT DEFAULT 0,
-    west_straight_left_lane_count INT DEFAULT 0,
-    west_straight_lane_count INT DEFAULT 0,
-
-    west_priority INT DEFAULT 0,
-    west_buses_per_hour INT DEFAULT 0,
-
-    has_pedestrian_crossing INT DEFAULT 0,
-    pedestrian_crossing_duration INT DEFAULT 0,
-    crossing_requests_per_hour INT DEFAULT 0
-);
-
-CREATE TABLE IF NOT EXISTS traffic_flow_north (
+-- The configuration of every junction: one junction row and one arm row per direction
+-- (the compatibility views over them are created by create_views.sql)
+CREATE TABLE IF NOT EXISTS junction (
     junction_id TEXT PRIMARY KEY,
-    vehicles_per_hour_enter_north INT NOT NULL,
-    vehicles_per_hour_exit_south INT NOT NULL,
-    vehicles_per_hour_exit_west INT NOT NULL,
-    vehicles_per_hour_exit_east INT NOT NULL,
-    FOREIGN KEY (junction_id) REFERENCES junction_config(junction_id) 
-);
-
-CREATE TABLE IF NOT EXISTS traffic_flow_south (
-    junction_id TEXT PRIMARY KEY,
-    vehicles_per_hour_exit_north INT NOT NULL,
-    vehicles_per_hour_enter_south INT NOT NULL,
-    vehicles_per_hour_exit_west INT NOT NULL,
-    vehicles_per_hour_exit_east INT NOT NULL,
-    FOREIGN KEY (junction_id) REFERENCES junction_config(junction_id) 
-);
-
-CREATE TABLE IF NOT EXISTS traffic_flow_east (
-    junction_id TEXT PRIMARY KEY,
-    vehicles_per_hour_exit_north INT NOT NULL,
-    vehicles_per_hour_exit_south INT NOT NULL,
-    vehicles_per_hour_exit_west INT NOT NULL,
-    vehicles_per_hour_enter_east INT NOT NULL,
-    FOREIGN KEY (junction_id) REFERENCES junction_config(junction_id) 
-);
-
-CREATE TABLE IF NOT EXISTS traffic_flow_west (
-    junction_id TEXT PRIMARY KEY,
-    vehicles_per_hour_exit_north INT NOT NULL,
-    vehicles_per_hour_exit_south INT NOT NULL,
-    vehicles_per_hour_enter_west INT NOT NULL,
-    vehicles_per_hour_exit_east INT NOT NULL,
-    FOREIGN KEY (junction_id) REFERENCES junction_config(junction_id) 
-);
+    has_pedestrian_crossing INT DEFAULT 0,
+    crossing_requests_per_hour INT DEFAULT 0,
+    crossing_duration INT DEFAULT 0
+) WITHOUT ROWID;
+
+-- One row per arm of a junction: the lanes of the arm and the traffic entering the junction from it
+-- (direction 'north' holds the north lanes and the northbound traffic, and so on)
+CREATE TABLE IF NOT EXISTS arm (
+    junction_id TEXT NOT NULL,
+    direction TEXT NOT NULL CHECK (direction IN ('north', 'east', 'south', 'west')),
+
+    vehicles_per_hour INT,
+    exit_north INT,
+    exit_east INT,
+    exit_south INT,
+    exit_west INT,
+
+    left_right_lane INT DEFAULT 0,
+    left_right_straight_lane INT DEFAULT 0,
+    left_lane_count INT DEFAULT 0,
+    right_lane_count INT DEFAULT 0,
+    straight_right_lane_count INT DEFAULT 0,
+    straight_left_lane_count INT DEFAULT 0,
+    straight_lane_count INT DEFAULT 0,
+
+    priority INT DEFAULT 0,
+    buses_per_hour INT DEFAULT 0,
+
+    PRIMARY KEY (junction_id, direction),
+    FOREIGN KEY (junction_id) REFERENCES junction(junction_id)
+) WITHOUT ROWID;
 
 CREATE TABLE IF NOT EXISTS traffic_light_sequence (
     junction_id TEXT PRIMARY KEY,
@@ -92,7 +40,7 @@ CREATE TABLE IF NOT EXISTS traffic_light_sequence (
     green_duration INT,
     red_duration INT,
     vh_priority INT, -- Priority of the traffic light sequence (0-4)
-    FOREIGN KEY (junction_id) REFERENCES junction_config(junction_id) 
+    FOREIGN KEY (junction_id) REFERENCES junction(junction_id) 
 );
 
 CREATE TABLE IF NOT EXISTS traffic_simulation_result (
@@ -100,12 +48,22 @@ CREATE TABLE IF NOT EXISTS traffic_simulation_result (
     average_wait_time INT NOT NULL,
     max_wait_time INT NOT NULL,
     max_queue_length INT NOT NULL,
-    FOREIGN KEY (junction_id) REFERENCES junction_config(junction_id)
+    FOREIGN KEY (junction_id) REFERENCES junction(junction_id)
 );
 
 CREATE TABLE IF NOT EXISTS efficiency_score_table(
     junction_id TEXT PRIMARY KEY,
     create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     efficiency_score INT DEFAULT 0,
-    FOREIGN KEY (junction_id) REFERENCES junction_config(junction_id)
+    FOREIGN KEY (junction_id) REFERENCES junction(junction_id)
+);
+
+-- Keyset pagination of the history, newest first (see src/history.py); covers the score filters too
+CREATE INDEX IF NOT EXISTS efficiency_score_history ON efficiency_score_table (create_time, junction_id, efficiency_score);
+
+-- The queue length of every lane over the last run of a junction, as a zlib compressed blob (see src/timeseries.py)
+CREATE TABLE IF NOT EXISTS queue_series (
+    junction_id TEXT PRIMARY KEY,
+    series BLOB NOT NULL,
+    FOREIGN KEY (junction_id) REFERENCES junction(junction_id)
 );
\ No newline at end of file
@@ -0,0 +1,144 @@
+-- Compatibility views with the columns of the former junction_config and traffic_flow_<arm> tables, built on
+-- the junction and arm tables. Their INSTEAD OF INSERT triggers keep the INSERT_junction_config.sql and
+-- INSERT_traffic_flow_<arm>.sql queries working.
+--
+-- Those tables were always filled positionally, so a column holds the value of its position rather than what
+-- its name says (e.g. pedestrian_crossing_duration holds the crossing requests per hour and the second column
+-- of traffic_flow_north the northbound traffic going north). The views keep that layout so every existing
+-- query reads the same values as before.
+
+CREATE VIEW IF NOT EXISTS junction_config AS
+SELECT
+    junction.junction_id,
+    north.left_right_lane AS north_left_right_lane,
+    north.left_right_straight_lane AS north_left_right_straight_lane,
+    north.left_lane_count AS north_left_lane_count,
+    north.right_lane_count AS north_right_lane_count,
+    north.straight_right_lane_count AS north_straight_right_lane_count,
+    north.straight_left_lane_count AS north_straight_left_lane_count,
+    north.straight_lane_count AS north_straight_lane_count,
+    north.priority AS north_priority,
+    north.buses_per_hour AS north_buses_per_hour,
+    east.left_right_lane AS east_left_right_lane,
+    east.left_right_straight_lane AS east_left_right_straight_lane,
+    east.left_lane_count AS east_left_lane_count,
+    east.right_lane_count AS east_right_lane_count,
+    east.straight_right_lane_count AS east_straight_right_lane_count,
+    east.straight_left_lane_count AS east_straight_left_lane_count,
+    east.straight_lane_count AS east_straight_lane_count,
+    east.priority AS east_priority,
+    east.buses_per_hour AS east_buses_per_hour,
+    south.left_right_lane AS south_left_right_lane,
+    south.left_right_straight_lane AS south_left_right_straight_lane,
+    south.left_lane_count AS south_left_lane_count,
+    south.right_lane_count AS south_right_lane_count,
+    south.straight_right_lane_count AS south_straight_right_lane_count,
+    south.straight_left_lane_count AS south_straight_left_lane_count,
+    south.straight_lane_count AS south_straight_lane_count,
+    south.priority AS south_priority,
+    south.buses_per_hour AS south_buses_per_hour,
+    west.left_right_lane AS west_left_right_lane,
+    west.left_right_straight_lane AS west_left_right_straight_lane,
+    west.left_lane_count AS west_left_lane_count,
+    west.right_lane_count AS west_right_lane_count,
+    west.straight_right_lane_count AS west_straight_right_lane_count,
+    west.straight_left_lane_count AS west_straight_left_lane_count,
+    west.straight_lane_count AS west_straight_lane_count,
+    west.priority AS west_priority,
+    west.buses_per_hour AS west_buses_per_hour,
+    junction.has_pedestrian_crossing,
+    junction.crossing_requests_per_hour AS pedestrian_crossing_duration,
+    junction.crossing_duration AS crossing_requests_per_hour
+FROM junction
+JOIN arm AS north ON north.junction_id = junction.junction_id AND north.direction = 'north'
+JOIN arm AS east ON east.junction_id = junction.junction_id AND east.direction = 'east'
+JOIN arm AS south ON south.junction_id = junction.junction_id AND south.direction = 'south'
+JOIN arm AS west ON west.junction_id = junction.junction_id AND west.direction = 'west';
+
+CREATE TRIGGER IF NOT EXISTS junction_config_insert INSTEAD OF INSERT ON junction_config
+BEGIN
+    INSERT INTO junction (junction_id, has_pedestrian_crossing, crossing_requests_per_hour, crossing_duration)
+    VALUES (NEW.junction_id, NEW.has_pedestrian_crossing, NEW.pedestrian_crossing_duration, NEW.crossing_requests_per_hour);
+    INSERT INTO arm (junction_id, direction, left_right_lane, left_right_straight_lane, left_lane_count, right_lane_count, straight_right_lane_count, straight_left_lane_count, straight_lane_count, priority, buses_per_hour)
+    VALUES
+        (NEW.junction_id, 'north', NEW.north_left_right_lane, NEW.north_left_right_straight_lane, NEW.north_left_lane_count, NEW.north_right_lane_count, NEW.north_straight_right_lane_count, NEW.north_straight_left_lane_count, NEW.north_straight_lane_count, NEW.north_priority, NEW.north_buses_per_hour),
+        (NEW.junction_id, 'east', NEW.east_left_right_lane, NEW.east_left_right_straight_lane, NEW.east_left_lane_count, NEW.east_right_lane_count, NEW.east_straight_right_lane_count, NEW.east_straight_left_lane_count, NEW.east_straight_lane_count, NEW.east_priority, NEW.east_buses_per_hour),
+        (NEW.junction_id, 'south', NEW.south_left_right_lane, NEW.south_left_right_straight_lane, NEW.south_left_lane_count, NEW.south_right_lane_count, NEW.south_straight_right_lane_count, NEW.south_straight_left_lane_count, NEW.south_straight_lane_count, NEW.south_priority, NEW.south_buses_per_hour),
+        (NEW.junction_id, 'west', NEW.west_left_right_lane, NEW.west_left_right_straight_lane, NEW.west_left_lane_count, NEW.west_right_lane_count, NEW.west_straight_right_lane_count, NEW.west_straight_left_lane_count, NEW.west_straight_lane_count, NEW.west_priority, NEW.west_buses_per_hour);
+END;
+
+CREATE VIEW IF NOT EXISTS traffic_flow_north AS
+SELECT
+    junction_id,
+    vehicles_per_hour AS vehicles_per_hour_enter_north,
+    exit_north AS vehicles_per_hour_exit_south,
+    exit_east AS vehicles_per_hour_exit_west,
+    exit_west AS vehicles_per_hour_exit_east
+FROM arm
+WHERE direction = 'north' AND vehicles_per_hour IS NOT NULL;
+
+CREATE TRIGGER IF NOT EXISTS traffic_flow_north_insert INSTEAD OF INSERT ON traffic_flow_north
+BEGIN
+    SELECT RAISE(ABORT, 'traffic_flow_north: the junction is not stored or already has this traffic flow')
+    WHERE NOT EXISTS (SELECT 1 FROM arm WHERE junction_id = NEW.junction_id AND direction = 'north' AND vehicles_per_hour IS NULL);
+    UPDATE arm
+    SET vehicles_per_hour = NEW.vehicles_per_hour_enter_north, exit_north = NEW.vehicles_per_hour_exit_south, exit_east = NEW.vehicles_per_hour_exit_west, exit_west = NEW.vehicles_per_hour_exit_east
+    WHERE junction_id = NEW.junction_id AND direction = 'north';
+END;
+
+CREATE VIEW IF NOT EXISTS traffic_flow_east AS
+SELECT
+    junction_id,
+    vehicles_per_hour AS vehicles_per_hour_exit_north,
+    exit_north AS vehicles_per_hour_exit_south,
+    exit_east AS vehicles_per_hour_exit_west,
+    exit_south AS vehicles_per_hour_enter_east
+FROM arm
+WHERE direction = 'east' AND vehicles_per_hour IS NOT NULL;
+
+CREATE TRIGGER IF NOT EXISTS traffic_flow_east_insert INSTEAD OF INSERT ON traffic_flow_east
+BEGIN
+    SELECT RAISE(ABORT, 'traffic_flow_east: the junction is not stored or already has this traffic flow')
+    WHERE NOT EXISTS (SELECT 1 FROM arm WHERE junction_id = NEW.junction_id AND direction = 'east' AND vehicles_per_hour IS NULL);
+    UPDATE arm
+    SET vehicles_per_hour = NEW.vehicles_per_hour_exit_north, exit_north = NEW.vehicles_per_hour_exit_south, exit_east = NEW.vehicles_per_hour_exit_west, exit_south = NEW.vehicles_per_hour_enter_east
+    WHERE junction_id = NEW.junction_id AND direction = 'east';
+END;
+
+CREATE VIEW IF NOT EXISTS traffic_flow_south AS
+SELECT
+    junction_id,
+    vehicles_per_hour AS vehicles_per_hour_exit_north,
+    exit_south AS vehicles_per_hour_enter_south,
+    exit_east AS vehicles_per_hour_exit_west,
+    exit_west AS vehicles_per_hour_exit_east
+FROM arm
+WHERE direction = 'south' AND vehicles_per_hour IS NOT NULL;
+
+CREATE TRIGGER IF NOT EXISTS traffic_flow_south_insert INSTEAD OF INSERT ON traffic_flow_south
+BEGIN
+    SELECT RAISE(ABORT, 'traffic_flow_south: the junction is not stored or already has this traffic flow')
+    WHERE NOT EXISTS (SELECT 1 FROM arm WHERE junction_id = NEW.junction_id AND direction = 'south' AND vehicles_per_hour IS NULL);
+    UPDATE arm
+    SET vehicles_per_hour = NEW.vehicles_per_hour_exit_north, exit_south = NEW.vehicles_per_hour_enter_south, exit_east = NEW.vehicles_per_hour_exit_west, exit_west = NEW.vehicles_per_hour_exit_east
+    WHERE junction_id = NEW.junction_id AND direction = 'south';
+END;
+
+CREATE VIEW IF NOT EXISTS traffic_flow_west AS
+SELECT
+    junction_id,
+    vehicles_per_hour AS vehicles_per_hour_exit_north,
+    exit_west AS vehicles_per_hour_exit_south,
+    exit_north AS vehicles_per_hour_enter_west,
+    exit_south AS vehicles_per_hour_exit_east
+FROM arm
+WHERE direction = 'west' AND vehicles_per_hour IS NOT NULL;
+
+CREATE TRIGGER IF NOT EXISTS traffic_flow_west_insert INSTEAD OF INSERT ON traffic_flow_west
+BEGIN
+    SELECT RAISE(ABORT, 'traffic_flow_west: the junction is not stored or already has this traffic flow')
+    WHERE NOT EXISTS (SELECT 1 FROM arm WHERE junction_id = NEW.junction_id AND direction = 'west' AND vehicles_per_hour IS NULL);
+    UPDATE arm
+    SET vehicles_per_hour = NEW.vehicles_per_hour_exit_north, exit_west = NEW.vehicles_per_hour_exit_south, exit_north = NEW.vehicles_per_hour_enter_west, exit_south = NEW.vehicles_per_hour_exit_east
+    WHERE junction_id = NEW.junction_id AND direction = 'west';
+END;
@@ -0,0 +1,96 @@
+-- Moves a database from the wide junction_config and traffic_flow_<arm> tables into the junction and arm
+-- tables (which create_table.sql has created), after which create_views.sql replaces the old tables with views.
+-- The old tables were filled positionally, so their values are moved by position (see create_views.sql).
+BEGIN;
+
+INSERT OR IGNORE INTO junction (junction_id, has_pedestrian_crossing, crossing_requests_per_hour, crossing_duration)
+SELECT junction_id, has_pedestrian_crossing, pedestrian_crossing_duration, crossing_requests_per_hour
+FROM junction_config;
+
+INSERT OR IGNORE INTO arm (junction_id, direction, vehicles_per_hour, exit_north, exit_east, exit_west, left_right_lane, left_right_straight_lane, left_lane_count, right_lane_count, straight_right_lane_count, straight_left_lane_count, straight_lane_count, priority, buses_per_hour)
+SELECT
+    junction_config.junction_id,
+    'north',
+    traffic_flow_north.vehicles_per_hour_enter_north,
+    traffic_flow_north.vehicles_per_hour_exit_south,
+    traffic_flow_north.vehicles_per_hour_exit_west,
+    traffic_flow_north.vehicles_per_hour_exit_east,
+    junction_config.north_left_right_lane,
+    junction_config.north_left_right_straight_lane,
+    junction_config.north_left_lane_count,
+    junction_config.north_right_lane_count,
+    junction_config.north_straight_right_lane_count,
+    junction_config.north_straight_left_lane_count,
+    junction_config.north_straight_lane_count,
+    junction_config.north_priority,
+    junction_config.north_buses_per_hour
+FROM junction_config
+LEFT JOIN traffic_flow_north ON traffic_flow_north.junction_id = junction_config.junction_id;
+
+INSERT OR IGNORE INTO arm (junction_id, direction, vehicles_per_hour, exit_north, exit_east, exit_south, left_right_lane, left_right_straight_lane, left_lane_count, right_lane_count, straight_right_lane_count, straight_left_lane_count, straight_lane_count, priority, buses_per_hour)
+SELECT
+    junction_config.junction_id,
+    'east',
+    traffic_flow_east.vehicles_per_hour_exit_north,
+    traffic_flow_east.vehicles_per_hour_exit_south,
+    traffic_flow_east.vehicles_per_hour_exit_west,
+    traffic_flow_east.vehicles_per_hour_enter_east,
+    junction_config.east_left_right_lane,
+    junction_config.east_left_right_straight_lane,
+    junction_config.east_left_lane_count,
+    junction_config.east_right_lane_count,
+    junction_config.east_straight_right_lane_count,
+    junction_config.east_straight_left_lane_count,
+    junction_config.east_straight_lane_count,
+    junction_config.east_priority,
+    junction_config.east_buses_per_hour
+FROM junction_config
+LEFT JOIN traffic_flow_east ON traffic_flow_east.junction_id = junction_config.junction_id;
+
+INSERT OR IGNORE INTO arm (junction_id, direction, vehicles_per_hour, exit_south, exit_east, exit_west, left_right_lane, left_right_straight_lane, left_lane_count, right_lane_count, straight_right_lane_count, straight_left_lane_count, straight_lane_count, priority, buses_per_hour)
+SELECT
+    junction_config.junction_id,
+    'south',
+    traffic_flow_south.vehicles_per_hour_exit_north,
+    traffic_flow_south.vehicles_per_hour_enter_south,
+    traffic_flow_south.vehicles_per_hour_exit_west,
+    traffic_flow_south.vehicles_per_hour_exit_east,
+    junction_config.south_left_right_lane,
+    junction_config.south_left_right_straight_lane,
+    junction_config.south_left_lane_count,
+    junction_config.south_right_lane_count,
+    junction_config.south_straight_right_lane_count,
+    junction_config.south_straight_left_lane_count,
+    junction_config.south_straight_lane_count,
+    junction_config.south_priority,
+    junction_config.south_buses_per_hour
+FROM junction_config
+LEFT JOIN traffic_flow_south ON traffic_flow_south.junction_id = junction_config.junction_id;
+
+INSERT OR IGNORE INTO arm (junction_id, direction, vehicles_per_hour, exit_west, exit_north, exit_south, left_right_lane, left_right_straight_lane, left_lane_count, right_lane_count, straight_right_lane_count, straight_left_lane_count, straight_lane_count, priority, buses_per_hour)
+SELECT
+    junction_config.junction_id,
+    'west',
+    traffic_flow_west.vehicles_per_hour_exit_north,
+    traffic_flow_west.vehicles_per_hour_exit_south,
+    traffic_flow_west.vehicles_per_hour_enter_west,
+    traffic_flow_west.vehicles_per_hour_exit_east,
+    junction_config.west_left_right_lane,
+    junction_config.west_left_right_straight_lane,
+    junction_config.west_left_lane_count,
+    junction_config.west_right_lane_count,
+    junction_config.west_straight_right_lane_count,
+    junction_config.west_straight_left_lane_count,
+    junction_config.west_straight_lane_count,
+    junction_config.west_priority,
+    junction_config.west_buses_per_hour
+FROM junction_config
+LEFT JOIN traffic_flow_west ON traffic_flow_west.junction_id = junction_config.junction_id;
+
+DROP TABLE traffic_flow_north;
+DROP TABLE traffic_flow_east;
+DROP TABLE traffic_flow_south;
+DROP TABLE traffic_flow_west;
+DROP TABLE junction_config;
+
+COMMIT;
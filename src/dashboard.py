@@ -0,0 +1,45 @@
+import os
+
+from src.db_functions import db_functions
+
+DAYS = 30 #days of runs shown on the dashboard
+WORST = 10 #junctions kept in worst_junctions (see create_dashboard.sql)
+
+
+def load_dashboard(db: str | os.PathLike, days: int = DAYS) -> dict:
+    """Read the dashboard from the summary tables of create_dashboard.sql
+
+    Description:
+        Only the summary tables are read (one summary row, at most 10 score bands, the last days
+        days and 10 worst junctions), so the time taken does not grow with the number of stored runs.
+
+    Args:
+        db (str, os.PathLike): The path to the database, whose schema junction_store.ensure_schema has created
+        days (int): The number of most recent days to show the runs of
+
+    Returns:
+        dict: The number of runs with their mean, lowest and highest score, the runs per score band,
+        the runs and mean score per day (oldest first) and the worst junctions (lowest score first)
+    """
+    con = db_functions.get_conn(db)
+    try:
+        runs, score_total, min_score, max_score = con.execute("SELECT runs, score_total, min_score, max_score FROM score_summary WHERE id = 1").fetchone() or (0, 0, None, None)
+        bands = dict(con.execute("SELECT band, runs FROM score_histogram").fetchall())
+        per_day = con.execute("SELECT day, runs, score_total FROM runs_per_day ORDER BY day DESC LIMIT ?", (days,)).fetchall()
+        worst = con.execute("SELECT junction_id, efficiency_score, create_time FROM worst_junctions ORDER BY efficiency_score, create_time LIMIT ?", (WORST,)).fetchall()
+    finally:
+        db_functions.close_conn(con)
+
+    busiest_band = max(bands.values(), default=0)
+    busiest_day = max((day_runs for _, day_runs, _ in per_day), default=0)
+    return {
+        "runs": runs,
+        "mean_score": round(score_total / runs, 2) if runs else None,
+        "min_score": min_score,
+        "max_score": max_score,
+        "histogram": [{"band": f"{band * 10}-{band * 10 + 9 if band < 9 else 100}", "runs": bands.get(band, 0),
+                       "width": round(100 * bands.get(band, 0) / busiest_band) if busiest_band else 0} for band in range(10)],
+        "days": [{"day": day, "runs": day_runs, "mean_score": round(day_total / day_runs, 2), "width": round(100 * day_runs / busiest_day)}
+                 for day, day_runs, day_total in reversed(per_day)],
+        "worst": [{"junction_id": junction_id, "efficiency_score": score, "create_time": create_time} for junction_id, score, create_time in worst],
+    }
@@ -2,16 +2,17 @@ import openpyxl.worksheet
 import openpyxl.worksheet.worksheet
 from datetime import datetime
 import sys
+import functools
 import hashlib
+import math
 import os
 
 import sqlite3
+import struct
 
 # from scipy.stats import norm
-from sympy.stats import Normal, cdf
-from sympy import N
 
-import importlib
+import importlib.resources
 from inst import SQL
 
 
@@ -107,99 +108,102 @@ def offset(lst: list, i: int) -> list:
         raise TypeError("offset requires a list and an integer value as arguments")
     return lst[i:] + lst[:i]
 
-def check_symmetry(params: dict) -> list[hashlib.sha256]:
-    """Compute hash values generated by rotational symmetry of junctions
-    
-    Description:
-        Calculate each hash value generated by equivalent junction configurations by considering the implications of rotational symmetry
+# The arms of the junction key in clockwise order, each with the bound of the traffic entering the junction from it
+# and the exits of that traffic when it turns left, goes straight on and turns right
+KEY_ARMS = [("north", "southbound", ("east", "south", "west")),
+            ("east", "westbound", ("south", "west", "north")),
+            ("south", "northbound", ("west", "north", "east")),
+            ("west", "eastbound", ("north", "east", "south"))]
+KEY_LANES = ["left_right_lane", "left_right_straight_lane", "straight_lane_count", "left_lane_count",
+             "straight_left_lane_count", "straight_right_lane_count", "right_lane_count"]
+
+# The fields of the junction key: one block per arm with the left, straight and right traffic and the buses per hour,
+# then the priority and the 7 lane counts, followed by the pedestrian crossing, its requests per hour and its duration
+KEY_FIELDS = [field for arm, bound, exits in KEY_ARMS
+              for field in [f"{bound}_{exit_name}_exit" for exit_name in exits] + [f"{arm}_buses_per_hour", f"{arm}_priority"] + [f"{arm}_{lane}" for lane in KEY_LANES]]
+KEY_FIELDS += ["pedestrian_crossing", "crossing_requests_PH", "crossing_requests_duration"]
+KEY_STRUCT = struct.Struct("<" + "4I8B" * len(KEY_ARMS) + "B2I") #little endian, no padding: 105 bytes
+ARM_BLOCK_SIZE = struct.calcsize("<4I8B")
+KEY_SIZES = ([4] * 4 + [1] * 8) * len(KEY_ARMS) + [1, 4, 4] #the bytes of each of the KEY_FIELDS in KEY_STRUCT
+KEY_SIZE = 16 #bytes of the blake2b digest, 32 hex characters
+
+
+def key_int(value) -> int:
+    """Read a field of the junction information as metaphor would (None and '' are 0, 'true' is 1)"""
+    if value is None or value == '':
+        return 0
+    if value == 'true':
+        return 1
+    return int(value)
+
+
+def encode_junction(params: dict) -> bytes:
+    """Pack the junction information into the fixed layout of the junction key
 
     Args:
-        params (dict): The dictionary with input parameters.
+        params (dict): The junction information
 
     Returns:
-        list[hashlib.sha256]: A list of hash values for equivalent junction configurations.
+        bytes: The KEY_FIELDS of the junction packed with KEY_STRUCT
+
+    Raises:
+        ValueError: A field is not an integer or does not fit its slot of KEY_STRUCT (the validators bound the fields they check)
     """
     if not isinstance(params, dict):
         raise ValueError("An invalid input type was given")
 
-    index = [1, 2, 3, 4]
-    out = []
-    for i in range(4):
-        a, b, c, d = offset(index, i)
-
-        lanes_north = [ 
-        f"traffic_left_{a}_{params.get('southbound_west_exit')}",
-        f"traffic_straight_{a}_{params.get('southbound_south_exit')}",
-        f"traffic_right_{a}_{params.get('southbound_east_exit')}",
-        f"n_buses_{a}_{params.get('north_buses_per_hour')}",
-        f"priority_{a}_{params.get('north_priority')}",
-        f"lanes_left_right_{a}_{params.get('north_left_right_lane')}", 
-        f"lanes_left_right_straight_{a}_{params.get('north_left_right_straight_lane')}", 
-        f"lanes_straight_{a}_{params.get('north_straight_lane_count')}", 
-        f"lanes_left_{a}_{params.get('north_left_lane_count')}", 
-        f"lanes_left_straight_{a}_{params.get('north_straight_left_lane_count')}", 
-        f"lanes_right_straight_{a}_{params.get('north_straight_right_lane_count')}", 
-        f"lanes_right_{a}_{params.get('north_right_lane_count')}"]
-
-        lanes_east = [ 
-        f"traffic_left_{b}_{params.get('westbound_south_exit')}",
-        f"traffic_straight_{b}_{params.get('westbound_west_exit')}",
-        f"traffic_right_{b}_{params.get('westbound_north_exit')}",
-        f"n_buses_{b}_{params.get('east_buses_per_hour')}",
-        f"priority_{b}_{params.get('east_priority')}",
-        f"lanes_left_right_{b}_{params.get('east_left_right_lane')}", 
-        f"lanes_left_right_straight_{b}_{params.get('east_left_right_straight_lane')}", 
-        f"lanes_straight_{b}_{params.get('east_straight_lane_count')}", 
-        f"lanes_left_{b}_{params.get('east_left_lane_count')}", 
-        f"lanes_left_straight_{b}_{params.get('east_straight_left_lane_count')}", 
-        f"lanes_right_straight_{b}_{params.get('east_straight_right_lane_count')}", 
-        f"lanes_right_{b}_{params.get('east_right_lane_count')}"]
-
-        lanes_south = [ 
-        f"traffic_left_{c}_{params.get('northbound_west_exit')}",
-        f"traffic_straight_{c}_{params.get('northbound_north_exit')}",
-        f"traffic_right_{c}_{params.get('northbound_east_exit')}",
-        f"n_buses_{c}_{params.get('south_buses_per_hour')}",
-        f"priority_{c}_{params.get('south_priority')}",
-        f"lanes_left_right_{c}_{params.get('south_left_right_lane')}", 
-        f"lanes_left_right_straight_{c}_{params.get('south_left_right_straight_lane')}", 
-        f"lanes_straight_{c}_{params.get('south_straight_lane_count')}", 
-        f"lanes_left_{c}_{params.get('south_left_lane_count')}", 
-        f"lanes_left_straight_{c}_{params.get('south_straight_left_lane_count')}", 
-        f"lanes_right_straight_{c}_{params.get('south_straight_right_lane_count')}", 
-        f"lanes_right_{c}_{params.get('south_right_lane_count')}"]
-
-        lanes_west = [ 
-        f"traffic_left_{d}_{params.get('eastbound_north_exit')}",
-        f"traffic_straight_{d}_{params.get('eastbound_east_exit')}",
-        f"traffic_right_{d}_{params.get('eastbound_south_exit')}",
-        f"n_buses_{d}_{params.get('west_buses_per_hour')}",
-        f"priority_{d}_{params.get('west_priority')}",
-        f"lanes_left_right_{d}_{params.get('west_left_right_lane')}", 
-        f"lanes_left_right_straight_{d}_{params.get('west_left_right_straight_lane')}", 
-        f"lanes_straight_{d}_{params.get('west_straight_lane_count')}", 
-        f"lanes_left_{d}_{params.get('west_left_lane_count')}", 
-        f"lanes_left_straight_{d}_{params.get('west_straight_left_lane_count')}", 
-        f"lanes_right_straight_{d}_{params.get('west_straight_right_lane_count')}", 
-        f"lanes_right_{d}_{params.get('west_right_lane_count')}"]
-
-        pedestrian_crossing = f"crossing_{params.get('pedestrian_crossing', 0)}"
-        pedestrian_crossing_duration = f"durations_{params.get('duration', 0)}" #edit
-        crossing_requests_per_hour = f"crossing_requests_{params.get('crossing_requestsPH', 0)}"
-
-        lst = sorted(lanes_north + lanes_east + lanes_south + lanes_west + [pedestrian_crossing_duration, crossing_requests_per_hour + pedestrian_crossing])
-
-        pk = hashlib.sha256(bytes(str(lst), 'utf-8')).hexdigest()
-        out.append(pk)
-
-    # Idea: return max(out)
-    # -> Depends on whether the return value needs to match with the input 1 <-> 1
-    return out
+    values = [params.get(field) for field in KEY_FIELDS]
+    try:
+        values = list(map(int, values))
+    except (TypeError, ValueError):
+        # Form values that metaphor has not normalised yet
+        values = list(map(key_int, values))
+    try:
+        return KEY_STRUCT.pack(*values)
+    except struct.error:
+        field, value = next((field, value) for field, value, size in zip(KEY_FIELDS, values, KEY_SIZES) if not 0 <= value < 256 ** size)
+        raise ValueError(f"The {field} of the junction ({value}) does not fit the junction key") from None
+
+
+def digest_key(encoded: bytes) -> str:
+    """Digest an encoded junction into its key"""
+    return hashlib.blake2b(encoded, digest_size=KEY_SIZE).hexdigest()
+
+
+def check_symmetry(params: dict) -> list[str]:
+    """Compute the keys of a junction and of its rotations
+
+    Description:
+        A rotation of the junction moves every arm to the next arm clockwise, which is a permutation of the arm blocks
+        of the junction key, so the fields are only packed once for all four keys.
+
+    Args:
+        params (dict): The dictionary with input parameters.
+
+    Returns:
+        list[str]: The keys of the junction rotated by 0, 1, 2 and 3 arms, the first being get_pk(params).
+    """
+    encoded = encode_junction(params)
+    arms = ARM_BLOCK_SIZE * len(KEY_ARMS)
+    return [digest_key(encoded[ARM_BLOCK_SIZE * i:arms] + encoded[:ARM_BLOCK_SIZE * i] + encoded[arms:]) for i in range(4)]
 ### END SYMMETRY
 
 
 
 ### BEGIN QUERIES
+@functools.lru_cache(maxsize=None)
+def read_sql_file(query: str | os.PathLike) -> str:
+    """Read one of the .sql files of inst/SQL, cached as the files do not change while the app runs
+
+    Args:
+        query (str, os.PathLike): The name of the .sql file
+
+    Returns:
+        str: The sql of the file
+    """
+    with open(importlib.resources.files(SQL).joinpath(query), 'r') as q:
+        return q.read()
+
 def execute_inject_query(conn: sqlite3.Connection, query: str | os.PathLike, close_conn: bool =True, return_as_df=False, *args: any) -> sqlite3.Cursor | None:
     """Wrapper function for executing sql queries using sqlite3 in python.
 
@@ -372,11 +376,24 @@ def getZScore(waiting_time: int, mean: float, std: float) -> float:
             "The waiting time must be non-negative"
         )
 
-    n_dist = Normal('X', mean, std)
-    prob = cdf(n_dist)(waiting_time)
-    
-    score = (1-prob) * 100
-    return round(float(N(score)), 2)
+    # 1 - cdf of the normal distribution, via the complementary error function (exact to far more than the 2 decimals kept)
+    score = 50 * math.erfc((waiting_time - mean) / (std * math.sqrt(2)))
+    return round(score, 2)
+
+def get_efficiency_score(output: dict) -> float:
+    """Score a simulated junction
+
+    Description:
+        Weighted mean of the percentile ranks of the maximum wait (weight 2), maximum queue (weight 3)
+        and average wait (weight 6) of the junction against expected real-world values.
+
+    Args:
+        output (dict): The output of createSimulation
+
+    Returns:
+        float: The efficiency score of the junction, out of 100
+    """
+    return round((getZScore(output["maxWait"], 60, 15) * 2 + getZScore(output["maxQueue"], 10, 5) * 3 + getZScore(output["avgWait"], 30, 15) * 6)/11, 2)
 
 def metaphor(d: dict) -> dict:
     # headings ={"north_lanes": "north", "east_lanes": "east", "south_lanes": "south", "west_lanes": "west"}
@@ -419,89 +436,20 @@ def metaphor(d: dict) -> dict:
 
     return out
 
-def get_pk(params: dict) -> list[hashlib.sha256]:
-    """Compute hash values generated by rotational symmetry of junctions
-   
+def get_pk(params: dict) -> str:
+    """Compute the primary key of a junction
+
     Description:
-        Calculate each hash value generated by equivalent junction configurations by considering the implications of rotational symmetry
- 
+        Every field of the junction is packed into the fixed layout of encode_junction (105 bytes of small integers)
+        and digested with blake2b. Compute it once per request, it does not change while the junction is handled.
+
     Args:
         params (dict): The dictionary with input parameters.
- 
+
     Returns:
-        list[hashlib.sha256]: A list of hash values for equivalent junction configurations.
+        str: The key of the junction, 32 hex characters.
     """
-    
-    a, b, c, d =1, 2, 3, 4
-
-    if not isinstance(params, dict):
-        raise ValueError("An invalid input type was given")
- 
-    lanes_north = [
-    f"traffic_left_{a}_{params.get('southbound_west_exit')}",
-    f"traffic_straight_{a}_{params.get('southbound_south_exit')}",
-    f"traffic_right_{a}_{params.get('southbound_east_exit')}",
-    f"n_buses_{a}_{params.get('north_buses_per_hour')}",
-    f"priority_{a}_{params.get('north_priority')}",
-    f"lanes_left_right_{a}_{params.get('north_left_right_lane')}",
-    f"lanes_left_right_straight_{a}_{params.get('north_left_right_straight_lane')}",
-    f"lanes_straight_{a}_{params.get('north_straight_lane_count')}",
-    f"lanes_left_{a}_{params.get('north_left_lane_count')}",
-    f"lanes_left_straight_{a}_{params.get('north_straight_left_lane_count')}",
-    f"lanes_right_straight_{a}_{params.get('north_straight_right_lane_count')}",
-    f"lanes_right_{a}_{params.get('north_right_lane_count')}"]
-
-    lanes_east = [
-    f"traffic_left_{b}_{params.get('westbound_south_exit')}",
-    f"traffic_straight_{b}_{params.get('westbound_west_exit')}",
-    f"traffic_right_{b}_{params.get('westbound_north_exit')}",
-    f"n_buses_{b}_{params.get('east_buses_per_hour')}",
-    f"priority_{b}_{params.get('east_priority')}",
-    f"lanes_left_right_{b}_{params.get('east_left_right_lane')}",
-    f"lanes_left_right_straight_{b}_{params.get('east_left_right_straight_lane')}",
-    f"lanes_straight_{b}_{params.get('east_straight_lane_count')}",
-    f"lanes_left_{b}_{params.get('east_left_lane_count')}",
-    f"lanes_left_straight_{b}_{params.get('east_straight_left_lane_count')}",
-    f"lanes_right_straight_{b}_{params.get('east_straight_right_lane_count')}",
-    f"lanes_right_{b}_{params.get('east_right_lane_count')}"]
-
-    lanes_south = [
-    f"traffic_left_{c}_{params.get('northbound_west_exit')}",
-    f"traffic_straight_{c}_{params.get('northbound_north_exit')}",
-    f"traffic_right_{c}_{params.get('northbound_east_exit')}",
-    f"n_buses_{c}_{params.get('south_buses_per_hour')}",
-    f"priority_{c}_{params.get('south_priority')}",
-    f"lanes_left_right_{c}_{params.get('south_left_right_lane')}",
-    f"lanes_left_right_straight_{c}_{params.get('south_left_right_straight_lane')}",
-    f"lanes_straight_{c}_{params.get('south_straight_lane_count')}",
-    f"lanes_left_{c}_{params.get('south_left_lane_count')}",
-    f"lanes_left_straight_{c}_{params.get('south_straight_left_lane_count')}",
-    f"lanes_right_straight_{c}_{params.get('south_straight_right_lane_count')}",
-    f"lanes_right_{c}_{params.get('south_right_lane_count')}"]
-
-    lanes_west = [
-    f"traffic_left_{d}_{params.get('eastbound_north_exit')}",
-    f"traffic_straight_{d}_{params.get('eastbound_east_exit')}",
-    f"traffic_right_{d}_{params.get('eastbound_south_exit')}",
-    f"n_buses_{d}_{params.get('west_buses_per_hour')}",
-    f"priority_{d}_{params.get('west_priority')}",
-    f"lanes_left_right_{d}_{params.get('west_left_right_lane')}",
-    f"lanes_left_right_straight_{d}_{params.get('west_left_right_straight_lane')}",
-    f"lanes_straight_{d}_{params.get('west_straight_lane_count')}",
-    f"lanes_left_{d}_{params.get('west_left_lane_count')}",
-    f"lanes_left_straight_{d}_{params.get('west_straight_left_lane_count')}",
-    f"lanes_right_straight_{d}_{params.get('west_straight_right_lane_count')}",
-    f"lanes_right_{d}_{params.get('west_right_lane_count')}"]
-
-    pedestrian_crossing = f"crossing_{params.get('pedestrian_crossing', 0)}"
-    pedestrian_crossing_duration = f"durations_{params.get('duration', 0)}" #edit
-    crossing_requests_per_hour = f"crossing_requests_{params.get('crossing_requestsPH', 0)}"
-
-    lst = sorted(lanes_north + lanes_east + lanes_south + lanes_west + [pedestrian_crossing_duration, crossing_requests_per_hour + pedestrian_crossing])
-
-    pk = hashlib.sha256(bytes(str(lst), 'utf-8')).hexdigest()
- 
-    return pk
+    return digest_key(encode_junction(params))
 
 
 
@@ -10,10 +10,16 @@ class Direction:
         lanes(Dictionary): the dictionary containing all of the lanes
         VPHFlowDirections(array(int)): the VPH for each heading for this direction (Left, Straight, Right)
         laneLayout(array(string)): the array of strings inidcating the types of lanes in the direction
+        minGreen(float): the shortest green light of the direction under actuated control, None under fixed times
+        maxGreen(float): the longest green light of the direction under actuated control, None under fixed times
+        passageTime(float): the longest gap between vehicles that keeps an actuated green light on, None under fixed times
+        queuedVehicles(int): the number of vehicles queued in all lanes of the direction, kept up to date by the simulation as vehicles join and leave
 
     Methods:
         __init__(self, flows, name, laneInput, inputInformation): initialises the direction object
         hasTraffic(self): indicates whether or not there is any traffic within this direction
+        laneFlows(self): the flows of the lanes after distributeVehiclesByLane
+        setLaneFlows(self, laneFlows): gives the lanes the flows of an already distributed direction
         distributeVehiclesByLane(self): distributes the VPH for this direction between the lanes optimally
     """
 
@@ -32,6 +38,10 @@ class Direction:
         self.lanes = {}  # a dictionary to store all of the lane objects
         self.VPHFlowDirections = flows  # the array storing the directions of traffic [Left, Straight, Right]
         self.laneLayout = laneInput  # the layout of the lanes in the junction
+        self.minGreen = None  # the actuated green light times, set by setActuation
+        self.maxGreen = None
+        self.passageTime = None
+        self.queuedVehicles = 0  # the number of vehicles queued across all of the lanes
 
         # creates lane objects for each direction type provided that these lanes exist
         leftNum = laneInput.count('L')  # counts the number of left turning lanes for this direction
@@ -66,18 +76,40 @@ class Direction:
         if (rightNum != 0):
             self.lanes['R'] = [Lane() for _ in range(rightNum)] # adds the right lane to the lanes dict
 
+        for lanes in self.lanes.values():
+            for lane in lanes:
+                lane.direction = self  # so the simulation can count the vehicles queued in the direction
+
     def hasTraffic(self):
         """
-        Checks through each lane to see if there is any traffic within the queues
+        Checks whether there is any traffic within the queues of the lanes
 
         Returns:
             bool: True if there is traffic in any lane, False if there is no traffic
         """
-        for lanes in self.lanes.values():  # iterates through the values (lane objects) in the lanes dictionary
-            for lane in lanes:
-                if (lane.getQueueSize() != 0):  # checks whether there is traffic in the lane object
-                    return True  # if there is traffic then return true
-        return False  # otherwise if there is no traffic in any of the lanes
+        return self.queuedVehicles != 0  # the count of queued vehicles is updated whenever a vehicle joins or leaves a lane
+
+    def laneFlows(self):
+        """
+        Description: The flows that distributeVehiclesByLane gave the lanes, so a direction with the same flows and lane layout can reuse them
+
+        Returns:
+            list: the directionFlow, totalFlow and newCarRate of every lane, in the order of self.lanes
+        """
+        return [(list(lane.directionFlow), lane.totalFlow, lane.newCarRate) for lanes in self.lanes.values() for lane in lanes]
+
+    def setLaneFlows(self, laneFlows):
+        """
+        Description: Gives the lanes the flows of an already distributed direction with the same flows and lane layout, instead of distributing them again
+
+        Args:
+            laneFlows(list): the laneFlows of the distributed direction
+        """
+        lanes = [lane for laneList in self.lanes.values() for lane in laneList]
+        for lane, (directionFlow, totalFlow, newCarRate) in zip(lanes, laneFlows):
+            lane.directionFlow = list(directionFlow)
+            lane.totalFlow = totalFlow
+            lane.newCarRate = newCarRate
 
     def distributeVehiclesByLane(self):
         """
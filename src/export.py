@@ -0,0 +1,245 @@
+import argparse
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+import openpyxl
+
+from src import junction_store
+from src.db_functions import db_functions
+
+CHUNK_SIZE = 5000 #rows fetched from sqlite (and written) at a time, bounds the memory of an export
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "columnar": ("application/octet-stream", "tjc"),
+}
+
+# The columnar format: MAGIC, a length prefixed JSON header with the column names and types, then one block per chunk
+# of rows (a row count followed by every column in turn) and finally a row count of 0.
+# Integer columns are a null mask (one byte per row) and little endian int64 values, text columns are a null mask,
+# int64 end offsets and the utf-8 bytes of all values.
+MAGIC = b"TJCOL1\n"
+TEXT_COLUMNS = ("junction_id", "create_time")
+
+
+def iter_chunks(db: str | os.PathLike, chunk_size: int = CHUNK_SIZE):
+    """Stream the stored runs out of the database
+
+    Description:
+        Runs SELECT_export.sql, which joins efficiency_score_table with junction_config and the four
+        traffic_flow tables, and fetches its rows chunk_size at a time with fetchmany, so only one
+        chunk is ever held in memory.
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        chunk_size (int): The number of rows per chunk
+
+    Returns:
+        generator: The list of column names, followed by lists of at most chunk_size row tuples
+    """
+    con = db_functions.get_conn(db)
+    try:
+        cur = db_functions.execute_inject_query(con, 'SELECT_export.sql', False, False)
+        if cur == "fail":
+            raise ValueError(f"{db} does not hold the simulation history tables")
+        yield [description[0] for description in cur.description]
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        db_functions.close_conn(con)
+
+
+def stream_csv(db: str | os.PathLike, chunk_size: int = CHUNK_SIZE):
+    """Export the stored runs as CSV
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        chunk_size (int): The number of rows per chunk
+
+    Returns:
+        generator: The CSV text, one string per chunk of rows (the first holds the header)
+    """
+    chunks = iter_chunks(db, chunk_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(next(chunks))
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_xlsx(db: str | os.PathLike, out, chunk_size: int = CHUNK_SIZE) -> None:
+    """Export the stored runs as an Excel workbook
+
+    Description:
+        Uses the write-only mode of openpyxl, which streams rows to disk as they are appended
+        instead of building every cell in memory.
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        out (str, os.PathLike, file): Where the workbook is saved
+        chunk_size (int): The number of rows per chunk
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("simulation_history")
+    chunks = iter_chunks(db, chunk_size)
+    sheet.append(next(chunks))
+    for rows in chunks:
+        for row in rows:
+            sheet.append(row)
+    workbook.save(out)
+
+
+def _pack_column(values: list, kind: str) -> bytes:
+    """Pack one column of a chunk for the columnar format"""
+    mask = bytes(value is None for value in values)
+    if kind == "i":
+        data = array("q", (0 if value is None else int(value) for value in values))
+        if sys.byteorder != "little":
+            data.byteswap()
+        return mask + data.tobytes()
+
+    encoded = [b"" if value is None else str(value).encode("utf-8") for value in values]
+    ends = array("q")
+    end = 0
+    for value in encoded:
+        end += len(value)
+        ends.append(end)
+    if sys.byteorder != "little":
+        ends.byteswap()
+    return mask + ends.tobytes() + b"".join(encoded)
+
+
+def stream_columnar(db: str | os.PathLike, chunk_size: int = CHUNK_SIZE):
+    """Export the stored runs in the columnar binary format described above
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        chunk_size (int): The number of rows per chunk
+
+    Returns:
+        generator: The bytes of the file, one block per chunk of rows
+    """
+    chunks = iter_chunks(db, chunk_size)
+    columns = next(chunks)
+    kinds = ["s" if column in TEXT_COLUMNS else "i" for column in columns]
+    header = json.dumps({"columns": columns, "types": kinds}).encode("utf-8")
+    yield MAGIC + struct.pack("<I", len(header)) + header
+
+    for rows in chunks:
+        block = [struct.pack("<I", len(rows))]
+        for index, kind in enumerate(kinds):
+            block.append(_pack_column([row[index] for row in rows], kind))
+        yield b"".join(block)
+    yield struct.pack("<I", 0)
+
+
+def read_columnar(data: bytes) -> dict:
+    """Read a file written by stream_columnar
+
+    Args:
+        data (bytes): The contents of the file
+
+    Returns:
+        dict: The list of values of every column, keyed by column name
+
+    Raises:
+        ValueError: The data is not in the columnar format
+    """
+    if not data.startswith(MAGIC):
+        raise ValueError("not a columnar export")
+    view = memoryview(data)
+    position = len(MAGIC)
+    (length,) = struct.unpack_from("<I", view, position)
+    position += 4
+    header = json.loads(bytes(view[position:position + length]))
+    position += length
+
+    table = {column: [] for column in header["columns"]}
+    while True:
+        (count,) = struct.unpack_from("<I", view, position)
+        position += 4
+        if count == 0:
+            return table
+        for column, kind in zip(header["columns"], header["types"]):
+            mask = view[position:position + count]
+            position += count
+            numbers = array("q")
+            numbers.frombytes(view[position:position + 8 * count])
+            if sys.byteorder != "little":
+                numbers.byteswap()
+            position += 8 * count
+            if kind == "i":
+                table[column].extend(None if mask[i] else numbers[i] for i in range(count))
+            else:
+                start = 0
+                for i in range(count):
+                    table[column].append(None if mask[i] else str(view[position + start:position + numbers[i]], "utf-8"))
+                    start = numbers[i]
+                position += numbers[count - 1] if count else 0
+
+
+def export(db: str | os.PathLike, fmt: str, out, chunk_size: int = CHUNK_SIZE) -> None:
+    """Export the stored runs into a file
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        fmt (str): One of csv, xlsx or columnar
+        out (file): The binary file the export is written to
+        chunk_size (int): The number of rows per chunk
+
+    Raises:
+        ValueError: Unknown format
+    """
+    if fmt == "csv":
+        for text in stream_csv(db, chunk_size):
+            out.write(text.encode("utf-8"))
+    elif fmt == "xlsx":
+        write_xlsx(db, out, chunk_size)
+    elif fmt == "columnar":
+        for block in stream_columnar(db, chunk_size):
+            out.write(block)
+    else:
+        raise ValueError(f"unknown export format {fmt}, use one of {', '.join(FORMATS)}")
+
+
+def spooled_xlsx(db: str | os.PathLike, chunk_size: int = CHUNK_SIZE):
+    """Export the stored runs as an Excel workbook into a temporary file, for sending to a client
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        chunk_size (int): The number of rows per chunk
+
+    Returns:
+        tempfile.SpooledTemporaryFile: The workbook, rewound to its start (kept in memory up to 8 MB)
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    write_xlsx(db, out, chunk_size)
+    out.seek(0)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the simulation history of the Traffic Wizard")
+    parser.add_argument("output", help="the file to write")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--db", default=os.path.join("data", "data.db"), help="the database to export")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    junction_store.ensure_schema(args.db)
+    with open(args.output, "wb") as output:
+        export(args.db, args.format, output, args.chunk_size)
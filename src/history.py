@@ -0,0 +1,125 @@
+import base64
+import json
+import os
+
+from src.db_functions import db_functions
+
+PAGE_SIZE = 20 #runs per page of the history
+MAX_PAGE_SIZE = 100
+
+# The columns of a run: its score and whether the junction has a bus lane (any arm with buses) or a pedestrian crossing
+RUN_COLUMNS = """
+    efficiency_score_table.junction_id,
+    efficiency_score_table.create_time,
+    efficiency_score_table.efficiency_score,
+    EXISTS (SELECT 1 FROM arm WHERE arm.junction_id = efficiency_score_table.junction_id AND arm.buses_per_hour != 0) AS bus_lane,
+    COALESCE(junction.has_pedestrian_crossing, 0) != 0 AS pedestrian_crossing
+FROM efficiency_score_table
+LEFT JOIN junction ON junction.junction_id = efficiency_score_table.junction_id"""
+
+
+def encode_cursor(create_time: str, junction_id: str) -> str:
+    """Encode the position of a run in the history as an opaque, url safe cursor"""
+    return base64.urlsafe_b64encode(json.dumps([create_time, junction_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Decode a cursor made by encode_cursor
+
+    Raises:
+        ValueError: The cursor is not one made by encode_cursor
+    """
+    try:
+        create_time, junction_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"invalid cursor {cursor!r}") from e
+    if not isinstance(create_time, str) or not isinstance(junction_id, str):
+        raise ValueError(f"invalid cursor {cursor!r}")
+    return create_time, junction_id
+
+
+def run_dict(row: tuple) -> dict:
+    """A row of RUN_COLUMNS as a dictionary"""
+    junction_id, create_time, efficiency_score, bus_lane, pedestrian_crossing = row
+    return {"junction_id": junction_id, "create_time": create_time, "efficiency_score": efficiency_score,
+            "bus_lane": bool(bus_lane), "pedestrian_crossing": bool(pedestrian_crossing)}
+
+
+def history_page(db: str | os.PathLike, cursor: str | None = None, limit: int = PAGE_SIZE, min_score: int | None = None,
+                 max_score: int | None = None, bus_lane: bool | None = None, pedestrian_crossing: bool | None = None) -> dict:
+    """Read one page of the stored runs, newest first
+
+    Description:
+        Keyset pagination over (create_time, junction_id): a page starts right after the run its cursor points at,
+        which the efficiency_score_history index seeks to directly, so a page deep in the history costs the same
+        as the first one (there is no OFFSET to skip). Filters left as None are not applied.
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        cursor (str): The next_cursor of the previous page, None for the first page
+        limit (int): The number of runs per page, at most MAX_PAGE_SIZE
+        min_score (int): The lowest efficiency score to include
+        max_score (int): The highest efficiency score to include
+        bus_lane (bool): Only include junctions with (True) or without (False) a bus lane
+        pedestrian_crossing (bool): Only include junctions with (True) or without (False) a pedestrian crossing
+
+    Returns:
+        dict: The runs of the page (junction_id, create_time, efficiency_score, bus_lane, pedestrian_crossing)
+        and the cursor of the next page, None if this is the last page
+
+    Raises:
+        ValueError: Invalid cursor or limit
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    conditions = []
+    args = []
+    if cursor is not None:
+        conditions.append("(efficiency_score_table.create_time, efficiency_score_table.junction_id) < (?, ?)")
+        args += decode_cursor(cursor)
+    if min_score is not None:
+        conditions.append("efficiency_score_table.efficiency_score >= ?")
+        args.append(min_score)
+    if max_score is not None:
+        conditions.append("efficiency_score_table.efficiency_score <= ?")
+        args.append(max_score)
+    if bus_lane is not None:
+        conditions.append(("" if bus_lane else "NOT ") + "EXISTS (SELECT 1 FROM arm WHERE arm.junction_id = efficiency_score_table.junction_id AND arm.buses_per_hour != 0)")
+    if pedestrian_crossing is not None:
+        conditions.append(f"(COALESCE(junction.has_pedestrian_crossing, 0) != 0) = {1 if pedestrian_crossing else 0}")
+
+    query = "SELECT" + RUN_COLUMNS
+    if conditions:
+        query += "\nWHERE " + "\nAND ".join(conditions)
+    # One extra row tells whether there is a next page
+    query += "\nORDER BY efficiency_score_table.create_time DESC, efficiency_score_table.junction_id DESC\nLIMIT ?"
+    args.append(limit + 1)
+
+    con = db_functions.get_conn(db)
+    try:
+        rows = con.execute(query, args).fetchall()
+    finally:
+        db_functions.close_conn(con)
+
+    runs = [run_dict(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(runs[-1]["create_time"], runs[-1]["junction_id"]) if len(rows) > limit else None
+    return {"runs": runs, "next_cursor": next_cursor}
+
+
+def get_run(db: str | os.PathLike, junction_id: str) -> dict | None:
+    """Read one stored run
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        junction_id (str): The key of the junction
+
+    Returns:
+        dict: The run as in history_page, or None if there is no run of the junction
+    """
+    con = db_functions.get_conn(db)
+    try:
+        row = con.execute("SELECT" + RUN_COLUMNS + "\nWHERE efficiency_score_table.junction_id = ?", (junction_id,)).fetchone()
+    finally:
+        db_functions.close_conn(con)
+    return run_dict(row) if row is not None else None
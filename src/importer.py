@@ -0,0 +1,174 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from src import junction_store
+from src.db_functions import db_functions
+from src.simulation import createSimulation
+from src.validation import validate_batch, build_junction_info, spec_to_form
+
+BATCH_SIZE = 10000 #rows validated, simulated and inserted per transaction
+
+
+def read_specs(path: str | os.PathLike):
+    """Read the junctions of a survey file
+
+    Description:
+        A .csv file has one junction per row, with the field names of the index page form as its header
+        (e.g. northbound_vph, northbound_north_exit, north_left_lane_count, north_priority, duration).
+        A .jsonl file has one JSON junction spec per line, in the layout of the /api/v1/simulate API.
+        An optional efficiency_score field (column or JSON key) is stored as the score of the junction
+        when it is imported without simulating it. A score that is not an integer is a type error of its line.
+
+    Args:
+        path (str, os.PathLike): The path to the survey file
+
+    Returns:
+        generator: The line number, form fields (dict), score (int or None) and type errors (dict) of every junction
+    """
+    scoreError = {"efficiency_score": "Must be an integer."}
+    if str(path).lower().endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    spec = json.loads(line)
+                except ValueError as e:
+                    yield line_number, {}, None, {"json": f"Invalid JSON: {e}"}
+                    continue
+                form, errors = spec_to_form(spec)
+                score = spec.get("efficiency_score") if isinstance(spec, dict) else None
+                if score is not None and (not isinstance(score, int) or isinstance(score, bool)):
+                    yield line_number, form, None, errors | scoreError
+                    continue
+                yield line_number, form, score, errors
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                score = row.pop("efficiency_score", None)
+                try:
+                    score = int(score) if score not in (None, "") else None
+                except ValueError:
+                    yield line_number, row, None, scoreError
+                    continue
+                yield line_number, row, score, {}
+
+
+def score_junction(formatted_dict: dict) -> float:
+    """Simulate and score one junction, run on the worker processes of the importer
+
+    Args:
+        formatted_dict (dict): The simulation input produced by metaphor
+
+    Returns:
+        float: The efficiency score of the junction
+    """
+    return db_functions.get_efficiency_score(createSimulation(formatted_dict))
+
+
+def read_insert(query: str) -> str:
+    """Read one of the INSERT queries, turned into an INSERT OR IGNORE so junctions that are already stored are skipped"""
+    return db_functions.read_sql_file(query).replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+
+
+def import_junctions(path: str | os.PathLike, db: str | os.PathLike, simulate: bool = False, workers: int | None = None, batch_size: int = BATCH_SIZE) -> dict:
+    """Bulk import the junctions of a survey file into the database
+
+    Description:
+        Junctions are read, validated (validate_batch checks the whole batch at once) and keyed with get_pk batch_size at a time.
+        Each batch is optionally simulated and scored on a process pool, then written with one executemany
+        per table inside a single transaction. Junctions that are already stored are left untouched.
+
+    Args:
+        path (str, os.PathLike): The path to the .csv or .jsonl survey file (see read_specs)
+        db (str, os.PathLike): The path to the database
+        simulate (bool): Simulate and score every junction, otherwise only a score given in the file is stored
+        workers (int): The number of simulation processes, defaults to the number of CPUs
+        batch_size (int): The number of junctions per transaction
+
+    Returns:
+        dict: The number of imported junctions, of valid junctions that were already stored and of invalid (skipped)
+        junctions, and the errors of the skipped ones keyed by line number
+    """
+    folder = os.path.dirname(db)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+    junction_store.ensure_schema(db)
+
+    queries = {query: read_insert(query) for query in ["INSERT_junction.sql", "INSERT_arm.sql", "INSERT_efficiency_score_table.sql"]}
+    summary = {"imported": 0, "already_stored": 0, "skipped": 0, "errors": {}}
+
+    workers = workers or os.cpu_count() or 1
+    con = sqlite3.connect(db)
+    pool = ProcessPoolExecutor(max_workers=workers) if simulate else None
+    try:
+        specs = read_specs(path)
+        while True:
+            batch = list(islice(specs, batch_size))
+            if not batch:
+                break
+
+            # The whole batch is validated at once, junctions with type errors keep those
+            form_errors = validate_batch([form for _, form, _, _ in batch])
+
+            rows = {query: [] for query in queries}
+            formatted = []
+            scores = []
+            for (line_number, form, score, errors), batch_errors in zip(batch, form_errors):
+                errors = errors or batch_errors
+                if errors:
+                    summary["skipped"] += 1
+                    summary["errors"][line_number] = errors
+                    continue
+
+                junction_info = build_junction_info(form)
+                try:
+                    junction_id = db_functions.get_pk(junction_info)
+                except ValueError as e:
+                    # A field the validators leave alone, such as the buses per hour of an arm without a bus lane
+                    summary["skipped"] += 1
+                    summary["errors"][line_number] = {"junction": str(e)}
+                    continue
+                formatted.append(db_functions.metaphor(junction_info))
+                junction, arms = junction_store.junction_rows(junction_id, junction_info)
+                rows["INSERT_junction.sql"].append(junction)
+                rows["INSERT_arm.sql"].extend(arms)
+                scores.append((junction_id, score))
+
+            if simulate:
+                simulated = pool.map(score_junction, formatted, chunksize=max(1, len(formatted) // (4 * workers)))
+                scores = [(junction_id, int(score)) for (junction_id, _), score in zip(scores, simulated)]
+            rows["INSERT_efficiency_score_table.sql"] = [(junction_id, score) for junction_id, score in scores if score is not None]
+
+            with con: #one transaction per batch
+                inserted = con.executemany(queries["INSERT_junction.sql"], rows.pop("INSERT_junction.sql")).rowcount
+                for query, params in rows.items():
+                    con.executemany(queries[query], params)
+            summary["imported"] += inserted
+            summary["already_stored"] += len(scores) - inserted
+    finally:
+        con.close()
+        if pool is not None:
+            pool.shutdown()
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import surveyed junctions into the Traffic Wizard history")
+    parser.add_argument("path", help="the .csv or .jsonl file of junctions")
+    parser.add_argument("--db", default=os.path.join("data", "data.db"), help="the database to import into")
+    parser.add_argument("--simulate", action="store_true", help="simulate and score every junction")
+    parser.add_argument("--workers", type=int, default=None, help="the number of simulation processes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    result = import_junctions(args.path, args.db, args.simulate, args.workers, args.batch_size)
+    for line_number, errors in result["errors"].items():
+        print(f"line {line_number}: {'; '.join(errors.values())}")
+    print(f"imported {result['imported']} junctions, {result['already_stored']} were already stored, skipped {result['skipped']} invalid junctions")
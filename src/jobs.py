@@ -0,0 +1,174 @@
+import configparser
+import json
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from src.db_functions import db_functions
+
+WRITE_ATTEMPTS = 5 #tries of a write to the simulation_job table, which fails while another connection holds the database lock
+RETRY_DELAY = 0.1 #seconds before the second try of a write, doubled before each try after it
+
+
+def configured_workers() -> int:
+    """Read the number of simulation worker threads from the [Jobs] section of system.cfg
+
+    Returns:
+        int: The number of worker threads, 2 if it is not configured
+    """
+    config_path = pathlib.Path(__file__).parent.absolute() / "system.cfg"
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return max(1, config.getint('Jobs', 'workers', fallback=2))
+
+
+class JobQueue:
+    """Background worker pool that runs submitted simulations off the request thread
+
+    Description:
+        Submissions are written to the simulation_job table and put on an in-process queue, so the
+        caller gets a job id back at once. A fixed number of worker threads take jobs off the queue,
+        run the handler and store its result (or error) back in the table, where the results page
+        reads it from. Jobs left queued or running by a previous process are requeued on start.
+
+    Attributes:
+        db (str, os.PathLike): The path to the database holding the simulation_job table
+        handler (callable): The function run for each job, called with the submitted payload; its return value must be JSON serialisable
+        workers (int): The number of worker threads
+    """
+
+    def __init__(self, db: str | os.PathLike, handler, workers: int = 2):
+        self.db = db
+        self.handler = handler
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_table(self) -> None:
+        """Create the data folder and the simulation_job table if they do not exist yet"""
+        folder = os.path.dirname(self.db)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        db_functions.execute_sql_file_noinject(self.db, 'create_job_table.sql')
+
+    def start(self) -> None:
+        """Start the worker threads (once) and requeue unfinished jobs of a previous run"""
+        with self._lock:
+            if self._threads:
+                return
+            self._ensure_table()
+
+            con = db_functions.get_conn(self.db)
+            cur = db_functions.execute_inject_query(con, "SELECT job_id, payload FROM simulation_job WHERE status IN ('queued', 'running') ORDER BY submit_time", False, False)
+            for job_id, payload in cur.fetchall():
+                self._queue.put((job_id, json.loads(payload)))
+            db_functions.close_conn(con)
+
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"simulation-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, payload: dict) -> str:
+        """Record a job and hand it to the workers
+
+        Args:
+            payload (dict): The JSON serialisable input of the handler
+
+        Returns:
+            str: The id of the job
+
+        Raises:
+            sqlite3.DatabaseError: The job could not be recorded
+        """
+        self.start()
+
+        job_id = uuid.uuid4().hex
+        self._write('INSERT_simulation_job.sql', job_id, json.dumps(payload))
+
+        self._queue.put((job_id, payload))
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        """Look up a job
+
+        Args:
+            job_id (str): The id returned by submit
+
+        Returns:
+            dict: The job_id, status, result and error of the job, or None if there is no such job
+        """
+        con = db_functions.get_conn(self.db)
+        cur = db_functions.execute_inject_query(con, "SELECT job_id, status, result, error FROM simulation_job WHERE job_id = ?", False, False, job_id)
+        row = cur.fetchone() if cur != "fail" else None
+        db_functions.close_conn(con)
+
+        if row is None:
+            return None
+        return {"job_id": row[0], "status": row[1], "result": json.loads(row[2]) if row[2] else None, "error": row[3]}
+
+    def wait(self, job_id: str, timeout: float = 60.0, interval: float = 0.05) -> dict | None:
+        """Block until a job has finished
+
+        Args:
+            job_id (str): The id returned by submit
+            timeout (float): The maximum number of seconds to wait
+            interval (float): The number of seconds between checks
+
+        Returns:
+            dict: The job as returned by get, which is still queued or running if the timeout was reached
+        """
+        deadline = time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and job["status"] in ("queued", "running") and time.monotonic() < deadline:
+            time.sleep(interval)
+            job = self.get(job_id)
+        return job
+
+    def drain(self) -> None:
+        """Block until every job submitted so far has been run"""
+        self._queue.join()
+
+    def _write(self, query: str, *args) -> None:
+        """Run a write to the simulation_job table, trying again while it fails
+
+        Args:
+            query (str): The sql query, or the name of its .sql file
+            *args (any, ...): The injection arguments
+
+        Raises:
+            sqlite3.DatabaseError: The write still failed after WRITE_ATTEMPTS tries
+        """
+        for attempt in range(WRITE_ATTEMPTS):
+            if attempt:
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+            con = db_functions.get_conn(self.db)
+            cur = db_functions.execute_inject_query(con, query, False, False, *args)
+            db_functions.close_conn(con)
+            if cur != "fail": #execute_inject_query rolls back and returns "fail" instead of raising
+                return
+        raise sqlite3.DatabaseError(f"Could not write to the simulation_job table of {self.db}")
+
+    def _set_status(self, job_id: str, query: str, *args) -> None:
+        self._write(query, *args, job_id)
+
+    def _work(self) -> None:
+        """Worker thread loop: run queued jobs and store their outcome"""
+        while True:
+            job_id, payload = self._queue.get()
+            try:
+                self._set_status(job_id, "UPDATE simulation_job SET status = 'running', start_time = CURRENT_TIMESTAMP WHERE job_id = ?")
+                result = self.handler(payload)
+                self._set_status(job_id, "UPDATE simulation_job SET status = 'done', result = ?, finish_time = CURRENT_TIMESTAMP WHERE job_id = ?", json.dumps(result))
+            except Exception as e:
+                try:
+                    self._set_status(job_id, "UPDATE simulation_job SET status = 'failed', error = ?, finish_time = CURRENT_TIMESTAMP WHERE job_id = ?", repr(e))
+                except sqlite3.DatabaseError:
+                    pass #the job stays unfinished in the table, and is requeued when the queue next starts
+            finally:
+                self._queue.task_done()
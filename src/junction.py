@@ -3,6 +3,7 @@ import math
 import pathlib
 from src.direction import Direction
 from src.lane import laneOrdering
+from src.vehicle import VEHICLE_CLASSES, classPattern, parseClassMix, parseVehicleClass
 
 class Junction:
     """The class object containing all of the junction information
@@ -17,15 +18,33 @@ class Junction:
         pedestrianCrossingTime(float): the time of a pedestrian crossing in seconds
         minimumGreenTime(float): the minimum amount of time that a green light is on
         vehicleLength(float): the average length of a vehicle in metres
+        memoryBudget(int): the number of bytes the queues of a run may take before it is stopped as saturated, 0 for no budget
+        queueSampleInterval(float): the seconds between samples of the queue length of every lane, 0 to not sample them
+        queueSeriesPoints(int): the most points the queue series of a lane is downsampled to
+        intergreenTime(float): the amber and all-red time between the green lights of two phases
+        startUpLostTime(float): the time a standing queue takes to start moving once its light turns green
+        saturationHeadways(tuple): the headways of the first vehicles of a standing queue, after which they leave every vehicleLength / trafficSpeed
+        actuated(Bool): whether the green lights follow the traffic (see setActuation in simulation.py) rather than being fixed
+        actuatedMinGreen(float): the default min green of a direction under actuated control
+        actuatedMaxGreen(float): the default max green of a direction under actuated control
+        actuatedPassageTime(float): the default passage time of a direction under actuated control
+        classLeaveTimes(tuple): the time a queued vehicle of each class in VEHICLE_CLASSES takes to leave, its length over its speed
+        classMix(Dictionary): the share of each class of the vehicles of a movement, keyed 'L', 'S' and 'R' and 'CB' for the cycle or bus lanes
+        phasePlan(tuple): how the lanes of each direction run on a green light, set once the lights are (see compilePhasePlan in simulation.py)
 
     Methods:
         __init__(self, inputInformation): initialises the Junction object
-        distributeVehicles(self): distributes vehicles within each direction to the lanes
+        distributeVehicles(self, distributions): distributes vehicles within each direction to the lanes
+        directionHighFlows(self): the highest lane flow of each direction, that the priority is calculated from
         calculateDirectionPriority(self): given the distribution of traffic calculate the priority for each direction
+        assignVehicleClasses(self): gives every lane the classes of its vehicles from the mix of its movements
 
     Notes:
         pedCrossPH, lastCrossingTime and pedestrianCrossingTime are only set if isPedestrianCrossing is equal to True.
-        trafficSpeed, pedestrianCrossingTime, minimumGreenTime and vehicleLength are set using the system.cfg file.
+        trafficSpeed, pedestrianCrossingTime, minimumGreenTime, vehicleLength, memoryBudget, queueSampleInterval,
+        queueSeriesPoints, intergreenTime, startUpLostTime, saturationHeadways, the actuated defaults, classLeaveTimes and
+        classMix are set using the system.cfg file. A car is vehicleLength long and leaves at trafficSpeed, the other classes
+        are set in its VehicleClasses section.
 
     """
 
@@ -48,6 +67,8 @@ class Junction:
         self.directions['west'] = Direction(inputInformation[8], 'west', laneOrdering(inputInformation[4]))  # creates the direction for west
 
         self.priorityNums = None  # an array with the priorities of the junction directions
+        self.actuated = False  # the lights run on fixed times unless setActuation is called
+        self.phasePlan = None  # how the lanes of each direction run on a green light, compiled before the simulation runs
 
         self.isPedestrianCrossing = inputInformation[11]  # store whether or not this direction contains a pedestrian crossing
         if (self.isPedestrianCrossing == True):
@@ -58,6 +79,22 @@ class Junction:
             self.trafficSpeed = float(config.get('Settings', 'traffic_speed'))
             self.minimumGreenTime = float(config.get('Settings', 'minimum_green_light_time'))
             self.vehicleLength = float(config.get('Settings', 'vehicle_length'))
+            self.memoryBudget = config.getint('Settings', 'queue_memory_budget_mb', fallback=0) * 1024 * 1024
+            self.queueSampleInterval = config.getfloat('Settings', 'queue_sample_interval', fallback=0.0)
+            self.queueSeriesPoints = config.getint('Settings', 'queue_series_points', fallback=240)
+            self.intergreenTime = config.getfloat('Settings', 'intergreen_time', fallback=0.0)
+            self.startUpLostTime = config.getfloat('Settings', 'start_up_lost_time', fallback=0.0)
+            self.saturationHeadways = tuple(float(headway) for headway in config.get('Settings', 'saturation_headways', fallback='').split(',') if headway.strip())
+            if self.intergreenTime < 0 or self.startUpLostTime < 0 or any(headway <= 0 for headway in self.saturationHeadways):
+                raise ValueError("the intergreen time, start-up lost time and saturation headways cannot be negative")
+            self.actuatedMinGreen = config.getfloat('Settings', 'actuated_min_green', fallback=self.minimumGreenTime)
+            self.actuatedMaxGreen = config.getfloat('Settings', 'actuated_max_green', fallback=4 * self.minimumGreenTime)
+            self.actuatedPassageTime = config.getfloat('Settings', 'actuated_passage_time', fallback=3.0)
+            classes = [(self.vehicleLength, self.trafficSpeed)]
+            classes += [parseVehicleClass(config.get('VehicleClasses', name, fallback=default)) for name, default in zip(VEHICLE_CLASSES[1:], ['12, 4', '16, 4', '2, 4'])]
+            self.classLeaveTimes = tuple(length / speed for length, speed in classes)
+            self.classMix = {movement: parseClassMix(config.get('VehicleClasses', key, fallback=default)) for movement, key, default in
+                             [('L', 'left_mix', 'car: 1'), ('S', 'straight_mix', 'car: 1'), ('R', 'right_mix', 'car: 1'), ('CB', 'bus_lane_mix', 'bus: 1')]}
 
 
             if inputInformation[11] == True:  # checks whether there is a pedestrian crossing
@@ -66,27 +103,59 @@ class Junction:
             raise Exception(
                 "There is a formatting error within the system.cfg file, please correct before system use.")
 
-    def distributeVehicles(self):
+    def distributeVehicles(self, distributions=None):
         """
         Distributes the vehicles within each direction of the junction to provide optimal traffic flow
 
         Args:
             self: the junction that the lanes are in
+            distributions(Dictionary): optional cache of lane distributions keyed by the flows and lane layout of a direction, directions
+                found in it reuse the cached lane flows and the others are distributed and added to it (None distributes every direction)
         """
-        self.directions['north'].distributeVehiclesByLane()
-        self.directions['east'].distributeVehiclesByLane()
-        self.directions['south'].distributeVehiclesByLane()
-        self.directions['west'].distributeVehiclesByLane()
+        for direction in self.directions.values():
+            if distributions is None:
+                direction.distributeVehiclesByLane()
+                continue
+
+            key = (tuple(direction.VPHFlowDirections), tuple(direction.laneLayout))
+            if key in distributions:
+                direction.setLaneFlows(distributions[key])
+            else:
+                direction.distributeVehiclesByLane()
+                distributions[key] = direction.laneFlows()
+        self.assignVehicleClasses()
+
+    def assignVehicleClasses(self):
+        """
+        Gives every lane the repeating order of the classes of its vehicles, from its flow of each movement and the classMix of
+        the movement, and the mean time its queued vehicles take to leave
 
-    def calculateDirectionPriority(self):
+        Args:
+            self(Junction): the junction, its vehicles must already be distributed
         """
-        This calculates which directions have the highest VPH and returns a priority ranking based on those VPH
+        for direction in self.directions.values():
+            for laneType, lanes in direction.lanes.items():
+                for lane in lanes:
+                    if laneType == 'CB':
+                        weights = self.classMix['CB']
+                    else:
+                        weights = [sum(flow * self.classMix[movement][vehicleClass] for flow, movement in zip(lane.directionFlow, 'LSR'))
+                                   for vehicleClass in range(len(VEHICLE_CLASSES))]
+                    lane.classPattern = classPattern(weights)
+                    if len(lane.classPattern) == 1:
+                        lane.dischargeTime = self.classLeaveTimes[lane.classPattern[0]]
+                    else:
+                        lane.dischargeTime = sum(self.classLeaveTimes[vehicleClass] for vehicleClass in lane.classPattern) / len(lane.classPattern)
+
+    def directionHighFlows(self):
+        """
+        Finds the highest lane VPH of each direction, which calculateDirectionPriority ranks the directions by
 
         Args:
             self(Junction): the junction which contains all of the directions
 
         Returns:
-            array(int): an array storing the priority of the directions in the order [North, East, South, West]
+            array(int): an array storing the highest lane flow of each direction in the order [North, East, South, West]
         """
         directionHighFlows = []  # an array to store the highest flows of each direction in the order [North, East, South, West]
 
@@ -99,6 +168,20 @@ class Junction:
 
             directionHighFlows.append(maxVPH)  # adds the maxVPH to directionHighFlows
 
+        return directionHighFlows
+
+    def calculateDirectionPriority(self):
+        """
+        This calculates which directions have the highest VPH and returns a priority ranking based on those VPH
+
+        Args:
+            self(Junction): the junction which contains all of the directions
+
+        Returns:
+            array(int): an array storing the priority of the directions in the order [North, East, South, West]
+        """
+        directionHighFlows = self.directionHighFlows()  # the highest flows of each direction in the order [North, East, South, West]
+
 
         if all(flow == 0 for flow in directionHighFlows):
             return [1, 1, 1, 1]
@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import threading
+
+from src.db_functions import db_functions
+from src.timeseries import packQueueSeries, unpackQueueSeries
+from src.validation import ARMS
+
+# The lane columns of the arm table, in table order (junction_info holds them as <arm>_<column>)
+ARM_LANE_COLUMNS = ["left_right_lane", "left_right_straight_lane", "left_lane_count", "right_lane_count", "straight_right_lane_count",
+                    "straight_left_lane_count", "straight_lane_count", "priority", "buses_per_hour"]
+EXIT_DIRECTIONS = ["north", "east", "south", "west"]
+# The tables that hold a row per junction_id, in the order they are re-keyed
+KEYED_TABLES = ["junction", "arm", "efficiency_score_table", "queue_series", "traffic_simulation_result", "traffic_light_sequence", "worst_junctions"]
+KEY_VERSION = 1 #the PRAGMA user_version of a database whose junctions are all keyed by the current get_pk
+
+# The paths of the databases ensure_schema has brought up to date in this process. The lock also keeps two threads from
+# migrating the same database at once
+_ensured = set()
+_ensure_lock = threading.Lock()
+
+
+def schema_type(db: str | os.PathLike, name: str) -> str | None:
+    """Look up what kind of schema object a name is
+
+    Args:
+        db (str, os.PathLike): The path to the database
+        name (str): The name of the table, view, index or trigger
+
+    Returns:
+        str: table, view, index or trigger, or None if there is nothing of that name
+    """
+    con = db_functions.get_conn(db)
+    try:
+        row = con.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    finally:
+        db_functions.close_conn(con)
+    return row[0] if row is not None else None
+
+
+def is_legacy(db: str | os.PathLike) -> bool:
+    """Check whether a database still stores junctions in the wide junction_config and traffic_flow_<arm> tables
+
+    Args:
+        db (str, os.PathLike): The path to the database
+
+    Returns:
+        bool: True if junction_config is a table rather than the compatibility view
+    """
+    return schema_type(db, "junction_config") == "table"
+
+
+def ensure_schema(db: str | os.PathLike) -> bool:
+    """Create the tables of the simulation history, migrating a database in the old layout
+
+    Description:
+        Runs create_table.sql, then, if junction_config is still a table, migrate_junction_arm.sql to move
+        its rows and those of the traffic_flow_<arm> tables into the junction and arm tables (in one
+        transaction), then create_views.sql for the compatibility views and, the first time, create_dashboard.sql
+        for the summary tables of the dashboard. Junctions stored under an older key are then re-keyed (see rekey_junctions).
+        Each database is only checked once per process, later calls return at once.
+
+    Args:
+        db (str, os.PathLike): The path to the database
+
+    Returns:
+        bool: True if the database was migrated
+    """
+    path = os.path.realpath(db)
+    with _ensure_lock:
+        if path in _ensured and os.path.exists(path):
+            return False
+        db_functions.execute_sql_file_noinject(db, "create_table.sql")
+        migrated = is_legacy(db)
+        if migrated:
+            db_functions.execute_sql_file_noinject(db, "migrate_junction_arm.sql")
+        db_functions.execute_sql_file_noinject(db, "create_views.sql")
+        if schema_type(db, "efficiency_score_dashboard_delete") is None:
+            db_functions.execute_sql_file_noinject(db, "create_dashboard.sql")
+        rekey_junctions(db)
+        _ensured.add(path)
+        return migrated
+
+
+def rekey_junctions(db: str | os.PathLike) -> int:
+    """Move the junctions stored under the 64 character keys of the old get_pk to their current key
+
+    Description:
+        The junction information is rebuilt from the junction and arm rows (load_junction_info) and keyed again with get_pk,
+        then every row of the junction in KEYED_TABLES is moved to the new key in one transaction. A junction that has
+        already been stored again under its new key keeps those rows, and the old ones are deleted. The database is then
+        marked with KEY_VERSION, so later calls only read PRAGMA user_version.
+
+    Args:
+        db (str, os.PathLike): The path to the database, whose schema is up to date
+
+    Returns:
+        int: The number of junctions that were re-keyed
+    """
+    con = db_functions.get_conn(db)
+    try:
+        if con.execute("PRAGMA user_version").fetchone()[0] >= KEY_VERSION:
+            return 0
+        tables = [table for table in KEYED_TABLES if con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()]
+        old_ids = [row[0] for row in con.execute("SELECT junction_id FROM junction WHERE length(junction_id) != ?", (2 * db_functions.KEY_SIZE,))]
+        with con:
+            for old_id in old_ids:
+                new_id = db_functions.get_pk(load_junction_info(con, old_id))
+                if con.execute("SELECT 1 FROM junction WHERE junction_id = ?", (new_id,)).fetchone() is not None:
+                    for table in tables:
+                        con.execute(f"DELETE FROM {table} WHERE junction_id = ?", (old_id,))
+                else:
+                    for table in tables:
+                        con.execute(f"UPDATE {table} SET junction_id = ? WHERE junction_id = ?", (new_id, old_id))
+            con.execute(f"PRAGMA user_version = {KEY_VERSION}")
+    finally:
+        db_functions.close_conn(con)
+    return len(old_ids)
+
+
+def junction_rows(junction_id: str, junction_info: dict) -> tuple[tuple, list[tuple]]:
+    """The rows a junction is stored as
+
+    Args:
+        junction_id (str): The primary key of the junction (get_pk)
+        junction_info (dict): The junction information after metaphor has normalised it
+
+    Returns:
+        tuple: The parameters of INSERT_junction.sql and the list of parameters of INSERT_arm.sql, one per arm
+    """
+    junction = (junction_id, junction_info["pedestrian_crossing"], junction_info["crossing_requests_PH"], junction_info["crossing_requests_duration"])
+    arms = []
+    for arm, (bound, exits, _) in ARMS.items():
+        flows = [junction_info[f"{bound}_{direction}_exit"] if direction in exits else None for direction in EXIT_DIRECTIONS]
+        lanes = [junction_info[f"{arm}_{column}"] for column in ARM_LANE_COLUMNS]
+        arms.append((junction_id, arm, junction_info[f"{bound}_vph"], *flows, *lanes))
+    return junction, arms
+
+
+def store_junction(con: sqlite3.Connection, junction_id: str, junction_info: dict) -> bool:
+    """Store a junction and its four arms in one transaction
+
+    Args:
+        con (sqlite3.Connection): The connection to the database
+        junction_id (str): The primary key of the junction (get_pk)
+        junction_info (dict): The junction information after metaphor has normalised it
+
+    Returns:
+        bool: True if the junction was stored, False if it was already stored
+    """
+    junction, arms = junction_rows(junction_id, junction_info)
+    try:
+        with con:
+            con.execute(db_functions.read_sql_file("INSERT_junction.sql"), junction)
+            con.executemany(db_functions.read_sql_file("INSERT_arm.sql"), arms)
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+
+def store_queue_series(con: sqlite3.Connection, junction_id: str, output: dict) -> bool:
+    """Store the queue series of a run of a junction, replacing those of its previous run
+
+    Args:
+        con (sqlite3.Connection): The connection to the database
+        junction_id (str): The primary key of the junction (get_pk)
+        output (dict): The output of createSimulation
+
+    Returns:
+        bool: True if the series were stored, False if the output has none (queue_sample_interval is 0)
+    """
+    blob = packQueueSeries(output)
+    if blob is None:
+        return False
+    with con:
+        con.execute(db_functions.read_sql_file("INSERT_queue_series.sql"), (junction_id, blob))
+    return True
+
+
+def load_queue_series(con: sqlite3.Connection, junction_id: str) -> dict | None:
+    """Load the queue series stored by store_queue_series
+
+    Args:
+        con (sqlite3.Connection): The connection to the database
+        junction_id (str): The primary key of the junction
+
+    Returns:
+        dict: The series of every lane, keyed by direction then lane number as in the output, or None if none are stored
+    """
+    row = con.execute(db_functions.read_sql_file("SELECT_queue_series.sql"), (junction_id,)).fetchone()
+    return unpackQueueSeries(row[0]) if row is not None else None
+
+
+def load_junction_info(con: sqlite3.Connection, junction_id: str) -> dict | None:
+    """Load a stored junction back into the junction information the simulation is run from
+
+    Args:
+        con (sqlite3.Connection): The connection to the database
+        junction_id (str): The primary key of the junction
+
+    Returns:
+        dict: The junction information (as built from the index page form), or None if the junction is not stored
+    """
+    rows = con.execute(db_functions.read_sql_file("SELECT_junction.sql"), (junction_id,)).fetchall()
+    if not rows:
+        return None
+
+    junction_info = {}
+    for direction, vehicles_per_hour, *values in rows:
+        flows = dict(zip(EXIT_DIRECTIONS, values[:4]))
+        lanes = dict(zip(ARM_LANE_COLUMNS, values[4:13]))
+        bound, exits, _ = ARMS[direction]
+
+        junction_info[f"{bound}_vph"] = vehicles_per_hour
+        for exit_direction in exits:
+            junction_info[f"{bound}_{exit_direction}_exit"] = flows[exit_direction]
+        # Bus lanes are not stored, an arm has one when it has buses
+        junction_info[f"{direction}_bus_lane"] = 1 if lanes["buses_per_hour"] != 0 else 0
+        junction_info[f"{direction}_cycle_lane"] = 0
+        for column, value in lanes.items():
+            junction_info[f"{direction}_{column}"] = value
+
+    junction_info["pedestrian_crossing"], junction_info["crossing_requests_PH"], junction_info["crossing_requests_duration"] = rows[0][-3:]
+    return junction_info
@@ -1,5 +1,6 @@
 import math
-from queue import Queue
+from src.sketch import QuantileSketch
+from src.vehicle import VehicleQueue
 def laneOrdering(lanes):
     """
     Description: Orders the array of lanes into the correct order
@@ -27,14 +28,23 @@ class Lane:
         maxQueue(int): the longest queue of vehicles in this lane
         maxWait(float): the longest wait of a vehicle in this lane
         numCarsPassed(int): the number of vehicles that have passed through this lane
-        cars(Queue(Vehicle)): the queue of vehicle objects
+        cars(VehicleQueue): the queue of vehicles
         newCarRate(float): how long is takes for a car to enter the lane
         lightTime(float): the time that the light of this lane will be on for
         totalWait(float): the total wait time of all vehicles in this lane
+        waits(QuantileSketch): the percentiles of the wait of the vehicles that have passed through this lane
+        traceId(int): the number of the lane in a vehicle trace, set when the run is traced
+        series(QueueSeries): the queue length sampled over the simulation, None when it is not sampled
+        direction(Direction): the direction the lane belongs to, whose count of queued vehicles the lane adds to
+        classPattern(bytes): the repeating order of the class codes of the vehicles arriving in the lane (see classPattern in vehicle.py)
+        dischargeTime(float): the mean time a queued vehicle of the lane takes to leave, from the classes of its pattern
 
     Methods:
         getQueueSize(self): gives the size of the queue in the lane
         updateDirectionFlow(self, flow, flowType, updateType): Sets the flow of the lane and the newCarRate based on the new flow
+        sampleQueueUntil(self, time): Samples the queue up to a time, counting the vehicles that have arrived but not yet been queued
+        arrivalClass(self, time): The class code of the vehicle arriving in the lane at a time
+        gapOutTime(self, greenStart, dischargeTime, passageTime): The time an actuated green light for this lane would gap out
     """
 
     def __init__(self):
@@ -48,10 +58,16 @@ class Lane:
         self.maxQueue = -math.inf  # the maximum length of the queue in this lane
         self.maxWait = -math.inf  # the maximum wait time for a vehicle in this lane
         self.numCarsPassed = 0  # the number of cars that have passed through this lane
-        self.cars = Queue()  # the queue that will store all of the vehicles
+        self.cars = VehicleQueue()  # the queue that will store all of the vehicles
         self.newCarRate = 0  # the # of seconds between cars entering this lane
         self.lightTime = 0  # the time that the green light will be on
         self.totalWait = 0.0
+        self.waits = QuantileSketch()  # the sketch of the wait time of every vehicle that has passed through
+        self.traceId = None  # the lane id of the records of this lane in a vehicle trace
+        self.series = None  # the sampled queue length, set by runSimulation
+        self.direction = None  # the direction of the lane, set by the direction when it creates the lane
+        self.classPattern = bytes(1)  # every vehicle is a car until the junction assigns the classes
+        self.dischargeTime = None  # set with the classPattern
 
     def getQueueSize(self):
         """
@@ -65,6 +81,95 @@ class Lane:
         """
         return self.cars.qsize()  # return the size of the queue in the lane
 
+    def sampleQueueUntil(self, time):
+        """
+        Description: Samples the queue at every tick of the series before the time, counting the vehicles that have arrived
+        but that the simulation has not queued yet, without queueing them
+
+        Args:
+            time(float): the time to sample up to
+        """
+        if self.series is None:
+            return
+
+        size = self.cars.qsize()
+        if self.totalFlow != 0:
+            #the arrival times are added up as processWaitingVehiclesLane adds them, so they are exactly the same
+            arrival = self.newCarRate if self.lastCarTime == 0.0 else self.lastCarTime + self.newCarRate
+            while arrival < time and self.series.nextTime < min(time, self.series.endTime):
+                self.series.advance(arrival, size)
+                size += 1
+                arrival += self.newCarRate
+        self.series.advance(time, size)
+
+    def arrivalClass(self, time):
+        """
+        Description: The class code of the vehicle arriving in the lane at a time
+
+        Args:
+            time(float): the arrival time, one of the times the simulation adds up newCarRate at a time
+
+        Returns:
+            int: the class code, from the number of vehicles that arrived before it and the classPattern
+        """
+        if len(self.classPattern) == 1:
+            return self.classPattern[0]
+        return self.classPattern[(round(time / self.newCarRate) - 1) % len(self.classPattern)]
+
+    def gapOutTime(self, greenStart, dischargeTime, passageTime):
+        """
+        Description: The time at which a green light starting at greenStart would first see no vehicle cross the lane for
+        passageTime seconds, worked out from the queue and the next arrival rather than by stepping through the green
+
+        Args:
+            greenStart(float): the time the green light starts, every vehicle that arrived before it is queued
+            dischargeTime(float): the time a queued vehicle takes to cross once the one in front of it has
+            passageTime(float): the longest gap between vehicles that keeps the light green
+
+        Returns:
+            float: the time of the gap-out, math.inf if vehicles arrive too closely for there ever to be a gap
+
+        Notes:
+            The queue discharges one vehicle every dischargeTime and takes in the arrivals of the lane meanwhile, so it
+            clears after the first n vehicles with n equal to the queue plus the vehicles that arrived before the n-th left.
+            That count never rises by more than one for each vehicle that leaves, so it is found from its closed form with a
+            few steps of correction. Once the queue has cleared, the vehicles cross as they arrive, one newCarRate apart.
+        """
+        queued = self.cars.qsize()
+        if self.totalFlow == 0:
+            nextArrival = math.inf #no vehicle will arrive
+        else:
+            nextArrival = self.newCarRate if self.lastCarTime == 0.0 else self.lastCarTime + self.newCarRate
+
+        lastCrossing = greenStart
+        if queued != 0:
+            if nextArrival != math.inf and self.newCarRate <= dischargeTime:
+                return math.inf #vehicles arrive at least as fast as the queue discharges, so it never clears
+
+            def arrivedBefore(left):
+                #the vehicles that arrive before the left-th queued vehicle crosses
+                crossing = greenStart + left * dischargeTime
+                return 0 if nextArrival >= crossing else math.ceil((crossing - nextArrival) / self.newCarRate)
+
+            left = queued
+            if nextArrival != math.inf:
+                ratio = dischargeTime / self.newCarRate
+                left = max(queued, math.floor((queued + (greenStart - nextArrival) / self.newCarRate) / (1 - ratio)))
+            while queued + arrivedBefore(left) > left:
+                left += 1
+            while left > queued and queued + arrivedBefore(left - 1) <= left - 1:
+                left -= 1
+
+            lastCrossing = greenStart + left * dischargeTime
+            if nextArrival != math.inf:
+                nextArrival += arrivedBefore(left) * self.newCarRate #the first vehicle to arrive after the queue has cleared
+
+        if nextArrival - lastCrossing > passageTime:
+            return lastCrossing + passageTime
+        if self.newCarRate <= passageTime:
+            return math.inf #every vehicle arrives within the passage time of the one before
+        return nextArrival + passageTime
+
     def updateDirectionFlow(self, flow, flowType, updateType):
         """
         Description: Sets the flow of the lane and the newCarRate based on the new flow
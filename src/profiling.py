@@ -0,0 +1,172 @@
+import configparser
+import os
+import pathlib
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_NULL_PHASE = nullcontext() #shared no-op context used when profiling is disabled
+
+
+def isEnabled():
+    """
+    Description: Checks whether profiling has been switched on, either through the TRAFFIC_WIZARD_PROFILE environment variable or the system.cfg file
+
+    Returns:
+        bool: True if simulation requests should be profiled, False otherwise
+    """
+    envValue = os.environ.get('TRAFFIC_WIZARD_PROFILE') #the environment variable takes precedence over the config file
+    if envValue is not None:
+        return envValue.strip().lower() in ('1', 'true', 'yes', 'on')
+
+    config_path = pathlib.Path(__file__).parent.absolute() / "system.cfg"
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return config.getboolean('Profiling', 'enabled', fallback=False)
+
+
+def timePhase(profiler, name):
+    """
+    Description: Returns a context manager timing the named phase, or a shared no-op context if there is no profiler
+
+    Args:
+        profiler(Profiler): the profiler of the current request (None when profiling is disabled)
+        name(string): the name of the phase being timed
+
+    Returns:
+        ContextManager: the context manager to wrap the phase in
+    """
+    if profiler is None:
+        return _NULL_PHASE
+    return profiler.phase(name)
+
+
+class Profiler:
+    """
+    Description: Lightweight collection of wall-clock timers and counters for a single simulation request
+
+    Attributes:
+        timings(Dictionary): the total wall time in seconds spent in each named phase
+        counters(Dictionary): the totals of each named counter
+
+    Methods:
+        phase(self, name): context manager adding the time spent inside it to the named phase
+        addTime(self, name, seconds): adds an externally measured time to the named phase
+        count(self, name, amount): adds the amount to the named counter
+        asDict(self): returns a copy of the timings and counters
+    """
+
+    def __init__(self):
+        """
+        Description: Initialises the profiler with no recorded phases or counters
+        """
+        self.timings = {}
+        self.counters = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Description: Times the code run inside the context and adds it to the named phase
+
+        Args:
+            name(string): the name of the phase
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.addTime(name, time.perf_counter() - start)
+
+    def addTime(self, name, seconds):
+        """
+        Description: Adds a measured time to the named phase
+
+        Args:
+            name(string): the name of the phase
+            seconds(float): the wall time to add
+        """
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        """
+        Description: Adds to the named counter
+
+        Args:
+            name(string): the name of the counter
+            amount(int): the amount to add to the counter
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def asDict(self):
+        """
+        Description: Packages the recorded information into a dictionary
+
+        Returns:
+            Dictionary: {'timings': {phase: seconds}, 'counters': {counter: total}}
+        """
+        return {'timings': dict(self.timings), 'counters': dict(self.counters)}
+
+
+class MetricsRegistry:
+    """
+    Description: Thread-safe aggregate of the profiles of every request, used by the /metrics endpoint
+
+    Attributes:
+        requests(int): the number of profiles that have been recorded
+        timings(Dictionary): per phase dictionary of the total, count and max wall time
+        counters(Dictionary): the totals of each named counter across all requests
+
+    Methods:
+        record(self, profiler): adds a request's profile to the aggregate
+        snapshot(self): returns a copy of the aggregate including the mean time of each phase
+        reset(self): clears the aggregate
+    """
+
+    def __init__(self):
+        """
+        Description: Initialises an empty registry
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Description: Clears all of the recorded information
+        """
+        with self._lock:
+            self.requests = 0
+            self.timings = {}
+            self.counters = {}
+
+    def record(self, profiler):
+        """
+        Description: Adds the timings and counters of a request to the aggregate
+
+        Args:
+            profiler(Profiler): the profiler of the finished request
+        """
+        with self._lock:
+            self.requests += 1
+            for name, seconds in profiler.timings.items():
+                phase = self.timings.setdefault(name, {'total': 0.0, 'count': 0, 'max': 0.0})
+                phase['total'] += seconds
+                phase['count'] += 1
+                phase['max'] = max(phase['max'], seconds)
+            for name, amount in profiler.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """
+        Description: Returns a copy of the aggregate that is safe to serialise
+
+        Returns:
+            Dictionary: the number of requests, the per phase timings (with mean) and the counters
+        """
+        with self._lock:
+            timings = {}
+            for name, phase in self.timings.items():
+                timings[name] = dict(phase, mean=phase['total'] / phase['count'])
+            return {'requests': self.requests, 'timings': timings, 'counters': dict(self.counters)}
+
+
+metrics = MetricsRegistry() #the process wide registry read by the /metrics endpoint
@@ -0,0 +1,86 @@
+import configparser
+import pathlib
+import threading
+from collections import OrderedDict
+
+
+def configured_size() -> int:
+    """Read the number of simulation results kept in memory from the [Results] section of system.cfg
+
+    Returns:
+        int: The maximum number of stored results, 128 if it is not configured
+    """
+    config_path = pathlib.Path(__file__).parent.absolute() / "system.cfg"
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return max(1, config.getint('Results', 'cache_size', fallback=128))
+
+
+class ResultStore:
+    """Thread-safe, size bounded store of simulation results
+
+    Description:
+        Replaces the module level output_dictionary of the app, so concurrent requests no longer
+        overwrite each other's results. Results are keyed by junction (or job) id and the least
+        recently used entry is dropped once max_size entries are stored, which keeps the memory
+        of a long running server bounded. Each process of a multi-process server has its own
+        store; anything that must be shared between processes lives in the database.
+
+    Attributes:
+        max_size (int): The maximum number of stored results
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key: str, result) -> None:
+        """Store a result, dropping the least recently used one if the store is full
+
+        Args:
+            key (str): The junction or job id the result belongs to
+            result: The result to store
+        """
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def get(self, key: str, default=None):
+        """Look up a result
+
+        Args:
+            key (str): The junction or job id the result belongs to
+            default: The value returned if there is no result for the key
+
+        Returns:
+            The stored result, or default if it is not (or no longer) stored
+        """
+        with self._lock:
+            if key not in self._results:
+                return default
+            self._results.move_to_end(key)
+            return self._results[key]
+
+    def pop(self, key: str, default=None):
+        """Remove a result and return it
+
+        Args:
+            key (str): The junction or job id the result belongs to
+            default: The value returned if there is no result for the key
+
+        Returns:
+            The removed result, or default if it was not stored
+        """
+        with self._lock:
+            return self._results.pop(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
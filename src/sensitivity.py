@@ -0,0 +1,182 @@
+import argparse
+import configparser
+import json
+import os
+import pathlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from src.db_functions import db_functions
+from src.simulation import createSimulation, IncrementalSimulation
+from src.validation import validate_form, build_junction_info, spec_to_form
+
+ARMS = ["north", "east", "south", "west"] #in the order of the simulation input, lanes under 1-4 and VPHFlowDirections under 5-8
+MOVEMENTS = ["left", "straight", "right"] #in the order of VPHFlowDirections
+INCREASES = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50] #percentage increases of a movement's vph
+MAX_INCREASES = 20 #the most increases one analysis may sweep, each is a simulation per movement
+METRICS = ["avgWait", "maxQueue", "efficiency_score"]
+
+
+_pool = None #the process pool shared by every analysis of this process, see shared_pool
+_pool_lock = threading.Lock()
+
+
+def configured_workers() -> int:
+    """Read the number of simulation processes shared by the analyses from the [Sensitivity] section of system.cfg
+
+    Returns:
+        int: The number of processes, 2 if it is not configured
+    """
+    config_path = pathlib.Path(__file__).parent.absolute() / "system.cfg"
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return max(1, config.getint('Sensitivity', 'workers', fallback=2))
+
+
+def shared_pool() -> ProcessPoolExecutor:
+    """The process pool that the analyses of this process share, started on first use
+
+    Description:
+        Every analysis submits its curves to the same pool, so concurrent requests queue for a fixed number of
+        processes rather than each starting a pool of its own.
+
+    Returns:
+        ProcessPoolExecutor: The pool, with configured_workers processes
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=configured_workers())
+        return _pool
+
+
+def formatted_spec(spec: dict) -> tuple[dict | None, dict]:
+    """Validate a JSON junction spec of the API and turn it into the simulation input
+
+    Args:
+        spec (dict): The junction spec, see validation.spec_to_form for its layout
+
+    Returns:
+        tuple: The simulation input produced by metaphor (None if the spec is invalid) and the validation errors
+    """
+    form, errors = spec_to_form(spec)
+    if not errors:
+        errors = validate_form(form)
+    if errors:
+        return None, errors
+    return db_functions.metaphor(build_junction_info(form)), {}
+
+
+def measure(output: dict) -> dict:
+    """The metrics of a simulation output that the sensitivity curves follow"""
+    return {"avgWait": output["avgWait"], "maxQueue": output["maxQueue"], "efficiency_score": db_functions.get_efficiency_score(output)}
+
+
+def perturb(formatted_dict: dict, arm: str, movement: str, increase: int) -> dict:
+    """Raise the vph of one movement of one arm
+
+    Args:
+        formatted_dict (dict): The simulation input produced by metaphor
+        arm (str): north, east, south or west
+        movement (str): left, straight or right
+        increase (int): The percentage increase, the new vph is rounded to a whole number
+
+    Returns:
+        dict: A copy of the simulation input with the new vph (the other arms share their lists with formatted_dict)
+    """
+    key = 5 + ARMS.index(arm)
+    flows = list(formatted_dict[key])
+    flows[MOVEMENTS.index(movement)] = round(flows[MOVEMENTS.index(movement)] * (100 + increase) / 100)
+    perturbed = dict(formatted_dict)
+    perturbed[key] = flows
+    return perturbed
+
+
+def run_curve(formatted_dict: dict, arm: str, movement: str, increases: list, distributions: dict) -> list:
+    """Simulate every increase of one movement, run on the worker processes of analyse
+
+    Description:
+        Only the perturbed arm changes between the runs, so they are run as an IncrementalSimulation started from the lane
+        distributions of the base junction: the three other arms are not distributed again and the priority is only
+        recalculated when the directions rank differently.
+
+    Args:
+        formatted_dict (dict): The simulation input of the base junction
+        arm (str): The arm of the movement
+        movement (str): The movement whose vph is raised
+        increases (list): The percentage increases
+        distributions (dict): The lane distributions of the base junction
+
+    Returns:
+        list: The vph and metrics (see measure) of every increase
+    """
+    simulation = IncrementalSimulation(formatted_dict, distributions)
+    points = []
+    for increase in increases:
+        flows = perturb(formatted_dict, arm, movement, increase)[5 + ARMS.index(arm)]
+        output = simulation.changeArm(arm, flows=flows)
+        points.append((flows[MOVEMENTS.index(movement)], measure(output)))
+    return points
+
+
+def elasticity(value: float, base: float, vph: int, base_vph: int) -> float | None:
+    """The relative change of a metric over the relative change of the vph that caused it, None where it is undefined"""
+    if base == 0 or vph == base_vph:
+        return None
+    return round(((value - base) / base) / ((vph - base_vph) / base_vph), 4)
+
+
+def analyse(formatted_dict: dict, increases: list = INCREASES, workers: int | None = None) -> dict:
+    """Sweep the vph of every movement of every arm around a base junction
+
+    Description:
+        Each movement with traffic is raised by each of the increases while the rest of the junction is kept as it is,
+        one curve per movement. The curves are simulated in parallel on a process pool (in this process when workers
+        is 1) and every run reuses the lane distributions of the arms it leaves unchanged.
+
+    Args:
+        formatted_dict (dict): The simulation input of the base junction, as produced by metaphor
+        increases (list): The percentage increases of the vph
+        workers (int): The number of processes of a pool started for this analysis alone, defaults to the shared_pool
+
+    Returns:
+        dict: The metrics of the base junction, the increases and, for every arm and movement with traffic, the curve of
+        points holding the increase, vph, metrics and the elasticity of each metric (see elasticity)
+    """
+    distributions = {}
+    base = measure(createSimulation(formatted_dict, distributions=distributions))
+
+    tasks = [(arm, movement) for arm in ARMS for movement in MOVEMENTS if formatted_dict[5 + ARMS.index(arm)][MOVEMENTS.index(movement)] > 0]
+    arms = [arm for arm, _ in tasks]
+    movements = [movement for _, movement in tasks]
+    if workers == 1:
+        results = list(map(run_curve, repeat(formatted_dict), arms, movements, repeat(increases), repeat(distributions)))
+    elif workers is None:
+        results = list(shared_pool().map(run_curve, repeat(formatted_dict), arms, movements, repeat(increases), repeat(distributions)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_curve, repeat(formatted_dict), arms, movements, repeat(increases), repeat(distributions)))
+
+    curves = {arm: {} for arm in ARMS}
+    for (arm, movement), points in zip(tasks, results):
+        base_vph = formatted_dict[5 + ARMS.index(arm)][MOVEMENTS.index(movement)]
+        curves[arm][movement] = [
+            {"increase": increase, "vph": vph, **metrics, "elasticity": {metric: elasticity(metrics[metric], base[metric], vph, base_vph) for metric in METRICS}}
+            for increase, (vph, metrics) in zip(increases, points)
+        ]
+    return {"base": base, "increases": list(increases), "curves": curves}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep the traffic of every movement of a junction and report how its score degrades")
+    parser.add_argument("spec", help="the JSON file of the junction, in the layout of the /api/v1/simulate API")
+    parser.add_argument("--increases", default=",".join(map(str, INCREASES)), help="the comma separated percentage increases")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="the number of simulation processes")
+    args = parser.parse_args()
+
+    with open(args.spec, "r", encoding="utf-8") as f:
+        formatted, errors = formatted_spec(json.load(f))
+    if errors:
+        parser.error("; ".join(errors.values()))
+    print(json.dumps(analyse(formatted, [int(increase) for increase in args.increases.split(",")], args.workers), indent=2))
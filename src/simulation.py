@@ -1,6 +1,17 @@
+import copy
 import math
-from src.vehicle import Vehicle
+import time as timer
+from collections import OrderedDict
 from src.junction import Junction
+from src.profiling import timePhase
+from src.sketch import QuantileSketch
+from src.timeseries import QueueSeries
+
+#how the left turn lanes of the opposite direction run during the green light of a lane (see compilePhasePlan)
+NORMAL_RUN = 0 #they do not run
+OPPOSITE_LEFTS = 1 #they run unimpeded for the whole green light
+GIVE_WAY = 2 #they run in the gaps between the right turning vehicles of the lane
+OPPOSITE_DIRECTIONS = {'north': 'south', 'east': 'west', 'south': 'north', 'west': 'east'}
 
 def endSimulation(junction):
     """
@@ -31,6 +42,7 @@ def endSimulation(junction):
     simulationTotalWait = 0
     simulationDict['maxQueue'] = 0
     simulationDict['maxWait'] = 0
+    simulationWaits = QuantileSketch() #the lane sketches merged into one for the whole simulation
 
 
     #creates each dictionary that stores the information for each direction
@@ -42,6 +54,7 @@ def endSimulation(junction):
         directionTotalWait = 0
         directionDict['maxWait'] = 0
         directionDict['maxQueue'] = 0
+        directionWaits = QuantileSketch()
         
         #stores relevant values into the direction dictionary
         directionDict['lightTime'] = direction.lightTime
@@ -69,10 +82,14 @@ def endSimulation(junction):
                 laneDict['totalFlow'] = lane.totalFlow
                 laneDict['carsPassedThrough'] = lane.numCarsPassed
                 laneDict['totalWait'] = lane.totalWait
+                laneDict['waitPercentiles'] = lane.waits.percentiles() #the p50, p85, p95 and p99 wait of the lane
+                if lane.series is not None:
+                    laneDict['queueSeries'] = lane.series.asDict() #the min, max and mean queue length over time
 
                 #adds to the total counters for the direction
                 directionCarsPassedThrough += lane.numCarsPassed
                 directionTotalWait += lane.totalWait
+                directionWaits.merge(lane.waits)
 
                 #updates the maxWait and maxQueue for the direction
                 directionDict['maxWait'] = max(laneDict['maxWait'], directionDict['maxWait'])
@@ -88,11 +105,13 @@ def endSimulation(junction):
             directionDict['avgWait'] = directionTotalWait / directionCarsPassedThrough  #the average wait over the entire direction
         else:
             directionDict['avgWait'] = 0
+        directionDict['waitPercentiles'] = directionWaits.percentiles()
 
 
         #adds to the total counter for the simulation
         simulationTotalWait += directionTotalWait
         simulationCarsPassedThrough += directionCarsPassedThrough
+        simulationWaits.merge(directionWaits)
 
         simulationDict[directionName] = directionDict #adds a dictionary to store the information about that direction
         simulationDict['maxQueue'] = max(simulationDict['maxQueue'], directionDict['maxQueue']) #calculates the maxQueue for the entire simulation
@@ -105,29 +124,393 @@ def endSimulation(junction):
 
     simulationDict['carsPassedThrough'] = simulationCarsPassedThrough #the total number of vehicles processed by the junction
     simulationDict['totalWait'] = simulationTotalWait #the total wait time of all vehicles
+    simulationDict['waitPercentiles'] = simulationWaits.percentiles() #the p50, p85, p95 and p99 wait across the whole simulation
+    simulationDict['waitSketch'] = simulationWaits.toDict() #the sketch itself, so the runs of several replications can be merged
     
     return simulationDict #returns the final dictionary of the simulationDictionary    
 
 
-def runSimulation(junction):
+class SteadyState:
+    """
+    Description: Detects when the main loop of runSimulation has settled into a steady trend and projects the rest of the hour from it
+
+    Attributes:
+        junction(Junction): the junction being simulated
+        lanes(Array): every lane of the junction, in the order of junction.directions
+        crossingRequests(Array): the times of the pedestrian crossing requests, None without a crossing
+        simDuration(float): the length of the simulation
+        window(int): the fewest signal cycles a trend has to hold for before it is projected
+        windowVehicles(int): the fewest vehicles that have to arrive in every lane with traffic while the trend holds
+        maxRepeat(int): the most cycles a repeating pattern of cycle lengths can span, see repeatLength
+        saturatedQueue(int): a queue at least this long cannot empty within one iteration of the main loop (see saturatedQueueLength)
+        longestHeadway(float): the longest time between the arrivals of a lane with traffic
+        cycleHeadway(float): the longest a direction or a bus lane with traffic can go without an arrival, see cycleHeadwayOf
+        snapshots(Array): the state of the lanes at the start of each of the last iterations, as many as a window of the longest pattern
+        lastUnsaturated(Array): the last iteration at which each lane's queue was shorter than saturatedQueue
+        trimmed(Array): the number of waits and of queue samples of each lane dropped from the front of their history
+
+    Methods:
+        __init__(self, junction, crossingRequests, simDuration, window, windowVehicles, maxRepeat): initialises the detector
+        saturatedQueueLength(self): a queue length the lanes cannot discharge within one iteration
+        cycleHeadwayOf(self): the longest a direction or a bus lane with traffic can go without an arrival
+        canSettle(self): whether the cycles can ever repeat
+        observe(self, currentTime, iteration, vehiclesCreated): records the state at the start of an iteration and projects a steady trend
+        repeatLength(self): the fewest cycles whose lengths have repeated over a whole window of them
+        laneGrowth(self, i, snapshots): the number of vehicles a lane's queue grows by every cycle of a window, None if it is not steady
+        extrapolate(self, currentTime, snapshots, cycles, growths): moves every lane on by a number of whole cycles
+        addWaits(sketch, waits, total, low, high): adds the waits of the window to a sketch, scaled to a number of vehicles
+
+    Notes:
+        Every iteration of the main loop is one signal cycle. Once the lengths of the cycles have repeated in a pattern for a
+        window of them, long enough for windowVehicles to arrive in every lane, the pattern is treated as one cycle. It is
+        projected once every lane is either steady, with a queue at the start of each cycle within a vehicle of the others
+        and maxima that no longer change, or oversaturated, with a queue too long to empty that grew in every cycle. The
+        queue of an oversaturated lane grows linearly, so every vehicle that leaves it has waited growth headways longer than
+        the one in its place a cycle before: its total wait grows quadratically and its maxima linearly with the number of
+        cycles. The arrivals of each lane over the projected time are counted exactly from its headway. A steady lane lets
+        them all through at the mean wait of the window, an oversaturated one discharges at the mean rate of the window.
+        Both rates are only averages over the window when the headways and the cycle share no short common multiple, so the
+        projected totals are out by up to a vehicle a lane per window, the mean waits by how far the arrivals of the window
+        fall unevenly in the cycle (a few percent at the default windowVehicles) and the maxima miss any peak that the
+        window did not reach. The percentiles are projected from the waits of the window and the queue series from its
+        samples.
+    """
+
+    def __init__(self, junction, crossingRequests, simDuration, window=4, windowVehicles=20, maxRepeat=8):
+        """
+        Description: initialises the detector
+
+        Args:
+            junction(Junction): the junction being simulated, its lights must already be set
+            crossingRequests(Array): the times of the pedestrian crossing requests, None without a crossing
+            simDuration(float): the length of the simulation
+            window(int): the fewest signal cycles a trend has to hold for
+            windowVehicles(int): the fewest vehicles that have to arrive in every lane with traffic while it holds
+            maxRepeat(int): the most cycles a repeating pattern of cycle lengths can span
+        """
+        self.junction = junction
+        self.lanes = [lane for direction in junction.directions.values() for lanes in direction.lanes.values() for lane in lanes]
+        self.crossingRequests = crossingRequests
+        self.simDuration = simDuration
+        self.window = window
+        self.windowVehicles = windowVehicles
+        self.maxRepeat = maxRepeat
+        self.saturatedQueue = self.saturatedQueueLength()
+        self.longestHeadway = max([lane.newCarRate for lane in self.lanes if lane.totalFlow != 0], default=0.0)
+        self.cycleHeadway = self.cycleHeadwayOf()
+        self.snapshots = []
+        self.lastUnsaturated = [0] * len(self.lanes)
+        self.trimmed = [[0, 0] for _ in self.lanes]
+
+    def saturatedQueueLength(self):
+        """
+        Description: A queue length that no lane can discharge within one iteration of the main loop
+
+        Returns:
+            int: the length, from the longest green light a lane gets (its own and the opposite direction's) and the longest gap
+            between right turning vehicles that the opposing left lanes can run in
+
+        Notes:
+            A vehicle leaves at most every shortest headway of a green light, scaled by the quickest class that arrives. A left lane
+            can also run while the opposite direction is green, from 5 seconds after its last right turning vehicle, which can
+            be a whole headway back.
+        """
+        maxLight = max(direction.lightTime for direction in self.junction.directions.values())
+        maxGap = 0
+        for direction in self.junction.directions.values():
+            if 'R' in direction.laneLayout[-1]:
+                rightLane = list(direction.lanes.values())[-1][-1]
+                maxGap = max(maxGap, rightLane.newCarRate)
+
+        classLeaveTimes = self.junction.classLeaveTimes
+        quickest = min(classLeaveTimes[vehicleClass] for lane in self.lanes for vehicleClass in lane.classPattern) / classLeaveTimes[0]
+        leaveTime = min([classLeaveTimes[0]] + list(self.junction.saturationHeadways)) * quickest
+        return int((2 * maxLight + maxGap) / leaveTime) + int(maxLight / 10) + 4
+
+    def cycleHeadwayOf(self):
+        """
+        Description: The longest a direction or a bus lane with traffic can go without an arrival
+
+        Returns:
+            float: the longest of the shortest headway of each direction's lanes and of each bus lane's headway
+
+        Notes:
+            A direction is skipped when all of its lanes are empty and a bus lane's phase when it is, so the cycles only stay
+            the same length if each of them gets a vehicle every cycle.
+        """
+        headways = []
+        for direction in self.junction.directions.values():
+            flowing = [lane.newCarRate for laneType, lanes in direction.lanes.items() if laneType != 'CB' for lane in lanes if lane.totalFlow != 0]
+            if flowing:
+                headways.append(min(flowing))
+            headways += [lane.newCarRate for lane in direction.lanes.get('CB', []) if lane.totalFlow != 0]
+        return max(headways, default=0.0)
+
+    def canSettle(self):
+        """
+        Description: Whether the signal cycles can ever repeat, checked before any state is recorded
+
+        Returns:
+            bool: False if a direction or a bus lane with traffic can go a whole cycle without a vehicle arriving, as it is then
+            skipped in some cycles and not others, or if the crossing cannot be requested in every cycle
+
+        Notes:
+            The longest cycle has every direction green, a bus lane green before the rest of its direction, and the crossing.
+        """
+        longestCycle = sum((direction.lightTime + self.junction.intergreenTime) * (2 if 'CB' in direction.lanes else 1) for direction in self.junction.directions.values())
+        if self.crossingRequests is not None:
+            longestCycle += self.junction.pedestrianCrossingTime
+            if 3600 / self.junction.pedCrossPH > longestCycle - self.junction.pedestrianCrossingTime:
+                return False #the crossing cannot run in every cycle
+        return self.cycleHeadway <= longestCycle
+
+    def observe(self, currentTime, iteration, vehiclesCreated=0):
+        """
+        Description: Records the state at the start of an iteration of the main loop and, once every lane has held a steady
+        trend for a window of repeating cycles, projects it for as long as a whole cycle still fits before the end of the simulation
+
+        Args:
+            currentTime(float): the time at the start of the iteration
+            iteration(int): the number of the iteration
+            vehiclesCreated(int): the number of vehicles created so far, counted by the profiler
+
+        Returns:
+            tuple: the time the simulation has been moved on to, the number of iterations and the number of vehicles skipped,
+            or None if the simulation has to carry on iteration by iteration
+        """
+        queues = [lane.getQueueSize() for lane in self.lanes]
+        for i, queue in enumerate(queues):
+            if queue < self.saturatedQueue:
+                self.lastUnsaturated[i] = iteration
+
+        lastCrossingTime = self.junction.lastCrossingTime if self.crossingRequests is not None else None
+        self.snapshots.append((iteration, currentTime, lastCrossingTime, [(queue, lane.totalWait, lane.numCarsPassed, lane.maxQueue, lane.maxWait,
+                               len(lane.waits.history) + trimmed[0], (len(lane.series.history) + trimmed[1]) if lane.series is not None else 0)
+                              for lane, queue, trimmed in zip(self.lanes, queues, self.trimmed)]))
+        if len(self.snapshots) < 2:
+            return None
+        #the window has to be long enough for windowVehicles to arrive in the quietest lane, even in a pattern of the longest
+        kept = self.maxRepeat * max(self.window, math.ceil(self.windowVehicles * self.longestHeadway / (self.snapshots[-1][1] - self.snapshots[-2][1])))
+        if len(self.snapshots) > kept + 1:
+            del self.snapshots[:-kept - 1]
+            for lane, trimmed, state in zip(self.lanes, self.trimmed, self.snapshots[0][3]):
+                #only the waits and samples since the start of the window are kept
+                del lane.waits.history[:state[5] - trimmed[0]]
+                trimmed[0] = state[5]
+                if lane.series is not None:
+                    del lane.series.history[:state[6] - trimmed[1]]
+                    trimmed[1] = state[6]
+        repeat = self.repeatLength()
+        if repeat is None:
+            return None
+        repeat, window, period = repeat
+        recent = self.snapshots[-repeat * window - 1:]
+        shortestCycle = min(after[1] - before[1] for before, after in zip(recent, recent[1:]))
+        if self.cycleHeadway > shortestCycle:
+            return None #a direction without a vehicle every cycle is skipped in some cycles, so the pattern does not last
+        if self.crossingRequests is not None:
+            #the crossing has to have run in every cycle, and will keep doing so only if a request comes between every two of them
+            if any(after[2] == before[2] for before, after in zip(recent, recent[1:])) or 3600 / self.junction.pedCrossPH > shortestCycle - self.junction.pedestrianCrossingTime:
+                return None
+        cycles = int((self.simDuration - currentTime) // period) - 1 #the last pattern is simulated, it may be cut short
+        if cycles < 1:
+            return None
+        snapshots = recent[::repeat] #the lanes are compared at the start of every pattern, so it is projected as one cycle
+
+        growths = []
+        for i in range(len(self.lanes)):
+            growth = self.laneGrowth(i, snapshots)
+            if growth is None:
+                return None
+            growths.append(growth)
+
+        skippedVehicles = self.extrapolate(currentTime, snapshots, cycles, growths)
+        return currentTime + cycles * period, cycles * repeat, skippedVehicles
+
+    def repeatLength(self):
+        """
+        Description: The fewest cycles whose lengths have repeated over a whole window of them
+
+        Returns:
+            tuple: the number of cycles in the pattern, the window in patterns and the length of the pattern, or None if the
+            cycle lengths have not repeated in a pattern of up to maxRepeat cycles
+
+        Notes:
+            A fixed time junction repeats a pattern of one cycle. The gap outs of an actuated junction can take a few
+            cycles to repeat, as can a lane whose headway is not a whole fraction of the cycle.
+        """
+        times = [snapshot[1] for snapshot in self.snapshots]
+        for repeat in range(1, self.maxRepeat + 1):
+            if len(times) <= repeat:
+                return None
+            period = times[-1] - times[-1 - repeat]
+            window = max(self.window, math.ceil(self.windowVehicles * self.longestHeadway / period))
+            if len(times) <= repeat * window:
+                continue
+            lengths = [after - before for before, after in zip(times[-repeat * window - 1:], times[-repeat * window:])]
+            if all(abs(lengths[i + repeat] - lengths[i]) <= 1e-6 for i in range(len(lengths) - repeat)):
+                return repeat, window, period
+        return None
+
+    def laneGrowth(self, i, snapshots):
+        """
+        Description: The number of vehicles a lane's queue grows by every cycle of a window
+
+        Args:
+            i(int): the index of the lane in lanes
+            snapshots(Array): the snapshots of the window, from its start to the current iteration
+
+        Returns:
+            float: 0 for a steady lane, the mean growth for an oversaturated one, None if the lane is neither
+        """
+        states = [snapshot[3][i] for snapshot in snapshots]
+        queues = [state[0] for state in states]
+        first, last = states[0], states[-1]
+        if max(queues) - min(queues) <= 1 and last[3] == first[3] and last[4] == first[4]:
+            return 0
+        if self.lastUnsaturated[i] < snapshots[0][0] and all(after > before for before, after in zip(queues, queues[1:])):
+            #the queue was saturated the whole window, and its maxima must come from it
+            if last[3] > first[3] and last[4] > first[4]:
+                return (queues[-1] - queues[0]) / (len(snapshots) - 1)
+        return None
+
+    def extrapolate(self, currentTime, snapshots, cycles, growths):
+        """
+        Description: Moves every lane on by a number of whole cycles, as if they had been simulated
+
+        Args:
+            currentTime(float): the time at the start of the iteration
+            snapshots(Array): the snapshots of the window, from its start to the current iteration
+            cycles(int): the number of cycles to move on by
+            growths(Array): the growth of every lane's queue every cycle, see laneGrowth
+
+        Returns:
+            int: the number of vehicles that arrived during the cycles
+        """
+        window = len(snapshots) - 1
+        period = snapshots[-1][1] - snapshots[-2][1]
+        shift = cycles * period
+        skippedVehicles = 0
+        for lane, growth, first, previous, last, trimmed in zip(self.lanes, growths, snapshots[0][3], snapshots[-2][3], snapshots[-1][3], self.trimmed):
+            waits = lane.waits.history
+            lane.waits.history = None
+            samples = lane.series.history if lane.series is not None else None
+            if lane.series is not None:
+                lane.series.history = None
+            if lane.totalFlow == 0:
+                continue #no vehicle ever arrives in this lane, so its queue is empty and nothing changes
+
+            #the arrivals are counted from the headway, the nth vehicle of the lane arrives at n headways. The lane has taken
+            #in its arrivals up to a time before its next arrival, so those before that arrival moved on by the cycles are
+            #taken in, which may let one vehicle through a little early but never keeps one waiting a cycle longer
+            arrivedBefore = round(lane.lastCarTime / lane.newCarRate)
+            arrivedUntil = min(lane.lastCarTime + lane.newCarRate, currentTime) + shift
+            arrivedAfter = math.ceil(arrivedUntil / lane.newCarRate) - 1
+            while arrivedAfter * lane.newCarRate >= arrivedUntil:
+                arrivedAfter -= 1
+            arrivals = arrivedAfter - arrivedBefore
+            queue = lane.getQueueSize()
+            if growth == 0:
+                passed = arrivals
+                windowPassed = last[2] - first[2]
+                if windowPassed:
+                    lane.totalWait += passed * (last[1] - first[1]) / windowPassed
+                self.addWaits(lane.waits, waits[first[5] - trimmed[0]:], passed)
+            else:
+                #the vehicles of the last cycle of the window stand for those of the cycles after it, growth headways longer each cycle
+                waitGrowth = growth * lane.newCarRate
+                passed = min(round(cycles * (last[2] - first[2]) / window), queue + arrivals)
+                lastPassed = last[2] - previous[2]
+                if lastPassed:
+                    lane.totalWait += passed * ((last[1] - previous[1]) / lastPassed + waitGrowth * (cycles + 1) / 2)
+                self.addWaits(lane.waits, waits[previous[5] - trimmed[0]:], passed, waitGrowth, cycles * waitGrowth)
+                lane.maxWait += cycles * waitGrowth
+            queueLength = queue + arrivals - passed
+            lane.maxQueue += max(queueLength - queue, 0)
+            lane.numCarsPassed += passed
+            lane.direction.queuedVehicles += queueLength - queue
+            skippedVehicles += arrivals
+
+            if samples is not None:
+                #the samples of the window are taken again, higher by the growth of the queue since
+                ticks = int(shift / lane.series.interval)
+                samples = samples[first[6] - trimmed[1]:]
+                if not samples:
+                    samples = [queue]
+                perTick = growth * lane.series.interval / period
+                for tick in range(ticks):
+                    lane.series.add(max(0, round(samples[tick % len(samples)] + perTick * (len(samples) + tick - tick % len(samples)))))
+
+            #the queue holds the latest of the vehicles, with the arrival times and classes they would have been simulated with
+            vehicles = [lane.cars.get() for _ in range(queue)]
+            for vehicle in vehicles[len(vehicles) - max(queueLength - arrivals, 0):]:
+                lane.cars.putArrival(vehicle.entryTime, vehicle.vehicleClass)
+            pattern = lane.classPattern
+            for arrived in range(arrivedAfter - min(queueLength, arrivals) + 1, arrivedAfter + 1):
+                lane.cars.putArrival(arrived * lane.newCarRate, pattern[(arrived - 1) % len(pattern)])
+            lane.lastCarTime = arrivedAfter * lane.newCarRate
+
+        if self.crossingRequests is not None:
+            self.junction.lastCrossingTime += shift #the crossing ran in every cycle
+        return skippedVehicles
+
+    @staticmethod
+    def addWaits(sketch, waits, total, low=0.0, high=0.0):
+        """
+        Description: Adds the waits of the window to a sketch again, scaled to a number of vehicles
+
+        Args:
+            sketch(QuantileSketch): the sketch of the lane
+            waits(Array): the waits and counts added to the sketch during the window
+            total(int): the number of vehicles to add
+            low(float): how much longer than in the window the shortest of the waits are
+            high(float): how much longer than in the window the longest of the waits are, each wait is spread evenly from low to high
+        """
+        windowCount = sum(count for _, count in waits)
+        if windowCount == 0:
+            return
+        share = 0.0
+        added = 0
+        for wait, count in waits:
+            share += count * total / windowCount
+            count = round(share) - added
+            added += count
+            if count > 0:
+                sketch.addRange(wait + low, wait + high, count)
+
+
+def runSimulation(junction, profiler=None, extrapolate=True, trace=None):
     """
-    Description: Runs the simulation for the given junction
+    Description: Runs the simulation for the given junction, stopping early if the queues outgrow junction.memoryBudget
 
     Args:
         junction(Junction): the junction that the simulation processed for
+        profiler(Profiler): optional profiler recording the main-loop iterations and queue operations (None disables profiling)
+        extrapolate(bool): whether to project the rest of the simulation once every lane holds a steady trend (see SteadyState), False for an exact run
+        trace(TraceRecorder): optional recorder of the lane, entry time and exit time of every vehicle, which is left open;
+        a traced run is never extrapolated, as the vehicles of the skipped cycles would be missing from the trace
     
     Methods:
-        processGreenLane(lane, currentTime, junction): Processes vehicle during greenlight time for a lane
-        processGreen(direction, direction, currentTime, junction): Processes the green light for all lanes of a direction
+        processGreenLane(lane, mode, oppositeLefts, currentTime, lightTime, headways, junction): Processes vehicle during greenlight time for a lane
+        processGreen(laneSteps, oppositeLefts, currentTime, lightTime, headways, junction): Processes the green light for all lanes of a direction
+        actuatedGreenTime(direction, lanes, currentTime): the length of the green light of a direction under actuated control
         shouldActivatePedestrianCrossing(junction, currentTime, crossingRequests): checks whether the pedestrian crossing should ne activated given the current time
         processWaitingVehiclesLane(lane, currentTime): processes the vehicles that've arrived up to the currentTime
-        processWaitingVehicles(direction, currentTime, CB): processes the vehicles that've arrived for a whole direction
-        processOppositeLane(lane, lightTime, currentTime, junction): processes opposing left lane
+        processWaitingVehicles(lanes, currentTime): processes the vehicles that've arrived for a whole direction
+        processOppositeLane(lane, lightTime, currentTime, headways, junction): processes opposing left lane
 
     Returns:
-        Dictionary: the simulationDict of all information about the simulation after it has run
+        Dictionary: the simulationDict of all information about the simulation after it has run, with a 'saturation' entry
+        (the time, memory used, memory budget and queued vehicles) if it was stopped early
+
+    Notes:
+        Every green light is followed by junction.intergreenTime with no lane moving. A queue that is standing when its light
+        turns green starts moving after the start-up lost time, and its first vehicles leave at the saturation headway profile
+        of the junction, which the phase plan holds as the headway of each vehicle of the green (see compilePhasePlan).
+        When junction.actuated is set (see setActuation) each green light lasts until its lanes gap out, between the min and
+        max green of the direction, instead of the fixed lightTime of the direction.
     """
-    def processOppositeLane(lane, lightTime, currentTime, junction):
+    def processOppositeLane(lane, lightTime, currentTime, headways, junction):
         """
         Description: When a left-lane from the opposite direction as the light, is able to run unimpeded, this method processes the traffic
 
@@ -135,6 +518,7 @@ def runSimulation(junction):
             lane(Lane): The lane which is being processed
             lightTime(float): The time that the light should be on for
             currentTime(float): The current time of the simulation
+            headways(tuple): The time each vehicle of the queue takes to leave it once the light is green, by class code then position, from the phase plan
             junction(Junction): The junction that the simulation is running in
 
         Methods:
@@ -142,16 +526,26 @@ def runSimulation(junction):
         """
         time = currentTime  # starts the time as the currentTime
         end_time = currentTime + lightTime
+        served = 0  # the number of vehicles that have left the queue during this green light
 
         while time < end_time:
             if lane.getQueueSize() != 0:  # checks whether there is a vehicle on the queue
-                time += junction.vehicleLength / junction.trafficSpeed  # adds to the time the time it takes for a vehicle to travel one vehicle length
+                time += headways[lane.cars.frontClass()][served]  # adds to the time the time it takes for this vehicle to leave the queue
+                served += 1
+                if lane.series is not None and lane.series.nextTime < time:
+                    lane.series.advance(time, lane.getQueueSize())  # samples the queue before the vehicle leaves
                 vehicle = lane.cars.get()  # removes a vehicle from the front of the queue
+                lane.direction.queuedVehicles -= 1  # the vehicle is no longer queued in the direction
+                if profiler is not None:
+                    profiler.count('queueGets')
 
                 lane.totalWait += time - vehicle.entryTime  # adds to the total wait time of the lane
                 lane.numCarsPassed += 1  # adds to the number of vehicles that have passed through the lane
                 lane.maxWait = max(lane.maxWait, (
                             time - vehicle.entryTime))  # determines if this vehicle has had the longest wait so far
+                lane.waits.add(time - vehicle.entryTime)  # adds the wait to the percentiles of the lane
+                if trace is not None:
+                    trace.record(lane.traceId, vehicle.entryTime, time)
 
                 processWaitingVehiclesLane(lane,
                                            time)  # adds any vehicles that have entered the lane whilst this vehicle was leaving
@@ -168,25 +562,29 @@ def runSimulation(junction):
 
                 time = next_car_time  # Update time to next car's arrival
                 lane.numCarsPassed += 1  # add that the vehicle has passed the junction
+                lane.waits.add(0.0)  # the vehicle did not wait
+                if trace is not None:
+                    trace.record(lane.traceId, time, time)
                 lane.lastCarTime = time  # updates the last time a vehicle entered
 
         return time  # Optional: return final time for potential further use
 
 
-    def processGreenLane(lane, laneNum, direction, oppositeDirection, currentTime, junction):
+    def processGreenLane(lane, mode, oppositeLefts, currentTime, lightTime, headways, junction):
         """
         Description: Processes the vehicles during the green light time of the given lane
 
         Args:
             lane(Lane): the lane that the vehicles are being processed in
+            mode(int): how the opposing left turn lanes run alongside this lane, NORMAL_RUN, OPPOSITE_LEFTS or GIVE_WAY (see compilePhasePlan)
+            oppositeLefts(tuple): the left turn lanes with traffic in the direction opposite in the junction to the lane
             currentTime(float): the time of the simulation currently
+            lightTime(float): the length of the green light
+            headways(tuple): the time each vehicle of the queue takes to leave it once the light is green, by class code then position, from the phase plan
             junction(Junction): the junction that the simulation is in
-            direction(Direction): the direction that the lane belongs to
-            oppositeDirection(Direction): the direction opposite in the junction to direction
-            laneNum(int): the number of this lane in the direction (from left to right, i.e. the leftmost lane is 0, next 1 and so on)
         
         Returns:
-            float: (currentTime + lane.lightTime) the time of the simulation after the green light
+            float: (currentTime + lightTime) the time of the simulation after the green light
         
         Methods:
             processWaitingVehiclesLane(lane, time): processes all the waiting vehicles for a lane
@@ -196,104 +594,104 @@ def runSimulation(junction):
 
         """
 
-        normalRun = True #boolean to check whether this lane needs to operate as normal or consider an opposing left lane
-
-        #check if there is a left turn lane opposite and that this is the right-most lane of the current direction
-        if((list(oppositeDirection.lanes.keys())[0] == 'L') and (laneNum == (len(direction.laneLayout) - 1))):
-            #check if this lane contains right turning traffic
-            if(('R' in direction.laneLayout[-1] and lane.newCarRate != 0)):
-                #if it does contain right turn traffic
-
-                allowLeft = True #checks whether a left lane is allowed to flow
-                if(len(direction.laneLayout) > 1): #checks if there are more than 1 lane
-                    
-                    #check whether there are multiple lanes turning right (if so it is unsafe to run a left turn lane, so no left turn lanes are allowed to run)
-                    if ('R' in direction.laneLayout[-2]): #if there is right turning in the second last lane
-                        allowLeft = False #left lanes cannot go
-
-                if allowLeft: #checks whether left lane traffic in the opposite direction is allowed to flow
-                    normalRun = False #the logic now must be different to accomodate for the opposite left turn lane
-
-                    time = currentTime #starts the time as the currentTime
-                    while(time < (currentTime + lane.lightTime)): #iterates as long as the time is less than the finishing time of the green light
-                        if(lane.getQueueSize() != 0): #checks whether there is a vehicle on the queue
-                            time += junction.vehicleLength / junction.trafficSpeed #adds to the time the time it takes for a vehicle to travel one vehicle length
-                            vehicle = lane.cars.get() #removes a vehicle from the front of the queue
+        served = 0 #the number of vehicles that have left the queue during this green light
+        if mode == GIVE_WAY: #this lane contains right turn traffic, so the opposing left lanes can only run in the gaps between it
+            time = currentTime #starts the time as the currentTime
+            while(time < (currentTime + lightTime)): #iterates as long as the time is less than the finishing time of the green light
+                if(lane.getQueueSize() != 0): #checks whether there is a vehicle on the queue
+                    time += headways[lane.cars.frontClass()][served] #adds to the time the time it takes for this vehicle to leave the queue
+                    served += 1
+                    if lane.series is not None and lane.series.nextTime < time:
+                        lane.series.advance(time, lane.getQueueSize()) #samples the queue before the vehicle leaves
+                    vehicle = lane.cars.get() #removes a vehicle from the front of the queue
+                    lane.direction.queuedVehicles -= 1 #the vehicle is no longer queued in the direction
+                    if profiler is not None:
+                        profiler.count('queueGets')
 
-                            lane.totalWait += time - vehicle.entryTime #adds to the total wait time of the lane
-                            lane.numCarsPassed += 1 #adds to the number of vehicles that have passed through the lane
-                            lane.maxWait = max(lane.maxWait, (time - vehicle.entryTime)) #determines if this vehicle has had the longest wait so far
+                    lane.totalWait += time - vehicle.entryTime #adds to the total wait time of the lane
+                    lane.numCarsPassed += 1 #adds to the number of vehicles that have passed through the lane
+                    lane.maxWait = max(lane.maxWait, (time - vehicle.entryTime)) #determines if this vehicle has had the longest wait so far
+                    lane.waits.add(time - vehicle.entryTime) #adds the wait to the percentiles of the lane
+                    if trace is not None:
+                        trace.record(lane.traceId, vehicle.entryTime, time)
 
-                            processWaitingVehiclesLane(lane, time) #adds any vehicles that have entered the lane whilst this vehicle was leaving
+                    processWaitingVehiclesLane(lane, time) #adds any vehicles that have entered the lane whilst this vehicle was leaving
 
-                        else: #otherwise if there are no vehicles in the lane
-                            #once there are no vehicles in the lane, the opposing left lanes have the opportunity to go
-                            time = lane.lastCarTime + lane.newCarRate #updates the time to be when the next vehicle joins
+                else: #otherwise if there are no vehicles in the lane
+                    #once there are no vehicles in the lane, the opposing left lanes have the opportunity to go
+                    time = lane.lastCarTime + lane.newCarRate #updates the time to be when the next vehicle joins
                             
-                            #iterates over all opposing left turn lanes
-                            for laneL in oppositeDirection.lanes['L']:
-                                if laneL.newCarRate == 0:
-                                    continue
-
-                                LTime = lane.lastCarTime + 5 #starts the LTime as the time that the last right-turn lane has gone (+5 for the buffer between the right car to cross before an opposing vehicle can go)
-                                #loops until the LTime is greater than either the time that the next right-turning vehicle comes OR the time of the total light
-                                #(-5 is used to provide a safety buffer between vehicles)
-                                while (LTime < min((time - 5), (currentTime + lane.lightTime))):
-                                    #process vehicles for the left-turn lane lanes
-
-                                    if(laneL.getQueueSize() != 0): #checks whether there is a vehicle on the queue
-                                        LTime += junction.vehicleLength / junction.trafficSpeed #adds to the time the time it takes for a vehicle to travel one vehicle length
+                    #iterates over all opposing left turn lanes with traffic
+                    for laneL in oppositeLefts:
+                        LTime = lane.lastCarTime + 5 #starts the LTime as the time that the last right-turn lane has gone (+5 for the buffer between the right car to cross before an opposing vehicle can go)
+                        #loops until the LTime is greater than either the time that the next right-turning vehicle comes OR the time of the total light
+                        #(-5 is used to provide a safety buffer between vehicles)
+                        while (LTime < min((time - 5), (currentTime + lightTime))):
+                            #process vehicles for the left-turn lane lanes
+
+                            if(laneL.getQueueSize() != 0): #checks whether there is a vehicle on the queue
+                                LTime += leaveTimes[laneL.cars.frontClass()] #the left turning vehicles filter into the gap one after another at the saturation headway of their class
                                         
-                                        if(LTime > min((time - 5), (currentTime + lane.lightTime))):
-                                            #if the LTime is now higher than the 
-                                            break #exits the while loop
+                                if(LTime > min((time - 5), (currentTime + lightTime))):
+                                    #if the LTime is now higher than the 
+                                    break #exits the while loop
                                             
-                                        vehicle = laneL.cars.get() #removes a vehicle from the front of the queue
-
-                                        laneL.totalWait += LTime - vehicle.entryTime #adds to the total wait time of the lane
-                                        laneL.numCarsPassed += 1 #adds to the number of vehicles that have passed through the lane
-                                        laneL.maxWait = max(laneL.maxWait, (LTime - vehicle.entryTime)) #determines if this vehicle has had the longest wait so far
-
-                                        processWaitingVehiclesLane(laneL, LTime) #adds any vehicles that have entered the lane whilst this vehicle was leaving
-
-                                    else: #once there are no vehicles left in the L lane
-                                        LTime = laneL.lastCarTime + laneL.newCarRate #updates the time to be when the next vehicle joins
-                                        if(LTime < min((time - 5), (currentTime + lane.lightTime))): #if this vehicle would've joined before the end of the light OR before the next right vehicle 
-                                            laneL.numCarsPassed += 1 #add that the vehicle has passed the junction
-                                            laneL.lastCarTime = LTime #updates the last time a vehicle entered
+                                if laneL.series is not None and laneL.series.nextTime < LTime:
+                                    laneL.series.advance(LTime, laneL.getQueueSize()) #samples the queue before the vehicle leaves
+                                vehicle = laneL.cars.get() #removes a vehicle from the front of the queue
+                                laneL.direction.queuedVehicles -= 1 #the vehicle is no longer queued in the direction
+                                if profiler is not None:
+                                    profiler.count('queueGets')
+
+                                laneL.totalWait += LTime - vehicle.entryTime #adds to the total wait time of the lane
+                                laneL.numCarsPassed += 1 #adds to the number of vehicles that have passed through the lane
+                                laneL.maxWait = max(laneL.maxWait, (LTime - vehicle.entryTime)) #determines if this vehicle has had the longest wait so far
+                                laneL.waits.add(LTime - vehicle.entryTime) #adds the wait to the percentiles of the lane
+                                if trace is not None:
+                                    trace.record(laneL.traceId, vehicle.entryTime, LTime)
+
+                                processWaitingVehiclesLane(laneL, LTime) #adds any vehicles that have entered the lane whilst this vehicle was leaving
+
+                            else: #once there are no vehicles left in the L lane
+                                LTime = laneL.lastCarTime + laneL.newCarRate #updates the time to be when the next vehicle joins
+                                if(LTime < min((time - 5), (currentTime + lightTime))): #if this vehicle would've joined before the end of the light OR before the next right vehicle 
+                                    laneL.numCarsPassed += 1 #add that the vehicle has passed the junction
+                                    laneL.waits.add(0.0) #the vehicle did not wait
+                                    if trace is not None:
+                                        trace.record(laneL.traceId, LTime, LTime)
+                                    laneL.lastCarTime = LTime #updates the last time a vehicle entered
                                         
-                            if(time < (currentTime + lane.lightTime)): #if this vehicle would've joined before the end of the light
-                                lane.numCarsPassed += 1 #add that the vehicle has passed the junction
-                                lane.lastCarTime = time #updates the last time a vehicle entered
-                
-            else: #this direction has no right turn traffic so the opposite left turn lanes can operate independently
-                if(len(direction.laneLayout) > 1): #checks if there are more than 1 lane
-                    
-                    #check whether there are multiple lanes turning right (if so it is unsafe to run a left turn lane, so no left turn lanes are allowed to run)
-                    if ('R' not in direction.laneLayout[-2]): #if there is left turning in the second last lane
-                        for laneL in oppositeDirection.lanes['L']: #iterates over all left turn lanes
-                            if laneL.newCarRate == 0:
-                                continue
-                
-                            processOppositeLane(laneL, lane.lightTime, currentTime, junction) #runs the green light for the left lane
-                
-                else:
-                    for laneL in oppositeDirection.lanes['L']: #iterates over all left turn lanes
-                        if laneL.newCarRate == 0:
-                            continue
-                        processOppositeLane(laneL, lane.lightTime, currentTime, junction) #runs the green light for the left lane
+                    if(time < (currentTime + lightTime)): #if this vehicle would've joined before the end of the light
+                        lane.numCarsPassed += 1 #add that the vehicle has passed the junction
+                        lane.waits.add(0.0) #the vehicle did not wait
+                        if trace is not None:
+                            trace.record(lane.traceId, time, time)
+                        lane.lastCarTime = time #updates the last time a vehicle entered
+
+        elif mode == OPPOSITE_LEFTS: #this lane has no right turn traffic so the opposite left turn lanes can operate independently
+            for laneL in oppositeLefts: #iterates over all left turn lanes with traffic
+                processOppositeLane(laneL, lightTime, currentTime, headways, junction) #runs the green light for the left lane
         
         #if there is no left lane specific logic then the lane can run as normal
-        if normalRun:
+        if mode != GIVE_WAY:
             time = currentTime #starts the time as the currentTime
-            while(time < (currentTime + lane.lightTime)): #iterates as long as the time is less than the finishing time of the green light
+            while(time < (currentTime + lightTime)): #iterates as long as the time is less than the finishing time of the green light
                 if(lane.getQueueSize() != 0): #checks whether there is a vehicle on the queue
-                    time += junction.vehicleLength / junction.trafficSpeed #adds to the time the time it takes for a vehicle to travel one vehicle length
+                    time += headways[lane.cars.frontClass()][served] #adds to the time the time it takes for this vehicle to leave the queue
+                    served += 1
+                    if lane.series is not None and lane.series.nextTime < time:
+                        lane.series.advance(time, lane.getQueueSize()) #samples the queue before the vehicle leaves
                     vehicle = lane.cars.get() #removes a vehicle from the front of the queue
+                    lane.direction.queuedVehicles -= 1 #the vehicle is no longer queued in the direction
+                    if profiler is not None:
+                        profiler.count('queueGets')
 
                     lane.totalWait += time - vehicle.entryTime #adds to the total wait time of the lane
                     lane.numCarsPassed += 1 #adds to the number of vehicles that have passed through the lane
                     lane.maxWait = max(lane.maxWait, (time - vehicle.entryTime)) #determines if this vehicle has had the longest wait so far
+                    lane.waits.add(time - vehicle.entryTime) #adds the wait to the percentiles of the lane
+                    if trace is not None:
+                        trace.record(lane.traceId, vehicle.entryTime, time)
 
                     processWaitingVehiclesLane(lane, time) #adds any vehicles that have entered the lane whilst this vehicle was leaving
 
@@ -303,37 +701,61 @@ def runSimulation(junction):
                         break
 
                     time = lane.lastCarTime + lane.newCarRate #updates the time to be when the next vehicle joins
-                    if(time < (currentTime + lane.lightTime)): #if this vehicle would've joined before the end of the light
+                    if(time < (currentTime + lightTime)): #if this vehicle would've joined before the end of the light
                         lane.numCarsPassed += 1 #add that the vehicle has passed the junction
+                        lane.waits.add(0.0) #the vehicle did not wait
+                        if trace is not None:
+                            trace.record(lane.traceId, time, time)
                         lane.lastCarTime = time #updates the last time a vehicle entered
         
-        return (currentTime + lane.lightTime) #returns what the new time is
+        return (currentTime + lightTime) #returns what the new time is
 
 
-    def processGreen(direction, oppositeDirection, currentTime, junction):
+    def processGreen(laneSteps, oppositeLefts, currentTime, lightTime, headways, junction):
         """
         Description: processes the light being green for all lanes in the junction apart from CB
 
         Args:
-            direction(Direction): the direction which is being processed
+            laneSteps(tuple): the lane and mode of every lane in the direction apart from CB, from the phase plan
+            oppositeLefts(tuple): the left turn lanes with traffic in the opposite direction
             currentTime(Float): the currentTime of the simulation
+            lightTime(float): the length of the green light
+            headways(tuple): the time each vehicle of a queue takes to leave it once the light is green, by class code then position, from the phase plan
             junction(Junction): the junction that the simulation is being run in
         
         Returns:
             float: newTime - the time after the direction has been processed
         
         Methods:
-            processGreenlane(lane, direction, currentTime, junction): processes the green light for a specific lane
+            processGreenlane(lane, mode, oppositeLefts, currentTime, lightTime, headways, junction): processes the green light for a specific lane
+        """
+        for lane, mode in laneSteps: #iterates over all lanes in the direction
+            processGreenLane(lane, mode, oppositeLefts, currentTime, lightTime, headways, junction) #processes the lane being green
+
+        return currentTime + lightTime #returns the time after the direction has been processed
+
+
+    def actuatedGreenTime(direction, lanes, currentTime):
         """
-        iteration = 0 #counts which lane in the direction this is
-        for laneType, lanes in direction.lanes.items(): #iterates over all lane types in the direction
-            if(laneType != 'CB'): #as long as this lane isn't the CB lane
-                for lane in lanes: #iterates over all lanes in the direction
-                    newTime = processGreenLane(lane, iteration, direction, oppositeDirection, currentTime, junction) #processes the lane being green
-                    iteration += 1 #increments to the next lane
+        Description: The length of an actuated green light for the lanes of a direction, which lasts until none of them has
+        had a vehicle cross for the passage time of the direction, between its min and max green
 
-        return newTime #returns the time after the direction has been processed
+        Args:
+            direction(Direction): the direction of the lanes, holding its minGreen, maxGreen and passageTime
+            lanes(iterable): the lanes that get the green light
+            currentTime(float): the time the green light starts
 
+        Returns:
+            float: the length of the green light
+        """
+        lightTime = direction.minGreen
+        for lane in lanes:
+            greenTime = lane.gapOutTime(currentTime, lane.dischargeTime, direction.passageTime) - currentTime
+            if greenTime >= direction.maxGreen:
+                return direction.maxGreen #the other lanes cannot hold the light any longer
+            if greenTime > lightTime:
+                lightTime = greenTime
+        return lightTime
 
     def shouldActivatePedestrianCrossing(junction, currentTime, crossingRequests):
         """
@@ -378,37 +800,47 @@ def runSimulation(junction):
         else: #if this isn't the first green
             time = lane.lastCarTime + lane.newCarRate #starts the time at the next vehicle entry point
                     
+        queuedBefore = lane.cars.qsize() #the queue size before any vehicles are added, used to count the vehicles created
+        pattern = lane.classPattern
+        arrived = round(time / lane.newCarRate) - 1 #the number of vehicles that arrived before this one, which gives its class
+
         #iterate whilst the time is less than the current time
         while(time < currentTime):
-            vehicle = Vehicle(time, None, None) #creates the vehicle with the entry time as the time
-            lane.cars.put(vehicle) #adds the vehicle to the queue
+            if lane.series is not None and lane.series.nextTime < time:
+                lane.series.advance(time, lane.cars.qsize()) #samples the queue before the vehicle joins it
+            lane.cars.putArrival(time, pattern[arrived % len(pattern)]) #adds the vehicle and its class to the queue
+            arrived += 1
             lane.lastCarTime = time #updates the time that the last vehicle entered
             lane.maxQueue = max(lane.maxQueue, lane.cars.qsize()) #updates the maximum queue if the current queue is now longer
 
             time += lane.newCarRate #increments the time to when the next vehicle joins
 
+        created = lane.cars.qsize() - queuedBefore #no vehicles leave the queue in the loop above
+        lane.direction.queuedVehicles += created
+        if profiler is not None:
+            profiler.count('vehiclesCreated', created)
+            profiler.count('queuePuts', created) #unlike vehiclesCreated, not added to for the cycles that are extrapolated
+
 
-    def processWaitingVehicles(direction, currentTime, CB):
+    def processWaitingVehicles(lanes, currentTime):
         """
         Description: Processes all lanes for the vehicles before the currentTime
         
         Args:
-            direction(Direction): the direction object that the vehicles are being processed for
+            lanes(tuple): the lanes with traffic of the direction that the vehicles are being processed for, from the phase plan
             currentTime(float): the time of the simulation
-            CB(int): whether or not the cycle or bus lane should be processed (1 - Yes, 0 - No)
         
         Methods:
             processWaitingVehiclesLane(lane, currentTime): processes the waiting vehicles for a specific lane
 
         """
         if (currentTime != 0.0): #As long as the current time isn't 0
-            for lane_type, lanes in direction.lanes.items(): #iterates over all lane types
-                for lane in lanes: #iterates over all lanes
-                    if((lane_type != 'CB') or (CB == 1)): #as long as the lane isn't a CB lane or if we should be processing the CB lane
-                        processWaitingVehiclesLane(lane, currentTime) #sends to function to process the lane 
+            for lane in lanes: #iterates over all lanes
+                processWaitingVehiclesLane(lane, currentTime) #sends to function to process the lane 
        
     currentTime = 0.0
     simDuration = 3600 #1 hour = 3600 seconds
+    leaveTimes = junction.classLeaveTimes #the time a queued vehicle of each class takes to leave the junction
 
     #gets the times that a pedestrian crossing will be made
     if junction.isPedestrianCrossing:
@@ -418,9 +850,61 @@ def runSimulation(junction):
         while (time < 3600):
             crossingRequests.append(time + timeBetweenCrossings) #adds the time of this request to the list
             time += timeBetweenCrossings #increments the time by the next crossing gap
+    else:
+        crossingRequests = None
+
+    phasePlan = junction.phasePlan if junction.phasePlan is not None else compilePhasePlan(junction)
+    allLanes = [lane for direction in junction.directions.values() for lanes in direction.lanes.values() for lane in lanes]
+    if junction.queueSampleInterval > 0:
+        for lane in allLanes:
+            lane.series = QueueSeries(junction.queueSampleInterval, junction.queueSeriesPoints, simDuration)
+
+    steadyState = SteadyState(junction, crossingRequests, simDuration) if extrapolate and trace is None else None
+    if steadyState is not None and not steadyState.canSettle():
+        steadyState = None #the cycles never settle, so nothing is recorded
+    if steadyState is not None:
+        for lane in steadyState.lanes:
+            lane.waits.history = [] #the waits of the window are kept, to project those of the cycles after it
+            if lane.series is not None:
+                lane.series.history = [] #as are the queue samples
+
+    if trace is not None:
+        #the lanes are numbered in the order of endSimulation, and named after their direction, number and type
+        laneNames = []
+        for directionName, direction in junction.directions.items():
+            laneIteration = 0
+            for laneType, lanes in direction.lanes.items():
+                for lane in lanes:
+                    lane.traceId = len(laneNames)
+                    laneNames.append(f"{directionName} {laneIteration} {laneType}")
+                    laneIteration += 1
+        trace.begin(laneNames)
+    saturation = None #set if the queues outgrow the memory budget
+
+    loopIterations = 0 #the number of iterations of the main loop
+    if profiler is not None:
+        loopStart = timer.perf_counter() #the main loop is timed manually so that the endSimulation phase is not included
 
     # Main simulation loop
     while currentTime < simDuration: #runs the simulation as long as the time is less than the length of the simulation
+        if steadyState is not None:
+            #once every lane holds a steady trend, the whole cycles left are projected and only the end of the hour is simulated
+            skipped = steadyState.observe(currentTime, loopIterations, profiler.counters.get('vehiclesCreated', 0) if profiler is not None else 0)
+            if skipped is not None:
+                currentTime, skippedIterations, skippedVehicles = skipped
+                steadyState = None
+                if profiler is not None:
+                    profiler.count('extrapolatedIterations', skippedIterations)
+                    profiler.count('vehiclesCreated', skippedVehicles)
+
+        if junction.memoryBudget:
+            memoryUsed = sum(lane.cars.memoryUsed() for lane in allLanes)
+            if memoryUsed > junction.memoryBudget: #the junction is saturated, report it rather than run out of memory
+                queuedVehicles = sum(lane.cars.qsize() for lane in allLanes)
+                saturation = {'time': currentTime, 'memoryUsed': memoryUsed, 'memoryBudget': junction.memoryBudget, 'queuedVehicles': queuedVehicles}
+                break
+
+        loopIterations += 1
 
         # Handle pedestrian crossing if enabled
         if junction.isPedestrianCrossing:
@@ -429,60 +913,92 @@ def runSimulation(junction):
                 junction.lastCrossingTime = currentTime #sets the last time the pedestrian crossing was on to the current time
 
         # Process each direction in the junction
-        for directionName, direction in junction.directions.items():
-
-            #find what the opposite direction is
-            match direction.directionName:
-                case 'north':
-                    oppositeDirection = junction.directions['south']
-                case 'south':
-                    oppositeDirection = junction.directions['north']
-                case 'west':
-                    oppositeDirection = junction.directions['east']
-                case 'east':
-                    oppositeDirection = junction.directions['west']
+        for direction, CBLane, laneSteps, oppositeLefts, arrivalLanes, nonCBArrivalLanes, headways in phasePlan:
 
             #check if there have been any vehicles entering the junction since the last time
-            processWaitingVehicles(direction, currentTime, 1)
+            processWaitingVehicles(arrivalLanes, currentTime)
 
             #checks whether this direction has any traffic in it 
             if (direction.hasTraffic() == False):
                 currentTime += 1 #add 1 second to the time if there is no traffic
             else:
-                if(('CB' in direction.lanes) and (direction.lanes['CB'][0].getQueueSize() != 0)): 
+                if((CBLane is not None) and (CBLane.getQueueSize() != 0)): 
                     #if there is a cycle or bus lane, then run this lane first
-                    currentTime = processGreenLane(direction.lanes['CB'][0], -1, direction, oppositeDirection, currentTime, junction) #processes the green light
-                    processWaitingVehicles(direction, currentTime, 0) #processes the waiting vehicles for all but the CB lane
+                    lightTime = actuatedGreenTime(direction, (CBLane,), currentTime) if junction.actuated else direction.lightTime
+                    currentTime = processGreenLane(CBLane, NORMAL_RUN, oppositeLefts, currentTime, lightTime, headways, junction) #processes the green light
+                    currentTime += junction.intergreenTime #the amber and all-red before the next phase
+                    processWaitingVehicles(nonCBArrivalLanes, currentTime) #processes the waiting vehicles for all but the CB lane
                     
                 if direction.hasTraffic(): #checks if there is any traffic in the direction
-                    currentTime = processGreen(direction, oppositeDirection, currentTime, junction) #process the green light for that direction
-    
-    return endSimulation(junction) #sends the junction of to have all of the statistics gathered
+                    lightTime = actuatedGreenTime(direction, (lane for lane, _ in laneSteps), currentTime) if junction.actuated else direction.lightTime
+                    currentTime = processGreen(laneSteps, oppositeLefts, currentTime, lightTime, headways, junction) #process the green light for that direction
+                    currentTime += junction.intergreenTime #the amber and all-red before the next phase
+
+    for lane in allLanes:
+        lane.sampleQueueUntil(min(currentTime, simDuration)) #samples the queues up to the end, or the time the run was stopped
+
+    if profiler is not None:
+        profiler.addTime('runSimulation', timer.perf_counter() - loopStart)
+        profiler.count('mainLoopIterations', loopIterations)
+
+    with timePhase(profiler, 'endSimulation'):
+        simulationDict = endSimulation(junction) #sends the junction of to have all of the statistics gathered
+
+    if saturation is not None:
+        simulationDict['saturation'] = saturation
+    return simulationDict
                     
 
-def createSimulation(inputInformation):
+def createSimulation(inputInformation, profiler=None, distributions=None, memoryBudget=None, trace=None, actuation=None):
     """
     Creates the simulation with all user inputs
 
     Args: 
         inputInformation(Dictionary) - a dictionary containing the user inputted data
+        profiler(Profiler) - optional profiler recording the time of each phase, the profile is attached to the result under 'profile'
+        distributions(Dictionary) - optional cache of lane distributions shared by runs of similar junctions (see Junction.distributeVehicles)
+        memoryBudget(int) - optional number of bytes the queues of this run may take, overriding the queue_memory_budget_mb of system.cfg (0 for no budget)
+        trace(TraceRecorder) - optional recorder the lane, entry time and exit time of every vehicle are written to (see src/tracing.py)
+        actuation(Dictionary) - optional min green, max green and passage time of each direction, to run the lights as actuated signals rather than fixed times (see setActuation)
 
     Returns:
         Dictionary: simulationDict - the dictionary containing all information about the simulation run
 
     """
     junction = Junction(inputInformation) #creates the junction
-    junction.distributeVehicles() #distribute the vehicles within the junction
+    if memoryBudget is not None:
+        junction.memoryBudget = memoryBudget
+    with timePhase(profiler, 'distributeVehicles'):
+        junction.distributeVehicles(distributions) #distribute the vehicles within the junction
 
     if inputInformation[9]: #checks whether the user has specified the priority of the directions or not
         priorityNums = inputInformation[10] #sets the priority numbers to be the priority specified by the user
     else: #otherwise, if the user has left it to the system to decide
-        priorityNums = junction.calculateDirectionPriority() #calculates the priority direction numbers and/or the time for the green light in each direction
+        with timePhase(profiler, 'calculateDirectionPriority'):
+            priorityNums = junction.calculateDirectionPriority() #calculates the priority direction numbers and/or the time for the green light in each direction
 
     junction.priorityNums = priorityNums #add the priorityNums to the junction
-    
+    setLightTimes(junction, priorityNums) #set the green time of each direction, based off of the priority
+    if actuation is not None:
+        setActuation(junction, actuation) #the green lights follow the traffic instead
+    junction.phasePlan = compilePhasePlan(junction) #works out once how the lanes of each direction run on a green light
+
+    simulationDict = runSimulation(junction, profiler, trace=trace) #runs the simulation once it has been successfully created
+
+    if profiler is not None:
+        simulationDict['profile'] = profiler.asDict() #attaches the profile of the run to the result
 
-    #set the green time of each direction, based off of the priority
+    return simulationDict
+
+
+def setLightTimes(junction, priorityNums):
+    """
+    Description: Sets the green time of each direction and its lanes from the priority of the directions
+
+    Args:
+        junction(Junction): the junction whose lights are being set
+        priorityNums(Array): the priority of each direction [North, East, South, West] in a range 1-4
+    """
     iteration = 0
     for name, direction in junction.directions.items():
         
@@ -502,5 +1018,222 @@ def createSimulation(inputInformation):
                 lane.lightTime = direction.lightTime #set the light time within each lane to be the same as its parent direction
 
         iteration += 1
-        
-    return runSimulation(junction) #runs the simulation once it has been successfully created
+
+
+def setActuation(junction, actuation):
+    """
+    Description: Switches the junction to actuated signal control, where each green light lasts from the min green of its
+    direction until its lanes gap out (no vehicle crosses for the passage time), up to the max green
+
+    Args:
+        junction(Junction): the junction whose lights are being set
+        actuation(Dictionary): the minGreen, maxGreen and passageTime of each direction, keyed by the direction name; any
+        direction or time left out takes the actuated_min_green, actuated_max_green or actuated_passage_time of system.cfg
+
+    Raises:
+        ValueError: a time is not positive, or a max green is shorter than its min green
+
+    Notes:
+        The lightTime of every direction and lane becomes its max green, the longest its light can be green for.
+    """
+    for name, direction in junction.directions.items():
+        timings = actuation.get(name, {})
+        direction.minGreen = float(timings.get('minGreen', junction.actuatedMinGreen))
+        direction.maxGreen = float(timings.get('maxGreen', junction.actuatedMaxGreen))
+        direction.passageTime = float(timings.get('passageTime', junction.actuatedPassageTime))
+        if min(direction.minGreen, direction.maxGreen, direction.passageTime) <= 0:
+            raise ValueError(f"The actuation times of the {name} direction must be positive")
+        if direction.maxGreen < direction.minGreen:
+            raise ValueError(f"The max green of the {name} direction is shorter than its min green")
+
+        direction.lightTime = direction.maxGreen
+        for lanes in direction.lanes.values():
+            for lane in lanes:
+                lane.lightTime = direction.lightTime
+    junction.actuated = True
+
+
+def compilePhasePlan(junction):
+    """
+    Description: Works out how the lanes of every direction run on a green light, which does not change during a run
+
+    Args:
+        junction(Junction): the junction, its vehicles must already be distributed
+
+    Returns:
+        tuple: for each direction in the order of junction.directions, a tuple of the direction, its cycle or bus lane (None
+        if it has none), the lane and mode of each of its other lanes in processing order, the left turn lanes with
+        traffic of the opposite direction, the lanes of the direction that vehicles arrive in, with and without its
+        cycle or bus lanes, and the headway of each vehicle that leaves a queue during a green light of the direction, for
+        every class of vehicle
+
+    Notes:
+        Only the last lane of a direction without a cycle or bus lane lets the opposite left turn lanes run, and only when the
+        opposite direction has left turn lanes and the second last lane of the layout does not turn right (two right turning
+        lanes cross the path of the left turning vehicles). If the last lane of the layout turns right and has traffic, the
+        left turn lanes run in its gaps (GIVE_WAY), otherwise for the whole green light (OPPOSITE_LEFTS). A lane whose
+        opposite left turn lanes all have no traffic runs normally, as it would with them. Lanes without traffic never have
+        vehicles arrive, so they are left out of the arrival lanes.
+        The headways of a car are the saturationHeadways of the junction and then vehicleLength / trafficSpeed, with the
+        start-up lost time added to the first. Those of another class are the saturationHeadways scaled by how much longer
+        than a car it takes to leave, and then its own classLeaveTimes. There is one for every vehicle that can leave a queue
+        in the longest green light of the direction, so the simulation only has to look each one up by the class of the
+        vehicle at the front of the queue and the number of vehicles that left before it.
+    """
+    leaveTimes = junction.classLeaveTimes
+    startHeadways = [[headway * (leaveTime / leaveTimes[0]) for headway in junction.saturationHeadways] for leaveTime in leaveTimes]
+    shortest = min(min(classHeadways + [leaveTime]) for classHeadways, leaveTime in zip(startHeadways, leaveTimes))
+
+    phasePlan = []
+    for direction in junction.directions.values():
+        count = int(direction.lightTime / shortest) + 2 #a vehicle leaves at most every shortest headway while the light is green
+        headways = []
+        for classHeadways, leaveTime in zip(startHeadways, leaveTimes):
+            classHeadways = (classHeadways + [leaveTime] * count)[:max(count, 1)]
+            classHeadways[0] += junction.startUpLostTime
+            headways.append(tuple(classHeadways))
+
+
+        oppositeDirection = junction.directions[OPPOSITE_DIRECTIONS[direction.directionName]]
+        oppositeLefts = tuple(laneL for laneL in oppositeDirection.lanes.get('L', []) if laneL.newCarRate != 0)
+        rightTurnLast = 'R' in direction.laneLayout[-1] #the last lane of the layout contains right turning traffic
+        rightTurnConflict = len(direction.laneLayout) > 1 and 'R' in direction.laneLayout[-2] #so does the second last lane
+
+        laneSteps = []
+        lanes = [lane for laneType, typeLanes in direction.lanes.items() if laneType != 'CB' for lane in typeLanes]
+        for laneNum, lane in enumerate(lanes):
+            mode = NORMAL_RUN
+            if oppositeLefts and not rightTurnConflict and laneNum == len(direction.laneLayout) - 1:
+                mode = GIVE_WAY if rightTurnLast and lane.newCarRate != 0 else OPPOSITE_LEFTS
+            laneSteps.append((lane, mode))
+
+        CBLane = direction.lanes['CB'][0] if 'CB' in direction.lanes else None
+        arrivalLanes = tuple(lane for typeLanes in direction.lanes.values() for lane in typeLanes if lane.totalFlow != 0)
+        nonCBArrivalLanes = tuple(lane for lane in arrivalLanes if lane not in direction.lanes.get('CB', []))
+        phasePlan.append((direction, CBLane, tuple(laneSteps), oppositeLefts, arrivalLanes, nonCBArrivalLanes, tuple(headways)))
+    return tuple(phasePlan)
+
+
+def sameRanking(oldFlows, newFlows):
+    """
+    Description: Checks whether two sets of direction flows rank the directions the same way, in which case calculateDirectionPriority gives both the same priority
+
+    Args:
+        oldFlows(Array): the highest lane flow of each direction [North, East, South, West] of one run
+        newFlows(Array): the highest lane flow of each direction of another run
+
+    Returns:
+        bool: True if every pair of directions compares the same way (lower, equal or higher) in both
+    """
+    for i in range(len(oldFlows)):
+        for j in range(i + 1, len(oldFlows)):
+            if (oldFlows[i] > oldFlows[j]) - (oldFlows[i] < oldFlows[j]) != (newFlows[i] > newFlows[j]) - (newFlows[i] < newFlows[j]):
+                return False
+    return True
+
+
+class IncrementalSimulation:
+    """
+    Description: Keeps the state of a simulation run so that changing one arm re-simulates without redoing the work of the arms that did not change
+
+    Attributes:
+        inputInformation(Dictionary): the simulation input of the last run, in the format produced by metaphor
+        distributions(Dictionary): the lane distributions of every direction simulated so far (see Junction.distributeVehicles)
+        highFlows(Array): the highest lane flow of each direction in the last run (see Junction.directionHighFlows)
+        priorityNums(Array): the priority calculated for the last run, None if the user set the priority
+        output(Dictionary): the simulationDict of the last run, None before the first run
+        outputs(OrderedDict): the simulationDict of the last maxOutputs inputs simulated, least recently used first, so going back to a recent input is not simulated again
+
+    Methods:
+        __init__(self, inputInformation, distributions): initialises the simulation state
+        run(self, profiler): simulates the current input
+        changeArm(self, arm, flows, lanes, profiler): changes the flows and/or lanes of one arm and re-simulates the junction
+
+    Notes:
+        The main loop is always run in full, since every direction shares the signal cycle. What is reused is the lane
+        distribution of every arm seen before and the calculated priority, as long as the directions still rank the same.
+        The simulation is deterministic, so an input that has been simulated before returns a copy of its earlier output.
+    """
+
+    arms = ['north', 'east', 'south', 'west'] #the order of the arms in the simulation input, lanes under 1-4 and VPHFlowDirections under 5-8
+    maxOutputs = 4 #the number of outputs kept, each is a deep copy holding the queue series of every lane
+
+    def __init__(self, inputInformation, distributions=None):
+        """
+        Description: initialises the simulation state
+
+        Args:
+            inputInformation(Dictionary): the simulation input of the base junction, which is copied rather than changed
+            distributions(Dictionary): optional lane distributions to start from, such as those of an earlier IncrementalSimulation
+        """
+        self.inputInformation = dict(inputInformation)
+        self.distributions = {} if distributions is None else distributions
+        self.highFlows = None
+        self.priorityNums = None
+        self.output = None
+        self.outputs = OrderedDict()
+
+    def run(self, profiler=None):
+        """
+        Description: Simulates the current input, the same as createSimulation
+
+        Args:
+            profiler(Profiler): optional profiler recording the time of each phase, the profile is attached to the result under 'profile'
+
+        Returns:
+            Dictionary: simulationDict - the dictionary containing all information about the simulation run
+        """
+        key = tuple((name, tuple(value) if isinstance(value, list) else value) for name, value in sorted(self.inputInformation.items()))
+        if profiler is None and key in self.outputs: #a profiled run is always simulated so that it is timed
+            self.outputs.move_to_end(key)
+            self.output = copy.deepcopy(self.outputs[key])
+            return self.output
+
+        junction = Junction(self.inputInformation) #creates the junction
+        with timePhase(profiler, 'distributeVehicles'):
+            junction.distributeVehicles(self.distributions) #only directions with new flows or lanes are distributed
+
+        highFlows = junction.directionHighFlows()
+        if self.inputInformation[9]: #checks whether the user has specified the priority of the directions or not
+            priorityNums = self.inputInformation[10]
+            self.priorityNums = None
+        elif self.priorityNums is not None and sameRanking(self.highFlows, highFlows):
+            priorityNums = self.priorityNums #the directions rank as before, so the priority is the same
+        else:
+            with timePhase(profiler, 'calculateDirectionPriority'):
+                priorityNums = junction.calculateDirectionPriority()
+            self.priorityNums = priorityNums
+        self.highFlows = highFlows
+
+        junction.priorityNums = priorityNums
+        setLightTimes(junction, priorityNums)
+        junction.phasePlan = compilePhasePlan(junction)
+        self.output = runSimulation(junction, profiler)
+
+        if profiler is not None:
+            self.output['profile'] = profiler.asDict()
+        else:
+            self.outputs[key] = copy.deepcopy(self.output)
+            if len(self.outputs) > self.maxOutputs:
+                self.outputs.popitem(last=False) #forgets the least recently used output
+        return self.output
+
+    def changeArm(self, arm, flows=None, lanes=None, profiler=None):
+        """
+        Description: Changes the inputs of one arm and re-simulates the junction
+
+        Args:
+            arm(string): the arm that changed (north, east, south or west)
+            flows(Array): the new VPHFlowDirections of the arm [Left, Straight, Right, CycleOrBus], None to keep them
+            lanes(Array): the new lane layout of the arm (e.g. ['L', 'S', 'R']), None to keep it
+            profiler(Profiler): optional profiler recording the time of each phase
+
+        Returns:
+            Dictionary: simulationDict - the dictionary containing all information about the new simulation run
+        """
+        index = self.arms.index(arm) + 1
+        if lanes is not None:
+            self.inputInformation[index] = list(lanes)
+        if flows is not None:
+            self.inputInformation[index + 4] = list(flows)
+        return self.run(profiler)
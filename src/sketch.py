@@ -0,0 +1,215 @@
+import math
+
+PERCENTILES = (50, 85, 95, 99) #the percentiles of the wait reported for every lane, direction and junction
+
+
+class QuantileSketch:
+    """
+    Description: A fixed size summary of a stream of waits that answers percentiles to within a relative accuracy and can be merged
+
+    Attributes:
+        relativeAccuracy(float): how far, relative to the true value, an estimated percentile may be out
+        multiplier(float): 1 / log(gamma), where gamma = (1 + relativeAccuracy) / (1 - relativeAccuracy) is the ratio between buckets
+        minValue(float): waits no longer than this are counted as no wait
+        maxBuckets(int): the most buckets kept, the lowest are folded together beyond it
+        buckets(Dictionary): the number of waits in each bucket, keyed by the bucket index
+        zeros(int): the number of waits no longer than minValue
+        count(int): the number of waits added
+        maxValue(float): the longest wait added, which caps the estimates
+        history(list): when not None, every wait and count added is also appended to it, so they can be added again
+
+    Methods:
+        __init__(self, relativeAccuracy, minValue, maxBuckets): initialises an empty sketch
+        add(self, value, count): adds a wait
+        addRange(self, low, high, count): adds waits spread evenly between two values
+        merge(self, other): adds the waits of another sketch with the same accuracy
+        bucketValue(self, index): the value a bucket stands for
+        quantile(self, q): estimates a quantile of the waits
+        percentiles(self, percentiles): estimates the reported percentiles of the waits
+        toDict(self): the sketch as a JSON serialisable dictionary
+        fromDict(cls, sketchDict): rebuilds a sketch from toDict
+
+    Notes:
+        A logarithmic bucketing in the style of DDSketch: a wait v goes in bucket ceil(log(v) / log(gamma)), so every value in a
+        bucket is within relativeAccuracy of the value the bucket stands for. Adding a wait is one logarithm and one dictionary
+        update, merging adds the counts bucket by bucket, and the result does not depend on the order the waits were added in.
+        Waits from 0.001 seconds to a day fit in about 1100 buckets at the default 1% accuracy.
+    """
+
+    def __init__(self, relativeAccuracy=0.01, minValue=0.001, maxBuckets=2048):
+        """
+        Description: initialises an empty sketch
+
+        Args:
+            relativeAccuracy(float): how far, relative to the true value, an estimated percentile may be out
+            minValue(float): waits no longer than this are counted as no wait
+            maxBuckets(int): the most buckets kept
+        """
+        self.relativeAccuracy = relativeAccuracy
+        self.multiplier = 1 / math.log((1 + relativeAccuracy) / (1 - relativeAccuracy))
+        self.minValue = minValue
+        self.maxBuckets = maxBuckets
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.maxValue = 0.0
+        self.history = None
+
+    def add(self, value, count=1):
+        """
+        Description: Adds a wait to the sketch
+
+        Args:
+            value(float): the wait in seconds
+            count(int): the number of vehicles that waited that long
+        """
+        if self.history is not None:
+            self.history.append((value, count))
+        self.count += count
+        if value <= self.minValue:
+            self.zeros += count
+            return
+
+        if value > self.maxValue:
+            self.maxValue = value
+        index = math.ceil(math.log(value) * self.multiplier)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        if len(self.buckets) > self.maxBuckets:
+            self.collapse()
+
+    def addRange(self, low, high, count):
+        """
+        Description: Adds a number of waits spread evenly between two values, one bucket at a time
+
+        Args:
+            low(float): the shortest of the waits
+            high(float): the longest of the waits
+            count(int): the number of waits
+        """
+        if high <= low:
+            self.add(low, count)
+            return
+
+        added = 0
+        start = low
+        while start < high:
+            if start < self.minValue:
+                end = min(self.minValue, high)
+            else:
+                index = math.floor(math.log(start) * self.multiplier) + 1 #the first bucket that ends after the start
+                end = math.exp(index / self.multiplier)
+                while end <= start:
+                    index += 1
+                    end = math.exp(index / self.multiplier)
+                end = min(end, high)
+            share = round(count * (end - low) / (high - low)) - added
+            if share > 0:
+                self.add((start + end) / 2, share)
+                added += share
+            start = end
+        self.maxValue = max(self.maxValue, high) if high > self.minValue else self.maxValue
+
+    def collapse(self):
+        """
+        Description: Folds the lowest buckets together until there are maxBuckets, so only the shortest waits lose accuracy
+        """
+        indexes = sorted(self.buckets)
+        folded = indexes[:len(indexes) - self.maxBuckets + 1]
+        total = sum(self.buckets.pop(index) for index in folded)
+        self.buckets[folded[-1]] = total
+
+    def merge(self, other):
+        """
+        Description: Adds the waits of another sketch, as if they had been added to this one
+
+        Args:
+            other(QuantileSketch): a sketch with the same relativeAccuracy and minValue
+
+        Raises:
+            ValueError: the sketches have a different accuracy
+        """
+        if other.relativeAccuracy != self.relativeAccuracy or other.minValue != self.minValue:
+            raise ValueError("only sketches with the same accuracy can be merged")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.maxValue = max(self.maxValue, other.maxValue)
+        if len(self.buckets) > self.maxBuckets:
+            self.collapse()
+
+    def bucketValue(self, index):
+        """
+        Description: The value that a bucket stands for, within relativeAccuracy of every value in it
+
+        Args:
+            index(int): the index of the bucket
+
+        Returns:
+            float: the value
+        """
+        gamma = (1 + self.relativeAccuracy) / (1 - self.relativeAccuracy)
+        return 2 * gamma ** index / (gamma + 1)
+
+    def quantile(self, q):
+        """
+        Description: Estimates a quantile of the waits
+
+        Args:
+            q(float): the quantile, from 0 to 1
+
+        Returns:
+            float: the estimated wait, 0 if no waits have been added
+        """
+        if self.count == 0:
+            return 0
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+
+        seen = self.zeros
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                break
+        return min(self.bucketValue(index), self.maxValue)
+
+    def percentiles(self, percentiles=PERCENTILES):
+        """
+        Description: Estimates the reported percentiles of the waits
+
+        Args:
+            percentiles(tuple): the percentiles, from 0 to 100
+
+        Returns:
+            Dictionary: the estimated wait of each percentile, keyed p50, p85 and so on
+        """
+        return {f"p{percentile}": self.quantile(percentile / 100) for percentile in percentiles}
+
+    def toDict(self):
+        """
+        Description: The sketch as a JSON serialisable dictionary, to be merged with the sketches of other runs
+
+        Returns:
+            Dictionary: the accuracy, counts and buckets of the sketch
+        """
+        return {'relativeAccuracy': self.relativeAccuracy, 'minValue': self.minValue, 'maxBuckets': self.maxBuckets, 'count': self.count,
+                'zeros': self.zeros, 'maxValue': self.maxValue, 'buckets': {str(index): count for index, count in sorted(self.buckets.items())}}
+
+    @classmethod
+    def fromDict(cls, sketchDict):
+        """
+        Description: Rebuilds a sketch from toDict, including one that has been through JSON
+
+        Args:
+            sketchDict(Dictionary): the dictionary produced by toDict
+
+        Returns:
+            QuantileSketch: the sketch
+        """
+        sketch = cls(sketchDict['relativeAccuracy'], sketchDict['minValue'], sketchDict['maxBuckets'])
+        sketch.buckets = {int(index): count for index, count in sketchDict['buckets'].items()}
+        sketch.zeros = sketchDict['zeros']
+        sketch.count = sketchDict['count']
+        sketch.maxValue = sketchDict['maxValue']
+        return sketch
@@ -0,0 +1,204 @@
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+
+
+class QueueSeries:
+    """
+    Description: The queue length of a lane sampled at a fixed interval, downsampled to at most a fixed number of points
+
+    Attributes:
+        interval(float): the time between samples
+        points(int): the most points kept, the buffers are allocated to this size up front
+        endTime(float): samples are only taken before this time
+        mins(array): the shortest queue of each point
+        maxs(array): the longest queue of each point
+        sums(array): the total of the samples of each point, for its mean
+        length(int): the number of points in use
+        span(int): the number of samples in every point but the last
+        filled(int): the number of samples in the last point
+        nextTick(int): the number of the next sample
+        nextTime(float): the time of the next sample
+        history(list): when not None, every sample is also appended to it, so they can be added again
+
+    Methods:
+        __init__(self, interval, points, endTime): initialises an empty series
+        add(self, value, count): adds the next samples
+        downsample(self): halves the number of points by merging neighbouring pairs
+        advance(self, time, size): samples a queue of size at every tick before the time
+        secondsPerPoint(self): the time covered by each point
+        asDict(self): the series as lists of the min, max and mean of each point
+
+    Notes:
+        Once all the points are in use, neighbouring pairs are merged into one point holding their min, max and total, so a
+        series never takes more than points entries however long the simulation runs, and each point covers a power of two
+        samples. The lengths are stored in array('I') and the totals in array('Q'), 4 and 8 bytes a point.
+    """
+
+    def __init__(self, interval, points, endTime):
+        """
+        Description: initialises an empty series
+
+        Args:
+            interval(float): the time between samples
+            points(int): the most points kept, rounded up to an even number
+            endTime(float): samples are only taken before this time
+        """
+        self.interval = interval
+        self.points = points + points % 2
+        self.endTime = endTime
+        self.mins = array('I', bytes(4 * self.points))
+        self.maxs = array('I', bytes(4 * self.points))
+        self.sums = array('Q', bytes(8 * self.points))
+        self.length = 0
+        self.span = 1
+        self.filled = 1 #as if a full point came before the first
+        self.nextTick = 0
+        self.nextTime = 0.0
+        self.history = None
+
+    def add(self, value, count=1):
+        """
+        Description: Adds the next samples, a run of equal samples is added a point at a time
+
+        Args:
+            value(int): the length of the queue at the time of the samples
+            count(int): the number of samples of that length
+        """
+        if self.history is not None:
+            self.history.extend([value] * count)
+        self.nextTick += count
+        self.nextTime = self.nextTick * self.interval
+
+        while count > 0:
+            if self.filled == self.span: #the last point is full, so the samples start a new one
+                if self.length == self.points:
+                    self.downsample()
+                taken = count if count < self.span else self.span
+                self.mins[self.length] = value
+                self.maxs[self.length] = value
+                self.sums[self.length] = value * taken
+                self.length += 1
+                self.filled = taken
+            else:
+                point = self.length - 1
+                taken = self.span - self.filled
+                if count < taken:
+                    taken = count
+                if value < self.mins[point]:
+                    self.mins[point] = value
+                elif value > self.maxs[point]:
+                    self.maxs[point] = value
+                self.sums[point] += value * taken
+                self.filled += taken
+            count -= taken
+
+    def downsample(self):
+        """
+        Description: Halves the number of points by merging each neighbouring pair, doubling the samples in a point
+        """
+        for point in range(self.length // 2):
+            self.mins[point] = min(self.mins[2 * point], self.mins[2 * point + 1])
+            self.maxs[point] = max(self.maxs[2 * point], self.maxs[2 * point + 1])
+            self.sums[point] = self.sums[2 * point] + self.sums[2 * point + 1]
+        self.length //= 2
+        self.span *= 2
+        self.filled = self.span
+
+    def advance(self, time, size):
+        """
+        Description: Samples a queue of the given size at every tick before the time (and before endTime), called just before the queue changes
+
+        Args:
+            time(float): the time the queue changes
+            size(int): the length of the queue until then
+        """
+        limit = min(time, self.endTime)
+        if self.nextTime < limit:
+            ticks = math.ceil(limit / self.interval) #the first tick not before the limit, corrected for the rounding of the division
+            while (ticks - 1) * self.interval >= limit:
+                ticks -= 1
+            while ticks * self.interval < limit:
+                ticks += 1
+            self.add(size, ticks - self.nextTick)
+
+    def secondsPerPoint(self):
+        """
+        Description: The time covered by each point
+
+        Returns:
+            float: the interval times the number of samples in a point
+        """
+        return self.interval * self.span
+
+    def asDict(self):
+        """
+        Description: The series as lists, the last point may hold fewer samples than the rest
+
+        Returns:
+            Dictionary: the seconds covered by each point and the min, max and mean queue length of every point
+        """
+        means = [self.sums[point] / self.span for point in range(self.length - 1)]
+        if self.length:
+            means.append(self.sums[self.length - 1] / self.filled)
+        return {'interval': self.secondsPerPoint(), 'min': self.mins[:self.length].tolist(), 'max': self.maxs[:self.length].tolist(), 'mean': means}
+
+
+def packQueueSeries(simulationDict):
+    """
+    Description: Packs the queue series of every lane of a simulation output into one compressed blob, to be stored in the database
+
+    Args:
+        simulationDict(Dictionary): the output of the simulation
+
+    Returns:
+        bytes: the zlib compressed blob, None if the output has no queue series
+    """
+    lanes = []
+    data = bytearray()
+    for directionName in ['north', 'east', 'south', 'west']:
+        laneIteration = 0
+        while laneIteration in simulationDict[directionName]:
+            series = simulationDict[directionName][laneIteration].get('queueSeries')
+            if series is None:
+                return None
+            lanes.append([directionName, laneIteration, series['interval'], len(series['min'])])
+            for values, typecode in [(series['min'], 'I'), (series['max'], 'I'), (series['mean'], 'd')]:
+                values = array(typecode, values)
+                if sys.byteorder == 'big':
+                    values.byteswap() #the blob is always little-endian
+                data += values.tobytes()
+            laneIteration += 1
+
+    header = json.dumps(lanes).encode('utf-8')
+    return zlib.compress(struct.pack('<I', len(header)) + header + data)
+
+
+def unpackQueueSeries(blob):
+    """
+    Description: Unpacks a blob made by packQueueSeries
+
+    Args:
+        blob(bytes): the compressed blob
+
+    Returns:
+        Dictionary: the queue series of every lane, keyed by direction then lane number as in the simulation output
+    """
+    data = zlib.decompress(blob)
+    headerLength = struct.unpack_from('<I', data)[0]
+    offset = 4 + headerLength
+    seriesDict = {'north': {}, 'east': {}, 'south': {}, 'west': {}}
+    for directionName, laneIteration, interval, length in json.loads(data[4:offset]):
+        series = {'interval': interval}
+        for key, typecode in [('min', 'I'), ('max', 'I'), ('mean', 'd')]:
+            values = array(typecode)
+            values.frombytes(data[offset:offset + length * values.itemsize])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            offset += length * values.itemsize
+            series[key] = values.tolist()
+        seriesDict[directionName][laneIteration] = series
+    return seriesDict
@@ -0,0 +1,203 @@
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b'TWTRACE1' #the first bytes of every trace file
+RECORD = struct.Struct('<Qdd') #lane id, entry time and exit time of one vehicle, 24 bytes
+FIELDS = {'laneId': ('Q', 0), 'entryTime': ('d', 1), 'exitTime': ('d', 2)} #the format and position of each field within a record
+BUFFER_RECORDS = 65536 #the records buffered before they are written, 1.5 MB
+
+
+class TraceRecorder:
+    """
+    Description: An opt-in sink that writes the lane, entry time and exit time of every vehicle leaving the junction to a binary file
+
+    Attributes:
+        path(string): the path of the trace file
+        file(file): the trace file, open for writing
+        buffer(bytearray): the records not yet written
+        buffered(int): the number of records in the buffer
+        recorded(int): the number of records written or buffered
+        laneNames(list): the name of each lane id, set by begin
+
+    Methods:
+        __init__(self, path, bufferRecords): opens the trace file
+        begin(self, laneNames): writes the header, naming the lane of each lane id
+        record(self, laneId, entryTime, exitTime): records a vehicle leaving the junction
+        flush(self): writes the buffered records
+        close(self): writes the buffered records and closes the file
+
+    Notes:
+        The file is the MAGIC bytes, the length of the header as a little-endian 32 bit integer, the JSON list of lane names
+        padded to a multiple of 8 bytes, then one RECORD per vehicle in the order they left. With numpy the records can be
+        mapped with numpy.memmap(path, dtype=[('laneId', '<u8'), ('entryTime', '<f8'), ('exitTime', '<f8')], offset=TraceReader(path).offset).
+    """
+
+    def __init__(self, path, bufferRecords=BUFFER_RECORDS):
+        """
+        Description: Opens the trace file, replacing any file already at the path
+
+        Args:
+            path(string): the path of the trace file
+            bufferRecords(int): the number of records buffered before they are written
+        """
+        self.path = path
+        self.file = open(path, 'wb')
+        self.buffer = bytearray(bufferRecords * RECORD.size)
+        self.buffered = 0
+        self.recorded = 0
+        self.laneNames = None
+
+    def begin(self, laneNames):
+        """
+        Description: Writes the header of the trace, which must come before any record
+
+        Args:
+            laneNames(list): the name of each lane, the lane id of a record is its index in this list
+        """
+        header = json.dumps(laneNames).encode('utf-8')
+        header += b' ' * (-(len(MAGIC) + 4 + len(header)) % 8) #pads the header so the records are 8 byte aligned
+        self.file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self.laneNames = list(laneNames)
+
+    def record(self, laneId, entryTime, exitTime):
+        """
+        Description: Records a vehicle leaving the junction
+
+        Args:
+            laneId(int): the index of the lane in the laneNames given to begin
+            entryTime(float): the time that the vehicle entered the lane
+            exitTime(float): the time that the vehicle left the junction
+        """
+        RECORD.pack_into(self.buffer, self.buffered * RECORD.size, laneId, entryTime, exitTime)
+        self.buffered += 1
+        self.recorded += 1
+        if self.buffered * RECORD.size == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        """
+        Description: Writes the buffered records to the file
+        """
+        if self.laneNames is None:
+            raise ValueError("begin must be called before the trace is written")
+        self.file.write(memoryview(self.buffer)[:self.buffered * RECORD.size])
+        self.buffered = 0
+
+    def close(self):
+        """
+        Description: Writes the buffered records and closes the file
+        """
+        if not self.file.closed:
+            try:
+                self.flush()
+            finally:
+                self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+
+class TraceReader:
+    """
+    Description: Reads a trace file through a memory map, so only the pages that are used are ever loaded
+
+    Attributes:
+        laneNames(list): the name of each lane id
+        offset(int): the position of the first record in the file
+        records(memoryview): the bytes of the records, straight from the memory map
+
+    Methods:
+        __init__(self, path): maps the trace file
+        __len__(self): the number of records
+        __getitem__(self, index): the lane id, entry time and exit time of one vehicle
+        __iter__(self): every record in turn
+        column(self, name): one field of every record, as a memoryview
+        close(self): releases the memory map
+    """
+
+    def __init__(self, path):
+        """
+        Description: Maps the trace file and reads its header
+
+        Args:
+            path(string): the path of a file written by a TraceRecorder
+
+        Raises:
+            ValueError: the file is not a trace, or is cut off within its header
+
+        Notes:
+            A trace cut off within a record, as when a run is stopped before the recorder is closed, is read up to its last whole record.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < len(MAGIC) + 4:
+                raise ValueError(f"{path} is not a trace file")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a trace file")
+
+        headerLength = struct.unpack_from('<I', self.map, len(MAGIC))[0]
+        self.offset = len(MAGIC) + 4 + headerLength
+        if self.offset > len(self.map):
+            self.map.close()
+            raise ValueError(f"the header of {path} is cut off")
+        self.laneNames = json.loads(self.map[len(MAGIC) + 4:self.offset])
+        wholeRecords = (len(self.map) - self.offset) // RECORD.size
+        self.records = memoryview(self.map)[self.offset:self.offset + wholeRecords * RECORD.size]
+
+    def __len__(self):
+        return len(self.records) // RECORD.size
+
+    def __getitem__(self, index):
+        """
+        Description: The record of one vehicle
+
+        Args:
+            index(int): the position of the vehicle in the trace, negative from the end
+
+        Returns:
+            tuple: the lane id, entry time and exit time
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trace index out of range")
+        return RECORD.unpack_from(self.records, index * RECORD.size)
+
+    def __iter__(self):
+        return RECORD.iter_unpack(self.records)
+
+    def column(self, name):
+        """
+        Description: One field of every record, without copying it out of the memory map
+
+        Args:
+            name(string): laneId, entryTime or exitTime
+
+        Returns:
+            memoryview: a strided view of the field, of integers for laneId and floats for the times
+
+        Notes:
+            The view reads the file in the byte order of the machine, which is the little-endian order the file is written in on
+            x86 and ARM. It must be released before the reader is closed.
+        """
+        fieldFormat, position = FIELDS[name]
+        return self.records.cast(fieldFormat)[position::RECORD.size // 8]
+
+    def close(self):
+        """
+        Description: Releases the memory map
+        """
+        self.records.release()
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
@@ -0,0 +1,648 @@
+from itertools import compress
+
+# The largest values the junction key has room for (see KEY_STRUCT of db_functions): the flows, buses per hour and
+# crossing fields take 4 bytes each and the priorities and lane counts 1 byte
+MAX_KEY_INT = 2**32 - 1
+MAX_PRIORITY = 4 #the form offers 0 (none) to 4
+
+
+def validateBusLane(inputs, direction):
+  """ Validates bus/cycle lane input for a given direction.
+
+  Ensures that if the bus or the cycle lane checkbox is checked, a valid number of buses/cyclist per hour is provided.
+  The number must be a non-negative integer.
+
+  Args:
+      inputs (dict): Dictionary containing form inputs.
+      direction (str): Direction of the bus lane (e.g., "northbound").
+
+  Returns:
+      dict: A dictionary containing validation errors, if any.
+  """
+
+  buses_per_hour = inputs.get(f"{direction}_buses_per_hour")
+
+  if inputs.get(f"{direction}_bus_lane") == "true":
+    buses_per_hour = inputs.get(f"{direction}_buses_per_hour")
+
+    if not buses_per_hour:
+      return {f"{direction}_buses_per_hour" : f"The number of {direction} buses/cyclist per hour is required if bus lane is enabled."}
+
+    try:
+      num = int(buses_per_hour)
+      if num < 0 :
+        return {f"{direction}_buses_per_hour" : f"The number of {direction} buses/cyclist per hour must be a non-negative integer."}
+      if num > MAX_KEY_INT:
+        return {f"{direction}_buses_per_hour" : f"The number of {direction} buses/cyclist per hour must be at most {MAX_KEY_INT}."}
+    except ValueError:
+      return {f"{direction}_buses_per_hour" : f"The number of {direction} buses/cyclist per hour must be a valid integer." }
+
+  return {}
+
+
+def validatePedestrianCrossing(inputs):
+  """
+  Validates pedestrian crossing input.
+
+  Ensures that if the pedestrian crossing checkbox is checked, valid values for crossing requests per hour and crossing duration are provided. These values must be non-negative integers.
+
+  Args:
+      inputs (dict): Dictionary containing form inputs.
+
+  Returns:
+      dict: A dictionary containing validation errors, if any.
+  """
+  errors = {}
+  crossingRequestsPH = inputs.get("crossing_requests_PH")
+  duration = inputs.get("duration")
+
+  if inputs.get("pedestrian_crossing") == "true":
+    if crossingRequestsPH == "":
+      errors["crossing_requests"] = "The number of crossing requests per hour is required if pedestrian crossing is enabled."
+    else:
+      try:
+        num = int(crossingRequestsPH)
+        if num < 0:
+          errors["crossing_requests"] = "The number of crossing requests must be non-negative"
+        elif num > MAX_KEY_INT:
+          errors["crossing_requests"] = f"The number of crossing requests must be at most {MAX_KEY_INT}."
+      except ValueError:
+        errors["crossing_requests"] = "The number of crossing requests must be a valid integer."
+
+    if duration == "":
+      errors["duration"] = "The duration of the crossing requests is required if pedestrian crossing is enabled."
+    else:
+      try:
+        num = int(duration)
+        if num < 0:
+          errors["duration"] = "The duration of crossing requests must be non-negative"
+        elif num > MAX_KEY_INT:
+          errors["duration"] = f"The duration of crossing requests must be at most {MAX_KEY_INT}."
+      except ValueError:
+          errors["duration"] = "The duration of crossing requests must be a valid integer."
+
+  return errors
+
+
+def validatePriority(inputs):
+  """
+  Validates priority lane input.
+
+  Ensures that there are no duplicate priority values assigned.
+
+  Args:
+      inputs (dict): Dictionary containing form inputs.
+
+  Returns:
+      dict: A dictionary containing validation errors, if any.
+  """
+  errors = {}
+  priorityValues = [value for value in inputs.values() if value != "-"]
+  if len(priorityValues) != len(set(priorityValues)): 
+    errors["priority_duplicate"] = "Priorities must be unique for each direction."
+  #return errors
+  return {}
+
+
+def validateFlows(inputs, direction):
+  """
+  Validates traffic flow input for a given direction.
+
+  Ensures that the total exit flow matches the entered vehicles per hour (vph) and all values are non-negative integers.
+
+  Args:
+      inputs (dict): Dictionary containing form inputs.
+      direction (str): Traffic direction (e.g., "northbound").
+
+  Returns:
+      dict: A dictionary containing validation errors, if any.
+  """
+  errors = {}
+  vph_key = f"{direction}_vph"
+  vph = inputs.get(vph_key)
+
+  if not vph :
+    errors[vph_key] = f"{direction.capitalize()} vehicles per hour (vph) is required."
+  else:
+    try:
+      vph = int(vph)
+      if vph < 0:
+          errors[vph_key] = f"{direction.capitalize()} vehicles per hour (vph) must be a non-negative integer."
+      elif vph > MAX_KEY_INT:
+          errors[vph_key] = f"{direction.capitalize()} vehicles per hour (vph) must be at most {MAX_KEY_INT}."
+    except ValueError:
+      errors[vph_key] = f"{direction.capitalize()} vehicles per hour (vph) must be a valid integer."
+
+  if direction == "northbound":
+    exit_flows = {
+      "north_exit": inputs.get("northbound_north_exit"),
+      "east_exit": inputs.get("northbound_east_exit"),
+      "west_exit": inputs.get("northbound_west_exit")
+    }
+  elif direction == "eastbound":
+    exit_flows = {
+      "north_exit": inputs.get("eastbound_north_exit"),
+      "east_exit": inputs.get("eastbound_east_exit"),
+      "south_exit": inputs.get("eastbound_south_exit")
+    }
+
+  elif direction == "westbound":
+    exit_flows = {
+      "west_exit": inputs.get("westbound_west_exit"),
+      "north_exit": inputs.get("westbound_north_exit"),
+      "south_exit": inputs.get("westbound_south_exit")
+    }
+  elif direction == "southbound":
+    exit_flows = {
+      "south_exit": inputs.get("southbound_south_exit"),
+      "east_exit": inputs.get("southbound_east_exit"),
+      "west_exit": inputs.get("southbound_west_exit")
+    } 
+
+  total_exits = 0
+  for exit_key, exit_value in exit_flows.items():
+    if not exit_value or exit_value == "":
+      errors[f"{direction}_{exit_key}"] = f"•{direction.capitalize()} {exit_key.replace('_',' ')} is required."
+    else:
+      try:
+        exit_value = int(exit_value)
+        if exit_value < 0:
+          errors[f"{direction}_{exit_key}"] = f"•{direction.capitalize()} {exit_key.replace('_',' ')} must be a non-negative integer." 
+        elif exit_value > MAX_KEY_INT:
+          errors[f"{direction}_{exit_key}"] = f"•{direction.capitalize()} {exit_key.replace('_',' ')} must be at most {MAX_KEY_INT}."
+        total_exits += exit_value
+      except ValueError:
+        errors[f"{direction}_{exit_key}"] = f"•{direction.capitalize()} {exit_key.replace('_',' ')} must be a valid integer."
+
+  if total_exits != vph:
+    errors[f"{direction}_exits"] = f"{direction.capitalize()} exit flow must sum to the total vehicles per hour (vph)."
+  return errors
+
+
+def validateLaneCombo(laneInputs, busInput, cycle, rightTraffic, leftTraffic, straightTraffic, direction):
+  """
+  Validates lane configuration for a given direction to ensure logical consistency.
+
+  Parameters:
+  laneInputs (dict): A dictionary containing lane selections for the given direction.
+  busInput (dict): A dictionary containing bus lane selections.
+  cycle (str): Indicates whether a cycle lane is present ("true" if selected, otherwise not).
+  rightTraffic (int): Number of vehicles turning right.
+  leftTraffic (int): Number of vehicles turning left.
+  straightTraffic (int): Number of vehicles going straight.
+  direction (str): The traffic direction (e.g., "north", "south", etc.).
+
+  Returns:
+  dict: A dictionary containing validation errors, where keys represent invalid lane selections and values provide explanatory error messages.
+
+  Validation Rules:
+  - A direction cannot have both a cycle and a bus lane.
+  - Selecting a left-right-straight lane prevents choosing any other lane type.
+  - Selecting a left-right lane prevents straight traffic or straight lane selections.
+  - If there is traffic turning left, right or straight, there must be a corresponding lane.
+  - The total number of lanes must match the sum of selected lanes.
+
+  Errors are returned in a dictionary with keys indicating the specific issue and values containing user-friendly error messages.
+  """
+  errors = {}
+  cycleLane = cycle
+  typeOfLanes = ["left_lane_count", "right_lane_count", "straight_lane_count", "straight_left_lane", "straight_right_lane", "left_right_straight_lane", "left_right_lane"  ]
+
+  try:
+    rightTraffic = int(rightTraffic)
+    leftTraffic = int(leftTraffic)
+    straightTraffic = int(straightTraffic)
+  except (ValueError,TypeError):
+    return errors 
+
+  #each direction can have either a cycle or bus lane, not both.
+  if cycleLane == "true" and busInput.get(f"{direction}_bus_lane") == "true":
+    errors[f"{direction}_cycle_lane"] = "You can't have both a cycle and a bus lane"
+
+  #if left/right/straight lane chosen then no other lanes can be chosen
+  if laneInputs.get(f"{direction}_left_right_straight_lane") == "true":
+
+    if (#laneInputs.get(f"{direction}_left_right_lane") == "true" or
+     #laneInputs.get(f"{direction}_left_lane_count") != "0" or 
+     #laneInputs.get(f"{direction}_right_lane_count") != "0" or 
+     laneInputs.get(f"{direction}_straight_lane_count") != "0" or 
+     laneInputs.get(f"{direction}_straight_left_lane") == "true" or 
+     laneInputs.get(f"{direction}_straight_right_lane") == "true") :
+
+      return {f"{direction}_left_right_straight_lane" : "If left-right-straight lane is selected, you may only add additional left or right lanes (safety reasons)."}
+
+  #if left/right lane chosen, cannot have traffic going straight/ or any other way
+  if laneInputs.get(f"{direction}_left_right_lane") == "true":
+    if (laneInputs.get(f"{direction}_left_right_straight_lane") == "true" or
+     laneInputs.get(f"{direction}_straight_lane_count") != "0" or 
+     laneInputs.get(f"{direction}_straight_left_lane") == "true" or 
+     laneInputs.get(f"{direction}_straight_right_lane") == "true" or straightTraffic > 0) :
+
+      errors[f"{direction}_left_right_lane"] = "If left-right lane is selected, there cannot be traffic going straight and no straight lanes."
+
+  if rightTraffic > 0 and laneInputs.get(f"{direction}_left_right_straight_lane") != "true" and laneInputs.get(f"{direction}_left_right_lane") != "true":
+    if laneInputs.get(f"{direction}_left_lane_count") == "0" and laneInputs.get(f"{direction}_straight_left_lane") != "true":
+      errors[f"{direction}_right_lane"] = "If there is left turning traffic, there must be space for a right turning lane."
+
+  if leftTraffic > 0 and laneInputs.get(f"{direction}_left_right_straight_lane") != "true" and laneInputs.get(f"{direction}_left_right_lane") != "true":
+    if laneInputs.get(f"{direction}_right_lane_count") == "0" and laneInputs.get(f"{direction}_straight_right_lane") != "true":
+      errors[f"{direction}_left_lane"] = "If there is right turning traffic, there must be space for a left turning lane."
+
+  if straightTraffic > 0 and laneInputs.get(f"{direction}_left_right_straight_lane") != "true" and laneInputs.get(f"{direction}_left_right_lane") != "true":
+    if laneInputs.get(f"{direction}_straight_lane_count") == "0" and laneInputs.get(f"{direction}_straight_left_lane") != "true" and laneInputs.get(f"{direction}_straight_right_lane") != "true": 
+      errors[f"{direction}_straight_lane"] = "If there is straight traffic, there must be space for a straight lane."
+
+  #validates if the total lane count is greater than 1 but less than 5
+  sumofLanes = 0
+  for lane in typeOfLanes:
+    laneValue = laneInputs.get(f"{direction}_{lane}")
+    if laneValue not in [None, "-"]:
+      try:
+        sumofLanes += int(laneValue)
+        if int(laneValue) < 0:
+          errors[f"{direction}_total_lane_count"] = "Lane counts must be non-negative."
+      except ValueError:
+        if laneValue == "on":
+          sumofLanes += 1
+
+  # If a bus lane was selected, increment the lane count by 1
+  if busInput.get(f"{direction}_bus_lane") == 'true':
+    sumofLanes += 1
+
+  # if sumofLanes < 1:
+  #   errors[f"{direction}_total_lane_count"] = "There must be at least one lane selected for the direction. "
+  if sumofLanes > 5:
+    errors[f"{direction}_total_lane_count"] = f"The total lane count must not exceed 5 (currently selected {sumofLanes})."
+
+  return errors
+
+
+# For each arm: the bound of its traffic, the exits of that bound (in form order) and which exit is the right turn, left turn and straight on
+ARMS = {
+  "north": ("northbound", ["north", "east", "west"], ("west", "east", "north")),
+  "east": ("eastbound", ["north", "east", "south"], ("north", "south", "east")),
+  "south": ("southbound", ["south", "east", "west"], ("east", "west", "south")),
+  "west": ("westbound", ["west", "north", "south"], ("south", "north", "west"))
+}
+
+# The lane checkboxes and dropdowns of an arm, keyed by their name in the JSON spec
+LANE_COUNTS = {"left": "left_lane_count", "right": "right_lane_count", "straight": "straight_lane_count"}
+LANE_FLAGS = {"left_right": "left_right_lane", "left_right_straight": "left_right_straight_lane", "straight_left": "straight_left_lane", "straight_right": "straight_right_lane"}
+
+
+def validate_form(form):
+  """ Validates a submitted junction with every validator above.
+
+  Args:
+      form (dict): The junction as posted by the index page form (any mapping with a get method).
+
+  Returns:
+      dict: A dictionary containing validation errors, if any.
+  """
+  errors = {}
+
+  for arm, (bound, exits, (right_exit, left_exit, straight_exit)) in ARMS.items():
+    # Required Inputs (textboxes)
+    flowInput = {f"{bound}_vph" : form.get(f"{bound}_vph")}
+    for exit_name in exits:
+      flowInput[f"{bound}_{exit_name}_exit"] = form.get(f"{bound}_{exit_name}_exit")
+    errors.update(validateFlows(flowInput, bound))
+
+    #Cycle/Bus lane
+    busInputs = {
+      f"{arm}_bus_lane" : form.get(f"{arm}_bus_lane"),
+      f"{arm}_buses_per_hour" : form.get(f"{arm}_buses_per_hour")
+    }
+    errors.update(validateBusLane(busInputs, arm))
+
+    laneInputs = {
+      # CHECKBOXES
+      # Will return "true" if user checked the box
+      f"{arm}_left_right_lane" : form.get(f"{arm}_left_right_lane"),
+      f"{arm}_left_right_straight_lane" : form.get(f"{arm}_left_right_straight_lane"),
+      f"{arm}_straight_right_lane" : form.get(f"{arm}_straight_right_lane"),
+      f"{arm}_straight_left_lane" : form.get(f"{arm}_straight_left_lane"),
+
+      # DROPDOWNS
+      # Will reutrn the number they selected
+      f"{arm}_left_lane_count" : form.get(f"{arm}_left_lane_count"),
+      f"{arm}_right_lane_count" : form.get(f"{arm}_right_lane_count"),
+      f"{arm}_straight_lane_count" : form.get(f"{arm}_straight_lane_count"),
+      f"{arm}_total_lane_count" : form.get(f"{arm}_lane_count")
+    }
+    errors.update(validateLaneCombo(laneInputs, busInputs, form.get(f"{arm}_cycle_lane"), flowInput.get(f"{bound}_{right_exit}_exit"), flowInput.get(f"{bound}_{left_exit}_exit"), flowInput.get(f"{bound}_{straight_exit}_exit"), arm))
+
+  # GENERAL VARIABLES
+  priorities = {f"{arm}_priority" : form.get(f"{arm}_priority") for arm in ARMS}
+  errors.update(validatePriority(priorities))
+  for arm in ARMS:
+    priority = form.get(f"{arm}_priority")
+    if priority not in (None, ""):
+      try:
+        inRange = 0 <= int(priority) <= MAX_PRIORITY
+      except (ValueError, TypeError):
+        inRange = False
+      if not inRange:
+        errors[f"{arm}_priority"] = f"The {arm} priority must be from 0 (none) to {MAX_PRIORITY}."
+
+  pedestrian_inputs = {
+    "pedestrian_crossing" : form.get("north_pedestrian_crossing"),
+    "duration" : form.get("duration"),
+    "crossing_requests_PH": form.get("crossing_requests_PH")
+  }
+  errors.update(validatePedestrianCrossing(pedestrian_inputs))
+
+  return errors
+
+
+def int_column(values):
+  """ Parses one field of a batch of junctions into integers, the whole column at once when every value is an integer.
+
+  Args:
+      values (list): The field (a string) of every junction of the batch.
+
+  Returns:
+      tuple: The integers (0 where the field is not an integer) and the state of every field: None if it parsed, "missing" if it is
+      empty and "invalid" if it is not an integer. The list of states is None when the whole column parsed.
+  """
+  try:
+    return list(map(int, values)), None
+  except (ValueError, TypeError):
+    pass
+
+  # A column holds few distinct values, so each is parsed once
+  parsed = {}
+  for value in set(values):
+    if not value:
+      parsed[value] = (0, "missing")
+      continue
+    try:
+      parsed[value] = (int(value), None)
+    except (ValueError, TypeError):
+      parsed[value] = (0, "invalid")
+  numbers, states = zip(*map(parsed.__getitem__, values)) if values else ((), ())
+  return list(numbers), list(states)
+
+
+def lane_column(values):
+  """ Counts the lanes one lane field of a batch of junctions adds to the total lane count of an arm (see validateLaneCombo).
+
+  Args:
+      values (list): The lane field of every junction of the batch.
+
+  Returns:
+      list: The lanes added by the field of every junction: its number, 1 for "on" and 0 otherwise.
+  """
+  try:
+    return list(map(int, values))
+  except (ValueError, TypeError):
+    pass
+
+  lanes = {}
+  for value in set(values):
+    try:
+      lanes[value] = int(value)
+    except (ValueError, TypeError):
+      lanes[value] = 1 if value == "on" else 0
+  return list(map(lanes.__getitem__, values))
+
+
+def validate_batch(forms):
+  """ Validates a batch of junctions at once, with the same rules and messages as validate_form.
+
+  Each field is parsed for the whole batch in one pass (see int_column) and every rule is checked across those columns,
+  instead of building the input dictionaries of each validator for each junction. A pedestrian crossing field that is left
+  out entirely is reported as required, where validate_form would raise.
+
+  Args:
+      forms (list): The junctions as posted by the index page form (mappings with a get method).
+
+  Returns:
+      list: The validation errors of every junction (a dictionary as returned by validate_form, empty if it is valid), in the order of forms.
+  """
+  rows = range(len(forms))
+  errors = [{} for _ in rows]
+  getters = [form.get for form in forms]
+
+  def column(name):
+    return [get(name) for get in getters]
+
+  def flags(name):
+    return [get(name) == "true" for get in getters]
+
+  def report(mask, key, message):
+    for i in compress(rows, mask):
+      errors[i][key] = message
+
+  def reportInt(numbers, states, key, required, invalid, negative, tooLarge, mask=None):
+    mask = mask or [True] * len(rows)
+    if states is not None:
+      report([m and state == "missing" for m, state in zip(mask, states)], key, required)
+      report([m and state == "invalid" for m, state in zip(mask, states)], key, invalid)
+    report([m and number < 0 for m, number in zip(mask, numbers)], key, negative)
+    report([m and number > MAX_KEY_INT for m, number in zip(mask, numbers)], key, tooLarge)
+
+  for arm, (bound, exits, (right_exit, left_exit, straight_exit)) in ARMS.items():
+    # Flows (validateFlows)
+    name = bound.capitalize()
+    vph, vphStates = int_column(column(f"{bound}_vph"))
+    reportInt(vph, vphStates, f"{bound}_vph", f"{name} vehicles per hour (vph) is required.",
+              f"{name} vehicles per hour (vph) must be a valid integer.", f"{name} vehicles per hour (vph) must be a non-negative integer.",
+              f"{name} vehicles per hour (vph) must be at most {MAX_KEY_INT}.")
+
+    flows = {}
+    for exit_name in exits:
+      flows[exit_name] = int_column(column(f"{bound}_{exit_name}_exit"))
+      reportInt(*flows[exit_name], f"{bound}_{exit_name}_exit", f"•{name} {exit_name} exit is required.",
+                f"•{name} {exit_name} exit must be a valid integer.", f"•{name} {exit_name} exit must be a non-negative integer.",
+                f"•{name} {exit_name} exit must be at most {MAX_KEY_INT}.")
+
+    totals = [sum(exitFlows) for exitFlows in zip(*(numbers for numbers, _ in flows.values()))]
+    report([total != number or state is not None for total, number, state in zip(totals, vph, vphStates or [None] * len(rows))],
+           f"{bound}_exits", f"{name} exit flow must sum to the total vehicles per hour (vph).")
+
+    # Cycle/Bus lane (validateBusLane)
+    busLane = flags(f"{arm}_bus_lane")
+    reportInt(*int_column(column(f"{arm}_buses_per_hour")), f"{arm}_buses_per_hour", f"The number of {arm} buses/cyclist per hour is required if bus lane is enabled.",
+              f"The number of {arm} buses/cyclist per hour must be a valid integer.", f"The number of {arm} buses/cyclist per hour must be a non-negative integer.",
+              f"The number of {arm} buses/cyclist per hour must be at most {MAX_KEY_INT}.", busLane)
+
+    # Lanes (validateLaneCombo), which is skipped when the turning traffic is not all integers
+    right, rightStates = flows[right_exit]
+    left, leftStates = flows[left_exit]
+    straight, straightStates = flows[straight_exit]
+    checked = [r is None and l is None and s is None for r, l, s in zip(rightStates or [None] * len(rows), leftStates or [None] * len(rows), straightStates or [None] * len(rows))]
+
+    leftRightStraight = flags(f"{arm}_left_right_straight_lane")
+    leftRight = flags(f"{arm}_left_right_lane")
+    straightLeft = flags(f"{arm}_straight_left_lane")
+    straightRight = flags(f"{arm}_straight_right_lane")
+    leftCount = column(f"{arm}_left_lane_count")
+    rightCount = column(f"{arm}_right_lane_count")
+    straightCount = column(f"{arm}_straight_lane_count")
+
+    # A left-right-straight lane with other straight lanes is the only error reported for the arm
+    clash = [c and lrs and (sc != "0" or sl or sr) for c, lrs, sc, sl, sr in zip(checked, leftRightStraight, straightCount, straightLeft, straightRight)]
+    checked = [c and not clashes for c, clashes in zip(checked, clash)]
+    report([c and cycle and bus for c, cycle, bus in zip(checked, flags(f"{arm}_cycle_lane"), busLane)], f"{arm}_cycle_lane", "You can't have both a cycle and a bus lane")
+    report(clash, f"{arm}_left_right_straight_lane", "If left-right-straight lane is selected, you may only add additional left or right lanes (safety reasons).")
+    report([c and lr and (lrs or sc != "0" or sl or sr or s > 0) for c, lr, lrs, sc, sl, sr, s in zip(checked, leftRight, leftRightStraight, straightCount, straightLeft, straightRight, straight)],
+           f"{arm}_left_right_lane", "If left-right lane is selected, there cannot be traffic going straight and no straight lanes.")
+
+    separate = [c and not lrs and not lr for c, lrs, lr in zip(checked, leftRightStraight, leftRight)]
+    report([sep and r > 0 and lc == "0" and not sl for sep, r, lc, sl in zip(separate, right, leftCount, straightLeft)],
+           f"{arm}_right_lane", "If there is left turning traffic, there must be space for a right turning lane.")
+    report([sep and l > 0 and rc == "0" and not sr for sep, l, rc, sr in zip(separate, left, rightCount, straightRight)],
+           f"{arm}_left_lane", "If there is right turning traffic, there must be space for a left turning lane.")
+    report([sep and s > 0 and sc == "0" and not sl and not sr for sep, s, sc, sl, sr in zip(separate, straight, straightCount, straightLeft, straightRight)],
+           f"{arm}_straight_lane", "If there is straight traffic, there must be space for a straight lane.")
+
+    laneFields = ["left_lane_count", "right_lane_count", "straight_lane_count", "straight_left_lane", "straight_right_lane", "left_right_straight_lane", "left_right_lane"]
+    laneColumns = [lane_column(column(f"{arm}_{field}")) for field in laneFields]
+    report([c and min(lanes) < 0 for c, *lanes in zip(checked, *laneColumns)], f"{arm}_total_lane_count", "Lane counts must be non-negative.")
+    totalLanes = [sum(lanes) + bus for *lanes, bus in zip(*laneColumns, busLane)]
+    for i in compress(rows, [c and total > 5 for c, total in zip(checked, totalLanes)]):
+      errors[i][f"{arm}_total_lane_count"] = f"The total lane count must not exceed 5 (currently selected {totalLanes[i]})."
+
+  # validatePriority does not report duplicate priorities, only priorities out of the range of the form
+  for arm in ARMS:
+    priorities, priorityStates = int_column(column(f"{arm}_priority"))
+    report([state == "invalid" or not 0 <= priority <= MAX_PRIORITY for priority, state in zip(priorities, priorityStates or [None] * len(rows))],
+           f"{arm}_priority", f"The {arm} priority must be from 0 (none) to {MAX_PRIORITY}.")
+
+  # Pedestrian crossing (validatePedestrianCrossing)
+  crossing = flags("north_pedestrian_crossing")
+  reportInt(*int_column(column("crossing_requests_PH")), "crossing_requests", "The number of crossing requests per hour is required if pedestrian crossing is enabled.",
+            "The number of crossing requests must be a valid integer.", "The number of crossing requests must be non-negative",
+            f"The number of crossing requests must be at most {MAX_KEY_INT}.", crossing)
+  reportInt(*int_column(column("duration")), "duration", "The duration of the crossing requests is required if pedestrian crossing is enabled.",
+            "The duration of crossing requests must be a valid integer.", "The duration of crossing requests must be non-negative",
+            f"The duration of crossing requests must be at most {MAX_KEY_INT}.", crossing)
+
+  return errors
+
+
+def build_junction_info(form):
+  """ Collects the junction information stored in the database and simulated from a validated form.
+
+  Args:
+      form (dict): The junction as posted by the index page form (any mapping with a get method).
+
+  Returns:
+      dict: The junction information, keyed as the columns of the junction_config and traffic_flow tables.
+  """
+  junction_info = {}
+  for arm, (bound, exits, _) in ARMS.items():
+    junction_info[f"{bound}_vph"] = form.get(f"{bound}_vph")
+    for exit_name in exits:
+      junction_info[f"{bound}_{exit_name}_exit"] = form.get(f"{bound}_{exit_name}_exit")
+    junction_info[f"{arm}_bus_lane"] = form.get(f"{arm}_bus_lane")
+    junction_info[f"{arm}_cycle_lane"] = form.get(f"{arm}_bus_lane")
+    junction_info[f"{arm}_left_right_lane"] = form.get(f"{arm}_left_right_lane")
+    junction_info[f"{arm}_left_right_straight_lane"] = form.get(f"{arm}_left_right_straight_lane")
+    junction_info[f"{arm}_left_lane_count"] = form.get(f"{arm}_left_lane_count")
+    junction_info[f"{arm}_right_lane_count"] = form.get(f"{arm}_right_lane_count")
+    junction_info[f"{arm}_straight_right_lane_count"] = form.get(f"{arm}_straight_right_lane")
+    junction_info[f"{arm}_straight_left_lane_count"] = form.get(f"{arm}_straight_left_lane")
+    junction_info[f"{arm}_straight_lane_count"] = form.get(f"{arm}_straight_lane_count")
+    junction_info[f"{arm}_priority"] = form.get(f"{arm}_priority")
+    junction_info[f"{arm}_total_lane_count"] = form.get(f"{arm}_lane_count")
+    junction_info[f"{arm}_buses_per_hour"] = form.get(f"{arm}_buses_per_hour")
+
+  junction_info["pedestrian_crossing"] = form.get("north_pedestrian_crossing")
+  junction_info["crossing_requests_PH"] = form.get("crossing_requests_PH")
+  junction_info["crossing_requests_duration"] = form.get("duration")
+  return junction_info
+
+
+def spec_to_form(spec):
+  """ Converts a JSON junction spec of the API into the fields of the index page form, so both share the validators above.
+
+  A spec looks like
+  {"arms": {"north": {"exits": {"north": 200, "east": 50, "west": 100},
+                      "lanes": {"left": 1, "straight": 1, "right": 1, "left_right": false, "left_right_straight": false, "straight_left": false, "straight_right": false},
+                      "bus_lane": false, "buses_per_hour": 0, "priority": 0},
+            "east": {...}, "south": {...}, "west": {...}},
+   "pedestrian_crossing": {"requests_per_hour": 20, "duration": 10}}
+  where "vph" of an arm defaults to the sum of its exits, lanes that are left out are not present, a priority of 0 means none
+  and a missing or null pedestrian_crossing means the junction has no crossing.
+
+  Args:
+      spec (dict): The decoded JSON body.
+
+  Returns:
+      tuple: The form fields (dict) and a dictionary containing type errors, if any.
+  """
+  def isInt(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+  def checkInt(key, value, largest=MAX_KEY_INT):
+    if not isInt(value):
+      errors[key] = "Must be an integer."
+    elif value > largest:
+      errors[key] = f"Must be at most {largest}."
+
+  errors = {}
+  form = {}
+  if not isinstance(spec, dict) or not isinstance(spec.get("arms"), dict):
+    return form, {"arms": "The junction must be a JSON object with an arms object holding the north, east, south and west arms."}
+
+  for arm, (bound, exits, _) in ARMS.items():
+    armSpec = spec["arms"].get(arm)
+    if not isinstance(armSpec, dict):
+      errors[arm] = f"The {arm} arm is required."
+      continue
+
+    flows = armSpec.get("exits")
+    if not isinstance(flows, dict):
+      errors[f"{arm}.exits"] = f"The {arm} arm needs the vehicles per hour leaving by each of the {', '.join(exits)} exits."
+      flows = {}
+    for exit_name in exits:
+      value = flows.get(exit_name, 0)
+      checkInt(f"{arm}.exits.{exit_name}", value)
+      form[f"{bound}_{exit_name}_exit"] = str(value)
+    vph = armSpec.get("vph", sum(v for v in flows.values() if isInt(v)))
+    checkInt(f"{arm}.vph", vph)
+    form[f"{bound}_vph"] = str(vph)
+
+    lanes = armSpec.get("lanes", {})
+    if not isinstance(lanes, dict):
+      errors[f"{arm}.lanes"] = "Must be an object."
+      lanes = {}
+    for name, field in LANE_COUNTS.items():
+      value = lanes.get(name, 0)
+      checkInt(f"{arm}.lanes.{name}", value, 255) #a lane count takes 1 byte of the junction key
+      form[f"{arm}_{field}"] = str(value)
+    for name, field in LANE_FLAGS.items():
+      value = lanes.get(name, False)
+      if not isinstance(value, bool):
+        errors[f"{arm}.lanes.{name}"] = "Must be true or false."
+      if value is True:
+        form[f"{arm}_{field}"] = "true"
+
+    busLane = armSpec.get("bus_lane", False)
+    if not isinstance(busLane, bool):
+      errors[f"{arm}.bus_lane"] = "Must be true or false."
+    if busLane is True:
+      form[f"{arm}_bus_lane"] = "true"
+    busesPerHour = armSpec.get("buses_per_hour", 0)
+    checkInt(f"{arm}.buses_per_hour", busesPerHour)
+    form[f"{arm}_buses_per_hour"] = str(busesPerHour)
+
+    priority = armSpec.get("priority", 0)
+    if not isInt(priority) or not 0 <= priority <= 4:
+      errors[f"{arm}.priority"] = "Must be an integer from 0 (no priority) to 4."
+    form[f"{arm}_priority"] = str(priority)
+
+  crossing = spec.get("pedestrian_crossing")
+  if crossing is not None:
+    if not isinstance(crossing, dict):
+      errors["pedestrian_crossing"] = "Must be an object or null."
+    else:
+      form["north_pedestrian_crossing"] = "true"
+      for name, field in [("requests_per_hour", "crossing_requests_PH"), ("duration", "duration")]:
+        value = crossing.get(name)
+        checkInt(f"pedestrian_crossing.{name}", value)
+        form[field] = str(value)
+
+  return form, errors
@@ -1,3 +1,11 @@
+import math
+from array import array
+from queue import Queue
+
+VEHICLE_CLASSES = ('car', 'bus', 'hgv', 'cycle') #the classes of vehicle, the class code of a vehicle is its index
+VEHICLE_BYTES = 9 #the memory taken by a queued vehicle, its entry time and class code
+COMPACT_THRESHOLD = 1024 #the number of vehicles taken off the front of a queue before its arrays may be compacted
+
 class Vehicle:
     """
     Description: the object for the vehicles
@@ -6,12 +14,13 @@ class Vehicle:
         entryTime(float): the time that the vehicle entered the simulation
         exitTime(float): the time that the vehicle left the simulation
         totalWait(float): the time that the vehicle had to wait
+        vehicleClass(int): the class code of the vehicle, its index in VEHICLE_CLASSES
 
     Methods:
-        __init__(self, entryTime, exitTime, totalWait): initialises the object
+        __init__(self, entryTime, exitTime, totalWait, vehicleClass): initialises the object
     """
 
-    def __init__(self, entryTime, exitTime, totalWait):
+    def __init__(self, entryTime, exitTime, totalWait, vehicleClass=0):
         """
         Description: initialises the object
 
@@ -19,7 +28,169 @@ class Vehicle:
             entryTime(float): the time that the vehicle entered the simulation
             exitTime(float): the time that the vehicle left the simulation
             totalWait(float): the time that the vehicle had to wait
+            vehicleClass(int): the class code of the vehicle, a car unless given
         """
         self.entryTime = entryTime
         self.exitTime = exitTime
-        self.totalWait = totalWait
\ No newline at end of file
+        self.totalWait = totalWait
+        self.vehicleClass = vehicleClass
+
+
+class VehicleQueue(Queue):
+    """
+    Description: the queue of vehicles in a lane, kept as the entry time and class code of every vehicle in two parallel arrays
+
+    Attributes:
+        entryTimes(array): the entry time of every vehicle, array('d')
+        classes(array): the class code of every vehicle, array('B')
+        head(int): the index of the first vehicle of the queue in the arrays
+        size(int): the number of vehicles in the queue
+
+    Methods:
+        putArrival(self, entryTime, vehicleClass): adds a vehicle to the back of the queue
+        frontClass(self): the class code of the first vehicle of the queue
+        memoryUsed(self): an estimate of the memory the queued vehicles take
+
+    Notes:
+        No object is kept per queued vehicle, so a queue takes VEHICLE_BYTES a vehicle however long it grows. Vehicles are
+        taken off by moving the head on, and the arrays are only compacted once the head is past COMPACT_THRESHOLD and half of
+        them. get gives back a Vehicle made from the arrays, with exactly the entry time that was put.
+        It is a queue.Queue, so put, get and qsize work as for any other queue.
+    """
+
+    def _init(self, maxsize):
+        """Description: sets up the storage of the queue, called by Queue.__init__"""
+        self.entryTimes = array('d')
+        self.classes = array('B')
+        self.head = 0
+        self.size = 0
+
+    def _qsize(self):
+        """Description: the number of vehicles in the queue"""
+        return self.size
+
+    def _put(self, item):
+        """Description: adds a Vehicle object to the back of the queue, called by Queue.put"""
+        self.entryTimes.append(item.entryTime)
+        self.classes.append(item.vehicleClass)
+        self.size += 1
+
+    def _get(self):
+        """Description: takes the first vehicle off the queue, called by Queue.get"""
+        vehicle = Vehicle(self.entryTimes[self.head], None, None, self.classes[self.head])
+        self.head += 1
+        self.size -= 1
+        if self.head >= COMPACT_THRESHOLD and 2 * self.head >= len(self.entryTimes):
+            del self.entryTimes[:self.head]
+            del self.classes[:self.head]
+            self.head = 0
+        return vehicle
+
+    def putArrival(self, entryTime, vehicleClass=0):
+        """
+        Description: Adds a vehicle to the back of the queue without making a Vehicle object for it
+
+        Args:
+            entryTime(float): the time that the vehicle entered the simulation
+            vehicleClass(int): the class code of the vehicle
+        """
+        with self.not_full:
+            self.entryTimes.append(entryTime)
+            self.classes.append(vehicleClass)
+            self.size += 1
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def frontClass(self):
+        """
+        Description: The class code of the first vehicle of the queue, which decides how long it takes to leave
+
+        Returns:
+            int: the class code, the queue must not be empty
+        """
+        return self.classes[self.head]
+
+    def memoryUsed(self):
+        """
+        Description: An estimate of the memory taken by the queued vehicles
+
+        Returns:
+            int: the number of bytes, from the length of the arrays
+        """
+        return len(self.entryTimes) * VEHICLE_BYTES
+
+
+def parseVehicleClass(text):
+    """
+    Description: Reads the length and speed of a vehicle class from the system.cfg file
+
+    Args:
+        text(string): the length in metres and the speed in m/s, comma separated (e.g. "12, 4")
+
+    Returns:
+        tuple: the length and the speed
+
+    Raises:
+        ValueError: the text is not two positive numbers
+    """
+    length, speed = (float(value) for value in text.split(','))
+    if length <= 0 or speed <= 0:
+        raise ValueError("the length and speed of a vehicle class must be positive")
+    return length, speed
+
+
+def parseClassMix(text):
+    """
+    Description: Reads the share of each vehicle class of a movement from the system.cfg file
+
+    Args:
+        text(string): comma separated class names and shares (e.g. "car: 0.9, hgv: 0.1"), classes not given have no share
+
+    Returns:
+        tuple: the share of every class, in the order of VEHICLE_CLASSES
+
+    Raises:
+        ValueError: a class is unknown, a share is negative or none is positive
+    """
+    shares = [0.0] * len(VEHICLE_CLASSES)
+    for item in text.split(','):
+        name, share = item.split(':')
+        shares[VEHICLE_CLASSES.index(name.strip())] = float(share)
+    if min(shares) < 0 or max(shares) == 0:
+        raise ValueError("the shares of a vehicle mix cannot be negative and one must be positive")
+    return tuple(shares)
+
+
+def classPattern(weights, resolution=100):
+    """
+    Description: The repeating order of the classes of the vehicles arriving in a lane
+
+    Args:
+        weights(Array): the weight of every class, in the order of VEHICLE_CLASSES
+        resolution(int): the longest pattern, the shares are rounded to 1 / resolution
+
+    Returns:
+        bytes: the class code of every vehicle of the pattern, the nth vehicle to arrive has the class pattern[n % len(pattern)]
+
+    Notes:
+        The classes are spread as evenly as they can be (a smooth weighted round robin), so a lane with one bus in ten
+        vehicles has a bus every tenth vehicle rather than ten buses in a row. A lane without traffic is all cars.
+    """
+    total = sum(weights)
+    if total <= 0:
+        return bytes(1)
+    counts = [round(resolution * weight / total) for weight in weights]
+    if sum(counts) == 0:
+        counts[weights.index(max(weights))] = 1 #every share rounds to nothing, so the largest takes the whole lane
+    divisor = math.gcd(*counts)
+    counts = [count // divisor for count in counts]
+
+    pattern = bytearray()
+    current = [0] * len(counts)
+    for _ in range(sum(counts)):
+        for vehicleClass, count in enumerate(counts):
+            current[vehicleClass] += count
+        vehicleClass = current.index(max(current))
+        current[vehicleClass] -= sum(counts)
+        pattern.append(vehicleClass)
+    return bytes(pattern)
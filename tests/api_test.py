@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.app import app
+from tests.fixtures import junction_spec
+
+
+class TestSimulationApi(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_simulate(self):
+        response = self.client.post('/api/v1/simulate', json=junction_spec())
+        self.assertEqual(response.status_code, 200)
+
+        body = response.get_json()
+        self.assertEqual(len(body["junction_id"]), 32)
+        self.assertGreater(body["efficiency_score"], 0)
+        self.assertGreater(body["output"]["carsPassedThrough"], 0)
+        self.assertEqual(body["output"]["north"]["laneLayout"], ["L", "S", "R"])
+        self.assertTrue(body["output"]["isPedestrianCrossing"])
+        # API simulations are not written to the history database
+        self.assertFalse(os.path.exists(os.path.join('data', 'data.db')))
+
+    def test_simulate_rejects_invalid_spec(self):
+        spec = junction_spec()
+        spec["arms"]["east"]["vph"] = 1  # does not match the sum of the exits
+        spec["arms"]["west"]["lanes"]["left"] = "one"
+        response = self.client.post('/api/v1/simulate', json=spec)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("west.lanes.left", response.get_json()["errors"])
+
+        spec["arms"]["west"]["lanes"]["left"] = 1
+        response = self.client.post('/api/v1/simulate', json=spec)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("eastbound_exits", response.get_json()["errors"])
+
+        response = self.client.post('/api/v1/simulate', data="not json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_streams_one_line_per_junction(self):
+        invalid = junction_spec()
+        del invalid["arms"]["south"]
+        response = self.client.post('/api/v1/simulate/batch', json=[junction_spec(), invalid])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([line["index"] for line in lines], [0, 1])
+        self.assertEqual(lines[0]["output"], self.client.post('/api/v1/simulate', json=junction_spec()).get_json()["output"])
+        self.assertIn("south", lines[1]["errors"])
+
+        response = self.client.post('/api/v1/simulate/batch', json=junction_spec())
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Compare two pytest-benchmark JSON files and flag regressions.
+
+Usage:
+    python -m tests.benchmarks.compare BASELINE CURRENT [--threshold PERCENT] [--stat STAT]
+
+The exit status is 1 when any benchmark present in both files is slower than
+the baseline by more than the threshold, so the command can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def load_stats(path: str, stat: str) -> dict:
+    """Read a pytest-benchmark JSON file
+
+    Args:
+        path (str): The path to the JSON file written by --benchmark-json
+        stat (str): The statistic to compare, e.g. "median" or "mean"
+
+    Returns:
+        dict: {benchmark fullname: statistic in seconds}
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return {bench["fullname"]: bench["stats"][stat] for bench in data["benchmarks"]}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[tuple]:
+    """Compare the statistics of two benchmark runs
+
+    Args:
+        baseline (dict): {name: seconds} of the baseline run
+        current (dict): {name: seconds} of the current run
+        threshold (float): The slowdown in percent above which a benchmark is a regression
+
+    Returns:
+        list[tuple]: (name, baseline seconds, current seconds, change in percent, is regression) for every shared benchmark
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        change = (current[name] - baseline[name]) / baseline[name] * 100
+        rows.append((name, baseline[name], current[name], change, change > threshold))
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Flag benchmark regressions between two pytest-benchmark JSON files")
+    parser.add_argument("baseline", help="baseline JSON, e.g. tests/benchmarks/baselines/baseline.json")
+    parser.add_argument("current", help="JSON of the run being checked")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent (default 10)")
+    parser.add_argument("--stat", default="median", help="statistic to compare (default median)")
+    args = parser.parse_args(argv)
+
+    baseline = load_stats(args.baseline, args.stat)
+    current = load_stats(args.current, args.stat)
+    rows = compare(baseline, current, args.threshold)
+
+    width = max([len(row[0]) for row in rows] + [9])
+    print(f"{'benchmark':<{width}}  {'baseline(ms)':>12}  {'current(ms)':>12}  {'change':>8}")
+    for name, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<{width}}  {old * 1000:>12.3f}  {new * 1000:>12.3f}  {change:>+7.1f}%{flag}")
+
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name:<{width}}  only in {'baseline' if name in baseline else 'current'}")
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold}%")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
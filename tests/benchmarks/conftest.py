@@ -0,0 +1,39 @@
+import copy
+
+import pytest
+
+from src.db_functions import db_functions
+from src.validation import build_junction_info
+from tests.fixtures import SCENARIOS
+
+
+@pytest.fixture(params=sorted(SCENARIOS))
+def scenario(request):
+    """The name and form data of each benchmark junction"""
+    return request.param, copy.deepcopy(SCENARIOS[request.param])
+
+
+@pytest.fixture
+def junction_info(scenario):
+    """The junction_info of the scenario after metaphor() has normalised it, as get_pk receives it in index()"""
+    info = build_junction_info(scenario[1])
+    db_functions.metaphor(info)
+    return info
+
+
+@pytest.fixture
+def formatted_spec(scenario):
+    """The formatted simulation input of the scenario"""
+    return db_functions.metaphor(build_junction_info(scenario[1]))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A Flask test client whose data/data.db is created in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    from src.app import app, job_queue
+    app.config['TESTING'] = True
+    job_queue._ensure_table()  # the running queue only created its table in the working directory of the first test
+    yield app.test_client()
+    # Let the workers finish the submitted jobs while their temporary directory is still the working directory
+    job_queue.drain()
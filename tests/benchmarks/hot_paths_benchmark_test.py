@@ -0,0 +1,67 @@
+import copy
+
+from src.app import job_queue
+from src.db_functions import db_functions
+from src.direction import Direction
+from src.lane import laneOrdering
+from src.simulation import createSimulation
+from src.validation import validate_form, validate_batch
+
+
+def test_create_simulation(benchmark, formatted_spec):
+    """Time a full simulation run of the scenario"""
+    result = benchmark(lambda: createSimulation(copy.deepcopy(formatted_spec)))
+    assert result['carsPassedThrough'] >= 0
+
+
+def test_distribute_vehicles_by_lane(benchmark, formatted_spec):
+    """Time the lane distribution of every arm of the scenario"""
+    def distribute():
+        for arm, name in enumerate(['north', 'east', 'south', 'west'], start=1):
+            direction = Direction(list(formatted_spec[arm + 4]), name, laneOrdering(formatted_spec[arm]))
+            direction.distributeVehiclesByLane()
+        return direction
+
+    benchmark(distribute)
+
+
+def test_get_z_score(benchmark, formatted_spec):
+    """Time the efficiency scoring of the scenario's simulation result"""
+    output = createSimulation(copy.deepcopy(formatted_spec))
+
+    def score():
+        return round((db_functions.getZScore(output["maxWait"], 60, 15) * 2 + db_functions.getZScore(output["maxQueue"], 10, 5) * 3 + db_functions.getZScore(output["avgWait"], 30, 15) * 6)/11, 2)
+
+    assert 0 <= benchmark(score) <= 100
+
+
+def test_get_pk(benchmark, junction_info):
+    """Time the primary key computation of the scenario"""
+    assert benchmark(db_functions.get_pk, junction_info)
+
+
+def test_validate_form(benchmark, scenario):
+    """Time the validation of the scenario's form, one junction at a time as index() does"""
+    assert not benchmark(validate_form, scenario[1])
+
+
+def test_validate_batch(benchmark, scenario):
+    """Time the validation of 1000 copies of the scenario's form in one batch, as the importer and batch API do"""
+    assert not any(benchmark(validate_batch, [scenario[1]] * 1000))
+
+
+def test_post_index(benchmark, client, scenario):
+    """Time the POST handler of index(), which only queues the simulation and redirects to its job page"""
+    # Every round queues a simulation, so the number of rounds is kept to what the workers can run afterwards
+    response = benchmark.pedantic(client.post, args=('/',), kwargs={'data': scenario[1]}, rounds=20)
+    assert response.status_code == 303
+
+
+def test_post_index_until_done(benchmark, client, scenario):
+    """Time a submission from the POST to the finished job, against a temporary SQLite database"""
+    def submit_and_wait():
+        response = client.post('/', data=scenario[1])
+        return job_queue.wait(response.headers['Location'].rsplit('/', 1)[-1])
+
+    job = benchmark(submit_and_wait)
+    assert job['status'] == 'done'
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from src import junction_store
+from src.app import app
+from src.dashboard import load_dashboard
+from src.db_functions import db_functions
+
+SCORES = [(i * 37) % 101 for i in range(40)]
+
+
+class TestDashboard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'data.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def insert_scores(self, scores, start=0):
+        con = db_functions.get_conn(self.db)
+        for i, score in enumerate(scores, start):
+            db_functions.execute_inject_query(con, 'INSERT_efficiency_score_table.sql', False, False, f"junction{i}", score)
+        db_functions.close_conn(con)
+
+    def assertDashboard(self, dashboard, scores):
+        self.assertEqual(dashboard['runs'], len(scores))
+        self.assertEqual(dashboard['mean_score'], round(sum(scores) / len(scores), 2))
+        self.assertEqual((dashboard['min_score'], dashboard['max_score']), (min(scores), max(scores)))
+        self.assertEqual([band['runs'] for band in dashboard['histogram']], [sum(1 for score in scores if min(score // 10, 9) == band) for band in range(10)])
+        self.assertEqual([junction['efficiency_score'] for junction in dashboard['worst']], sorted(scores)[:10])
+        self.assertEqual(sum(day['runs'] for day in dashboard['days']), len(scores))
+
+    def test_summary_tables_follow_inserts(self):
+        junction_store.ensure_schema(self.db)
+        self.assertEqual(load_dashboard(self.db)['runs'], 0)
+        self.insert_scores(SCORES)
+        self.assertDashboard(load_dashboard(self.db), SCORES)
+
+    def test_existing_history_is_summarised(self):
+        db_functions.execute_sql_file_noinject(self.db, 'create_table.sql')
+        self.insert_scores(SCORES[:25])
+        junction_store.ensure_schema(self.db)
+        junction_store.ensure_schema(self.db)
+        self.insert_scores(SCORES[25:], start=25)
+        self.assertDashboard(load_dashboard(self.db), SCORES)
+
+    def test_summary_tables_follow_deletes(self):
+        junction_store.ensure_schema(self.db)
+        self.insert_scores(SCORES)
+        # Delete the lowest and highest scores, some of the worst junctions and every run in one band
+        deleted = {i for i, score in enumerate(SCORES) if score in (min(SCORES), max(SCORES)) or score < 15 or 50 <= score < 60}
+        con = db_functions.get_conn(self.db)
+        with con:
+            for i in deleted:
+                con.execute("DELETE FROM efficiency_score_table WHERE junction_id = ?", (f"junction{i}",))
+        db_functions.close_conn(con)
+        self.assertDashboard(load_dashboard(self.db), [score for i, score in enumerate(SCORES) if i not in deleted])
+
+    def test_page(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            self.assertIn(b"No junctions have been simulated yet", app.test_client().get('/dashboard').data)
+            self.db = os.path.join('data', 'data.db')
+            self.insert_scores(SCORES)
+            response = app.test_client().get('/dashboard')
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Worst junctions", response.data)
+        self.assertIn(b"junction0", response.data)
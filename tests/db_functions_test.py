@@ -94,5 +94,52 @@ class TestInvalidInput(unittest.TestCase):
         self.assertTrue(True)
 
 
+class TestJunctionKey(unittest.TestCase):
+    DIRECTIONS = ["north", "east", "south", "west"]
+
+    def junction(self):
+        from tests.fixtures import SCENARIOS
+        from src.validation import build_junction_info
+        return build_junction_info(SCENARIOS['cb_lane'])
+
+    def rotate(self, params):
+        """The junction turned clockwise by one arm: every direction in the field names moves to the next one"""
+        def turn(word):
+            for i, direction in enumerate(self.DIRECTIONS):
+                if word in (direction, direction + "bound"):
+                    return word.replace(direction, self.DIRECTIONS[(i + 1) % 4])
+            return word
+        return {"_".join(turn(word) for word in key.split("_")): value for key, value in params.items()}
+
+    def test_key(self):
+        junction_info = self.junction()
+        key = get_pk(junction_info)
+        self.assertEqual(len(key), 32)
+        # The form strings and the values metaphor normalises them to give the same key
+        metaphor(junction_info)
+        self.assertEqual(get_pk(junction_info), key)
+        self.assertEqual(len(encode_junction(junction_info)), 105)
+        # Every field is part of the key, including the pedestrian crossing
+        self.assertNotEqual(get_pk(dict(junction_info, crossing_requests_PH=junction_info['crossing_requests_PH'] + 1)), key)
+        self.assertRaises(ValueError, get_pk, [])
+
+    def test_out_of_range(self):
+        """A field that does not fit its slot of the key is a ValueError naming the field, not a struct.error"""
+        junction_info = self.junction()
+        for field, value in [("crossing_requests_PH", "5000000000"), ("north_priority", "300"), ("east_left_lane_count", "-1")]:
+            with self.assertRaisesRegex(ValueError, field):
+                get_pk(dict(junction_info, **{field: value}))
+
+    def test_rotations(self):
+        junction_info = self.junction()
+        keys = check_symmetry(junction_info)
+        self.assertEqual(keys[0], get_pk(junction_info))
+        self.assertEqual(len(set(keys)), 4)
+
+        rotated = self.rotate(junction_info)
+        self.assertEqual(get_pk(rotated), keys[3])
+        self.assertEqual(set(check_symmetry(rotated)), set(keys))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+
+import openpyxl
+
+from src import export
+from src import junction_store
+from src.db_functions import db_functions
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'data.db')
+        junction_store.ensure_schema(self.db)
+
+        con = db_functions.get_conn(self.db)
+        for i in range(5):
+            junction_id = f"junction{i}"
+            db_functions.execute_inject_query(con, 'INSERT_junction_config.sql', False, False, junction_id, *([1] * 39))
+            for arm in ['north', 'east', 'south', 'west']:
+                db_functions.execute_inject_query(con, f'INSERT_traffic_flow_{arm}.sql', False, False, junction_id, 100 + i, 50, 25, 25)
+            db_functions.execute_inject_query(con, 'INSERT_efficiency_score_table.sql', False, False, junction_id, 60 + i)
+        db_functions.close_conn(con)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_are_bounded(self):
+        chunks = list(export.iter_chunks(self.db, chunk_size=2))
+        self.assertEqual(chunks[0][:3], ['junction_id', 'create_time', 'efficiency_score'])
+        self.assertEqual([len(rows) for rows in chunks[1:]], [2, 2, 1])
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO("".join(export.stream_csv(self.db, chunk_size=2)))))
+        self.assertEqual(len(rows), 6)
+        header = rows[0]
+        self.assertEqual(len(header), len(set(header)), "Every exported column needs a unique name")
+        self.assertEqual(rows[3][header.index('efficiency_score')], '62')
+        self.assertEqual(rows[3][header.index('north_vehicles_per_hour_enter_north')], '102')
+
+    def test_columnar_round_trip(self):
+        data = b"".join(export.stream_columnar(self.db, chunk_size=2))
+        table = export.read_columnar(data)
+        self.assertEqual(table['junction_id'], [f"junction{i}" for i in range(5)])
+        self.assertEqual(table['efficiency_score'], [60, 61, 62, 63, 64])
+        self.assertEqual(table['west_vehicles_per_hour_exit_east'], [25] * 5)
+        self.assertRaises(ValueError, export.read_columnar, b"not columnar")
+
+    def test_xlsx(self):
+        out = io.BytesIO()
+        export.export(self.db, 'xlsx', out, chunk_size=2)
+        sheet = openpyxl.load_workbook(io.BytesIO(out.getvalue())).active
+        self.assertEqual(sheet.max_row, 6)
+        self.assertEqual(sheet.cell(row=2, column=1).value, 'junction0')
+        self.assertRaises(ValueError, export.export, self.db, 'pdf', io.BytesIO())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+ARMS = {'north': 'northbound', 'east': 'eastbound', 'south': 'southbound', 'west': 'westbound'}
+EXITS = {'northbound': ('north', 'east', 'west'), 'eastbound': ('north', 'east', 'south'),
+         'southbound': ('south', 'east', 'west'), 'westbound': ('west', 'north', 'south')}
+
+
+def make_form(flows, lanes=None, bus=None, crossing=None):
+    """Build the form data of a junction as it is posted by index.html
+
+    Args:
+        flows (dict): per bound {exit: vph}, e.g. {'northbound': {'north': 200, 'east': 50, 'west': 100}}
+        lanes (dict): per arm form lane fields, defaults to one left, one straight and one right lane
+        bus (dict): per arm buses per hour, arms without an entry have no bus lane
+        crossing (tuple): (requests per hour, duration) of the pedestrian crossing, None for no crossing
+
+    Returns:
+        dict: the form data
+    """
+    form = {}
+    for arm, bound in ARMS.items():
+        exits = flows[bound]
+        form[f"{bound}_vph"] = str(sum(exits.values()))
+        for exit_name in EXITS[bound]:
+            form[f"{bound}_{exit_name}_exit"] = str(exits.get(exit_name, 0))
+
+        arm_lanes = (lanes or {}).get(arm, {'left_lane_count': '1', 'straight_lane_count': '1', 'right_lane_count': '1'})
+        for field in ['left_lane_count', 'right_lane_count', 'straight_lane_count']:
+            form[f"{arm}_{field}"] = arm_lanes.get(field, '0')
+        for field in ['left_right_lane', 'left_right_straight_lane', 'straight_left_lane', 'straight_right_lane']:
+            if field in arm_lanes:
+                form[f"{arm}_{field}"] = arm_lanes[field]
+
+        if bus and arm in bus:
+            form[f"{arm}_bus_lane"] = "true"
+            form[f"{arm}_buses_per_hour"] = str(bus[arm])
+        form[f"{arm}_priority"] = "0"
+
+    if crossing is not None:
+        form["north_pedestrian_crossing"] = "true"
+        form["crossing_requests_PH"] = str(crossing[0])
+        form["duration"] = str(crossing[1])
+    else:
+        form["crossing_requests_PH"] = ""
+        form["duration"] = ""
+    return form
+
+
+SCENARIOS = {
+    'light': make_form({
+        'northbound': {'north': 60, 'east': 20, 'west': 20},
+        'eastbound': {'north': 15, 'east': 50, 'south': 15},
+        'southbound': {'south': 70, 'east': 10, 'west': 20},
+        'westbound': {'west': 40, 'north': 20, 'south': 10}}),
+    'saturated': make_form({
+        'northbound': {'north': 1200, 'east': 400, 'west': 500},
+        'eastbound': {'north': 450, 'east': 1100, 'south': 350},
+        'southbound': {'south': 1300, 'east': 300, 'west': 400},
+        'westbound': {'west': 1000, 'north': 500, 'south': 450}}),
+    'many_lane': make_form({
+        'northbound': {'north': 600, 'east': 200, 'west': 300},
+        'eastbound': {'north': 250, 'east': 700, 'south': 150},
+        'southbound': {'south': 650, 'east': 200, 'west': 250},
+        'westbound': {'west': 500, 'north': 200, 'south': 300}},
+        lanes={arm: {'left_lane_count': '1', 'straight_lane_count': '2', 'right_lane_count': '1', 'straight_left_lane': 'true'} for arm in ARMS}),
+    'cb_lane': make_form({
+        'northbound': {'north': 300, 'east': 100, 'west': 100},
+        'eastbound': {'north': 100, 'east': 350, 'south': 80},
+        'southbound': {'south': 280, 'east': 90, 'west': 120},
+        'westbound': {'west': 320, 'north': 60, 'south': 110}},
+        bus={'north': 30, 'east': 20, 'south': 25, 'west': 40}),
+    'pedestrian_heavy': make_form({
+        'northbound': {'north': 300, 'east': 100, 'west': 100},
+        'eastbound': {'north': 100, 'east': 350, 'south': 80},
+        'southbound': {'south': 280, 'east': 90, 'west': 120},
+        'westbound': {'west': 320, 'north': 60, 'south': 110}},
+        crossing=(120, 30)),
+}
+
+
+def junction_spec():
+    """A junction with a left, straight and right lane on every arm and a pedestrian crossing"""
+    exits = {
+        "north": {"north": 200, "east": 50, "west": 100},
+        "east": {"north": 150, "east": 300, "south": 75},
+        "south": {"south": 250, "east": 125, "west": 60},
+        "west": {"west": 275, "north": 75, "south": 175}
+    }
+    return {
+        "arms": {arm: {"exits": arm_exits, "lanes": {"left": 1, "straight": 1, "right": 1}} for arm, arm_exits in exits.items()},
+        "pedestrian_crossing": {"requests_per_hour": 20, "duration": 10}
+    }
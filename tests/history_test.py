@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from src import history
+from src import junction_store
+from src.app import app
+from src.db_functions import db_functions
+from src.validation import build_junction_info
+from tests.fixtures import SCENARIOS
+
+SCORES = [(i * 37) % 101 for i in range(45)]
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'data.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fill(self):
+        """Store the runs of SCORES (without a stored junction) and of the light, cb_lane and pedestrian_heavy scenarios"""
+        junction_store.ensure_schema(self.db)
+        con = db_functions.get_conn(self.db)
+        for i, score in enumerate(SCORES):
+            db_functions.execute_inject_query(con, 'INSERT_efficiency_score_table.sql', False, False, f"junction{i:02}", score)
+        ids = {}
+        for name in ['light', 'cb_lane', 'pedestrian_heavy']:
+            junction_info = build_junction_info(SCENARIOS[name])
+            db_functions.metaphor(junction_info)
+            ids[name] = db_functions.get_pk(junction_info)
+            junction_store.store_junction(con, ids[name], junction_info)
+            db_functions.execute_inject_query(con, 'INSERT_efficiency_score_table.sql', False, False, ids[name], 50)
+        db_functions.close_conn(con)
+        return ids
+
+    def all_pages(self, **filters):
+        runs = []
+        page = history.history_page(self.db, limit=7, **filters)
+        runs += page["runs"]
+        while page["next_cursor"] is not None:
+            page = history.history_page(self.db, cursor=page["next_cursor"], limit=7, **filters)
+            runs += page["runs"]
+        return runs
+
+    def test_pages_cover_the_history_once(self):
+        ids = self.fill()
+        runs = self.all_pages()
+        self.assertEqual(len(runs), len(SCORES) + len(ids))
+        self.assertEqual(len({run["junction_id"] for run in runs}), len(runs))
+        keys = [(run["create_time"], run["junction_id"]) for run in runs]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_filters(self):
+        ids = self.fill()
+        runs = self.all_pages(min_score=20, max_score=60)
+        self.assertEqual(sorted(run["efficiency_score"] for run in runs), sorted([score for score in SCORES if 20 <= score <= 60] + [50] * len(ids)))
+        self.assertEqual([run["junction_id"] for run in self.all_pages(bus_lane=True)], [ids["cb_lane"]])
+        self.assertEqual([run["junction_id"] for run in self.all_pages(pedestrian_crossing=True)], [ids["pedestrian_heavy"]])
+        self.assertEqual(len(self.all_pages(bus_lane=False, pedestrian_crossing=False)), len(SCORES) + 1)
+        self.assertEqual(history.get_run(self.db, ids["cb_lane"])["bus_lane"], True)
+        self.assertIsNone(history.get_run(self.db, "missing"))
+
+    def test_invalid_arguments(self):
+        junction_store.ensure_schema(self.db)
+        with self.assertRaises(ValueError):
+            history.history_page(self.db, cursor="not a cursor")
+        with self.assertRaises(ValueError):
+            history.history_page(self.db, limit=history.MAX_PAGE_SIZE + 1)
+
+    def test_endpoints(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            self.db = os.path.join('data', 'data.db')
+            os.mkdir('data')
+            ids = self.fill()
+            client = app.test_client()
+            first = client.get('/api/v1/history?limit=30').get_json()
+            second = client.get(f'/api/v1/history?limit=30&cursor={first["next_cursor"]}').get_json()
+            bad = client.get('/api/v1/history?cursor=abc&bus_lane=maybe')
+            page = client.get('/history?crossing=true')
+            view = client.post('/results', data={"junction_id": ids["pedestrian_heavy"]})
+            report = client.post('/download_report', data={"junction_id": ids["light"]})
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(len(first["runs"]) + len(second["runs"]), len(SCORES) + len(ids))
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(bad.status_code, 400)
+        self.assertIn("bus_lane", bad.get_json()["errors"])
+        self.assertEqual(page.status_code, 200)
+        self.assertIn(ids["pedestrian_heavy"].encode(), page.data)
+        self.assertNotIn(ids["light"].encode(), page.data)
+        self.assertEqual(view.status_code, 200)
+        self.assertIn(b"Efficiency Score: 50%", view.data)
+        self.assertIn(b"pedestrian crossing", view.data)
+        self.assertEqual(report.status_code, 200)
@@ -0,0 +1,72 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from src.app import app
+from src.db_functions import db_functions
+from src.importer import import_junctions
+from tests.fixtures import SCENARIOS, junction_spec
+
+
+class TestImporter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'data', 'data.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def query(self, sql):
+        con = db_functions.get_conn(self.db)
+        rows = con.execute(sql).fetchall()
+        db_functions.close_conn(con)
+        return rows
+
+    def test_csv_import(self):
+        path = os.path.join(self.tmp.name, 'survey.csv')
+        rows = [dict(SCENARIOS[name], efficiency_score='70') for name in ['light', 'saturated', 'cb_lane']]
+        rows.append(dict(SCENARIOS['light']))  # the same junction twice
+        rows.append(dict(SCENARIOS['light'], northbound_vph='1'))  # exits do not add up
+        rows.append(dict(SCENARIOS['light'], east_buses_per_hour='5000000000'))  # too wide for the key, with no bus lane to validate it
+        rows.append(dict(SCENARIOS['many_lane'], efficiency_score='70.5'))  # not an integer score
+        fields = sorted(set().union(*rows))
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        result = import_junctions(path, self.db, batch_size=2)
+        self.assertEqual((result['imported'], result['already_stored'], result['skipped']), (3, 1, 3))
+        self.assertIn('northbound_exits', result['errors'][6])
+        self.assertIn('east_buses_per_hour', result['errors'][7]['junction'])
+        self.assertEqual(result['errors'][8], {'efficiency_score': 'Must be an integer.'})
+        self.assertEqual(self.query("SELECT COUNT(*) FROM junction_config"), [(3,)])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM traffic_flow_west"), [(3,)])
+        self.assertEqual(self.query("SELECT efficiency_score FROM efficiency_score_table"), [(70,)] * 3)
+
+        # Importing the same file again stores nothing new
+        result = import_junctions(path, self.db)
+        self.assertEqual((result['imported'], result['already_stored'], result['skipped']), (0, 4, 3))
+
+    def test_jsonl_import_with_simulation(self):
+        path = os.path.join(self.tmp.name, 'survey.jsonl')
+        with open(path, 'w') as f:
+            f.write(json.dumps(junction_spec()) + "\n")
+            f.write("{not json\n")
+            f.write(json.dumps(dict(junction_spec(), efficiency_score="n/a")) + "\n")
+
+        result = import_junctions(path, self.db, simulate=True, workers=1)
+        self.assertEqual((result['imported'], result['skipped']), (1, 2))
+        self.assertIn('json', result['errors'][2])
+        self.assertEqual(result['errors'][3], {'efficiency_score': 'Must be an integer.'})
+
+        # The score is the one the API gives the same junction
+        ((score,),) = self.query("SELECT efficiency_score FROM efficiency_score_table")
+        response = app.test_client().post('/api/v1/simulate', json=junction_spec())
+        self.assertEqual(score, int(response.get_json()['efficiency_score']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from src import app as app_module
+from src import jobs as jobs_module
+from src.db_functions import db_functions
+from src.jobs import JobQueue
+
+
+def double(payload):
+    return {"value": payload["value"] * 2}
+
+
+def fail(payload):
+    raise ValueError("bad junction")
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'data', 'jobs.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_job_runs_in_background(self):
+        jobs = JobQueue(self.db, double, workers=2)
+        job_ids = [jobs.submit({"value": i}) for i in range(5)]
+        for i, job_id in enumerate(job_ids):
+            job = jobs.wait(job_id, timeout=10)
+            self.assertEqual(job["status"], "done")
+            self.assertEqual(job["result"], {"value": i * 2})
+            self.assertIsNone(job["error"])
+
+    def test_failed_job_keeps_error(self):
+        jobs = JobQueue(self.db, fail, workers=1)
+        job = jobs.wait(jobs.submit({"value": 1}), timeout=10)
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("bad junction", job["error"])
+        self.assertIsNone(job["result"])
+
+    def test_unknown_job(self):
+        jobs = JobQueue(self.db, double)
+        jobs.start()
+        self.assertIsNone(jobs.get("missing"))
+        self.assertIsNone(jobs.wait("missing", timeout=1))
+
+    def test_unfinished_jobs_are_requeued(self):
+        # A job submitted to a queue whose process stopped before running it is picked up by the next queue
+        stopped = JobQueue(self.db, double, workers=1)
+        stopped._threads.append(None)  # pretend the workers are running so the job stays queued
+        stopped._ensure_table()
+        job_id = stopped.submit({"value": 21})
+        self.assertEqual(stopped.get(job_id)["status"], "queued")
+
+        restarted = JobQueue(self.db, double, workers=1)
+        restarted.start()
+        self.assertEqual(restarted.wait(job_id, timeout=10)["result"], {"value": 42})
+
+    def test_status_write_is_retried(self):
+        # execute_inject_query returns "fail" while the database is locked, the first two status updates hit that
+        execute = db_functions.execute_inject_query
+        failures = [2]
+
+        def locked(con, query, *args):
+            if query.startswith("UPDATE") and failures[0]:
+                failures[0] -= 1
+                return "fail"
+            return execute(con, query, *args)
+
+        jobs = JobQueue(self.db, double, workers=1)
+        with mock.patch.object(jobs_module, "RETRY_DELAY", 0.01), mock.patch.object(db_functions, "execute_inject_query", locked):
+            job = jobs.wait(jobs.submit({"value": 4}), timeout=10)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(failures, [0])
+
+        with mock.patch.object(jobs_module, "RETRY_DELAY", 0.01), mock.patch.object(db_functions, "execute_inject_query", return_value="fail"):
+            with self.assertRaises(sqlite3.DatabaseError):
+                jobs._set_status(job["job_id"], "UPDATE simulation_job SET status = 'running' WHERE job_id = ?")
+
+    def test_event_stream_times_out(self):
+        running = {"job_id": "stuck", "status": "running", "result": None, "error": None}
+        app_module.app.config["JOB_EVENTS_TIMEOUT"] = 0.5
+        try:
+            with mock.patch.object(app_module.job_queue, "get", return_value=running):
+                response = app_module.app.test_client().get("/jobs/stuck/events")
+                self.assertEqual(response.get_data(as_text=True), 'data: {"status": "running"}\n\n')
+        finally:
+            app_module.app.config["JOB_EVENTS_TIMEOUT"] = 60.0
+
+
+if __name__ == '__main__':
+    unittest.main()
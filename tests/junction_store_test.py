@@ -0,0 +1,178 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src import junction_store
+from src.dashboard import load_dashboard
+from src.db_functions import db_functions
+from src.validation import build_junction_info
+from tests.fixtures import SCENARIOS
+
+LANES = ["left_right_lane", "left_right_straight_lane", "left_lane_count", "right_lane_count", "straight_right_lane_count",
+         "straight_left_lane_count", "straight_lane_count", "priority", "buses_per_hour"]
+# The columns of the traffic_flow tables before the junction and arm tables
+LEGACY_FLOWS = {
+    "north": ["vehicles_per_hour_enter_north", "vehicles_per_hour_exit_south", "vehicles_per_hour_exit_west", "vehicles_per_hour_exit_east"],
+    "east": ["vehicles_per_hour_exit_north", "vehicles_per_hour_exit_south", "vehicles_per_hour_exit_west", "vehicles_per_hour_enter_east"],
+    "south": ["vehicles_per_hour_exit_north", "vehicles_per_hour_enter_south", "vehicles_per_hour_exit_west", "vehicles_per_hour_exit_east"],
+    "west": ["vehicles_per_hour_exit_north", "vehicles_per_hour_exit_south", "vehicles_per_hour_enter_west", "vehicles_per_hour_exit_east"],
+}
+
+
+def legacy_rows(junction_id, junction_info):
+    """The rows the app stored a junction as in the junction_config and traffic_flow_<arm> tables"""
+    config = [junction_id] + [junction_info[f"{arm}_{lane}"] for arm in LEGACY_FLOWS for lane in LANES]
+    config += [junction_info["pedestrian_crossing"], junction_info["crossing_requests_PH"], junction_info["crossing_requests_duration"]]
+    flows = {
+        "north": (junction_id, junction_info["northbound_vph"], junction_info["northbound_north_exit"], junction_info["northbound_east_exit"], junction_info["northbound_west_exit"]),
+        "east": (junction_id, junction_info["eastbound_vph"], junction_info["eastbound_north_exit"], junction_info["eastbound_east_exit"], junction_info["eastbound_south_exit"]),
+        "south": (junction_id, junction_info["southbound_vph"], junction_info["southbound_south_exit"], junction_info["southbound_east_exit"], junction_info["southbound_west_exit"]),
+        "west": (junction_id, junction_info["westbound_vph"], junction_info["westbound_west_exit"], junction_info["westbound_north_exit"], junction_info["westbound_south_exit"]),
+    }
+    return tuple(config), flows
+
+
+def lanes_to_series(lanes):
+    """The queue series of the lanes of one direction of an output"""
+    return {lane: lane_dict["queueSeries"] for lane, lane_dict in lanes.items()}
+
+
+class TestJunctionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'data.db')
+        self.junctions = {}
+        for name in ['light', 'cb_lane', 'pedestrian_heavy']:
+            junction_info = build_junction_info(SCENARIOS[name])
+            db_functions.metaphor(junction_info)
+            # The tables have integer affinity, so the form strings come back as integers
+            self.junctions[db_functions.get_pk(junction_info)] = {key: int(value) for key, value in junction_info.items()}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assertLoaded(self, con, junction_id, junction_info):
+        loaded = junction_store.load_junction_info(con, junction_id)
+        for key, value in loaded.items():
+            if not key.endswith("_bus_lane") and not key.endswith("_cycle_lane"):
+                self.assertEqual(value, junction_info[key], key)
+
+    def test_store_and_load(self):
+        self.assertFalse(junction_store.ensure_schema(self.db))
+        con = db_functions.get_conn(self.db)
+        for junction_id, junction_info in self.junctions.items():
+            self.assertTrue(junction_store.store_junction(con, junction_id, junction_info))
+            self.assertFalse(junction_store.store_junction(con, junction_id, junction_info))
+
+        for junction_id, junction_info in self.junctions.items():
+            self.assertLoaded(con, junction_id, junction_info)
+            # The compatibility views read what the old tables held
+            config, flows = legacy_rows(junction_id, junction_info)
+            self.assertEqual(con.execute("SELECT * FROM junction_config WHERE junction_id = ?", (junction_id,)).fetchall(), [config])
+            for arm, row in flows.items():
+                self.assertEqual(con.execute(f"SELECT * FROM traffic_flow_{arm} WHERE junction_id = ?", (junction_id,)).fetchall(), [row])
+
+        self.assertIsNone(junction_store.load_junction_info(con, "unknown"))
+        self.assertEqual(con.execute("SELECT direction, COUNT(*) FROM arm GROUP BY direction").fetchall(),
+                         [(arm, 3) for arm in sorted(LEGACY_FLOWS)])
+        db_functions.close_conn(con)
+
+    def test_store_and_load_queue_series(self):
+        junction_store.ensure_schema(self.db)
+        output = {direction: {0: {"queueSeries": {"interval": 20.0, "min": [0, 1], "max": [3, 4], "mean": [1.5, 2.25]}}} for direction in ["north", "east", "south", "west"]}
+        output["north"][1] = {"queueSeries": {"interval": 20.0, "min": [], "max": [], "mean": []}}
+        junction_id = next(iter(self.junctions))
+
+        con = db_functions.get_conn(self.db)
+        self.assertIsNone(junction_store.load_queue_series(con, junction_id))
+        self.assertTrue(junction_store.store_queue_series(con, junction_id, output))
+        self.assertEqual(junction_store.load_queue_series(con, junction_id), {direction: lanes_to_series(lanes) for direction, lanes in output.items()})
+        self.assertFalse(junction_store.store_queue_series(con, junction_id, {direction: {0: {}} for direction in output}))
+        db_functions.close_conn(con)
+
+    def test_legacy_queries_write_through_the_views(self):
+        junction_store.ensure_schema(self.db)
+        con = db_functions.get_conn(self.db)
+        junction_id, junction_info = next(iter(self.junctions.items()))
+        config, flows = legacy_rows(junction_id, junction_info)
+        self.assertNotEqual(db_functions.execute_inject_query(con, 'INSERT_junction_config.sql', False, False, *config), "fail")
+        for arm, row in flows.items():
+            self.assertNotEqual(db_functions.execute_inject_query(con, f'INSERT_traffic_flow_{arm}.sql', False, False, *row), "fail")
+        # Storing the traffic of an arm twice fails like the primary key of the old tables did
+        self.assertEqual(db_functions.execute_inject_query(con, 'INSERT_traffic_flow_south.sql', False, False, *flows["south"]), "fail")
+        self.assertLoaded(con, junction_id, junction_info)
+        db_functions.close_conn(con)
+
+    def test_rekey_old_keys(self):
+        junction_store.ensure_schema(self.db)
+        con = db_functions.get_conn(self.db)
+        (resubmitted_id, resubmitted), *others = self.junctions.items()
+        old_ids = {}
+        for junction_id, junction_info in self.junctions.items():
+            old_id = hashlib.sha256(junction_id.encode()).hexdigest()  # a 64 character key of the old get_pk
+            old_ids[junction_id] = old_id
+            junction_store.store_junction(con, old_id, junction_info)
+            con.execute("INSERT INTO efficiency_score_table (junction_id, efficiency_score) VALUES (?, 50)", (old_id,))
+        # One junction has already been stored again under its new key
+        junction_store.store_junction(con, resubmitted_id, resubmitted)
+        con.execute("INSERT INTO efficiency_score_table (junction_id, efficiency_score) VALUES (?, 60)", (resubmitted_id,))
+        con.execute("PRAGMA user_version = 0")
+        con.commit()
+        db_functions.close_conn(con)
+
+        # ensure_schema has already checked this database, so the junctions are re-keyed directly
+        self.assertEqual(junction_store.rekey_junctions(self.db), len(self.junctions))
+        self.assertEqual(junction_store.rekey_junctions(self.db), 0, "A re-keyed database should not be scanned again")
+        # The old scores of the resubmitted junction were deleted, and the dashboard no longer counts them
+        dashboard = load_dashboard(self.db)
+        self.assertEqual((dashboard['runs'], dashboard['mean_score']), (len(self.junctions), round((60 + 50 * len(others)) / len(self.junctions), 2)))
+        self.assertEqual(sorted(junction['junction_id'] for junction in dashboard['worst']), sorted(self.junctions))
+
+        con = db_functions.get_conn(self.db)
+        for table in ["junction", "arm", "efficiency_score_table", "worst_junctions"]:
+            ids = {row[0] for row in con.execute(f"SELECT junction_id FROM {table}")}
+            self.assertEqual(ids, set(self.junctions), table)
+        self.assertEqual(con.execute("SELECT efficiency_score FROM efficiency_score_table WHERE junction_id = ?", (resubmitted_id,)).fetchone(), (60,))
+        for junction_id, junction_info in self.junctions.items():
+            self.assertLoaded(con, junction_id, junction_info)
+            self.assertFalse(junction_store.store_junction(con, junction_id, junction_info), "A resubmitted junction should find its stored rows")
+        db_functions.close_conn(con)
+
+    def test_schema_is_ensured_once(self):
+        junction_store.ensure_schema(self.db)
+        with mock.patch.object(db_functions, "execute_sql_file_noinject") as execute:
+            self.assertFalse(junction_store.ensure_schema(self.db))
+            execute.assert_not_called()
+        # A database deleted and created again at the same path is checked again
+        os.remove(self.db)
+        junction_store.ensure_schema(self.db)
+        self.assertEqual(junction_store.schema_type(self.db, "junction"), "table")
+
+    def test_migrate_legacy_database(self):
+        con = db_functions.get_conn(self.db)
+        con.execute("CREATE TABLE junction_config (junction_id TEXT PRIMARY KEY, "
+                    + ", ".join(f"{arm}_{lane} INT DEFAULT 0" for arm in LEGACY_FLOWS for lane in LANES)
+                    + ", has_pedestrian_crossing INT DEFAULT 0, pedestrian_crossing_duration INT DEFAULT 0, crossing_requests_per_hour INT DEFAULT 0)")
+        for arm, columns in LEGACY_FLOWS.items():
+            con.execute(f"CREATE TABLE traffic_flow_{arm} (junction_id TEXT PRIMARY KEY, {', '.join(f'{column} INT NOT NULL' for column in columns)})")
+        for junction_id, junction_info in self.junctions.items():
+            config, flows = legacy_rows(junction_id, junction_info)
+            con.execute(f"INSERT INTO junction_config VALUES ({', '.join('?' * len(config))})", config)
+            for arm, row in flows.items():
+                con.execute(f"INSERT INTO traffic_flow_{arm} VALUES (?, ?, ?, ?, ?)", row)
+        con.commit()
+        before = {table: con.execute(f"SELECT * FROM {table} ORDER BY junction_id").fetchall() for table in ["junction_config"] + [f"traffic_flow_{arm}" for arm in LEGACY_FLOWS]}
+        db_functions.close_conn(con)
+
+        self.assertTrue(junction_store.is_legacy(self.db))
+        self.assertTrue(junction_store.ensure_schema(self.db))
+        self.assertFalse(junction_store.ensure_schema(self.db))
+
+        con = db_functions.get_conn(self.db)
+        for table, rows in before.items():
+            self.assertEqual(con.execute(f"SELECT * FROM {table} ORDER BY junction_id").fetchall(), rows, table)
+        for junction_id, junction_info in self.junctions.items():
+            self.assertLoaded(con, junction_id, junction_info)
+        db_functions.close_conn(con)
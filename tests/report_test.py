@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from src.app import app, job_queue
+from src.txt_creation import report_filename
+from tests.fixtures import SCENARIOS
+
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        job_queue._ensure_table()  # the running queue only created its table in the working directory of the first test
+        self.client = app.test_client()
+
+    def tearDown(self):
+        job_queue.drain()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_download_report(self):
+        response = self.client.post('/', data=SCENARIOS['pedestrian_heavy'])
+        job_id = response.headers['Location'].rsplit('/', 1)[-1]
+        self.assertEqual(job_queue.wait(job_id)['status'], 'done')
+
+        home = os.path.join(self.tmp.name, 'home')
+        os.makedirs(os.path.join(home, 'Downloads'))
+        old_home = os.environ.get('HOME')
+        os.environ['HOME'] = home
+        try:
+            response = self.client.post('/download_report', data={'how_far_back': '0'})
+        finally:
+            if old_home is not None:
+                os.environ['HOME'] = old_home
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        self.assertIn('_junction_information.txt', response.headers['Content-Disposition'])
+        report = response.get_data(as_text=True)
+        self.assertIn('Junction Information Pack', report)
+        self.assertIn('Pedestrian Crossing: Yes', report)
+        # The report is only sent to the client, nothing is saved on the server
+        self.assertEqual(os.listdir(os.path.join(home, 'Downloads')), [])
+
+    def test_render_report_file_name(self):
+        created = datetime(2024, 5, 6, 7, 8, 9)
+        self.assertEqual(report_filename(created), '2024_05_06_07_08_09_junction_information.txt')
+
+
+if __name__ == '__main__':
+    unittest.main()
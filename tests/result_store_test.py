@@ -0,0 +1,43 @@
+import threading
+import unittest
+
+from src.result_store import ResultStore
+
+
+class TestResultStore(unittest.TestCase):
+    def test_least_recently_used_result_is_dropped(self):
+        store = ResultStore(max_size=2)
+        store.put("a", 1)
+        store.put("b", 2)
+        self.assertEqual(store.get("a"), 1)  # a is now the most recently used
+        store.put("c", 3)
+
+        self.assertEqual(len(store), 2)
+        self.assertNotIn("b", store)
+        self.assertEqual(store.get("a"), 1)
+        self.assertEqual(store.get("c"), 3)
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(store.pop("c"), 3)
+        self.assertEqual(store.get("c", "missing"), "missing")
+
+    def test_concurrent_writers_stay_bounded(self):
+        store = ResultStore(max_size=50)
+
+        def write(thread):
+            for i in range(500):
+                key = f"{thread}-{i}"
+                store.put(key, {"thread": thread, "i": i})
+                result = store.get(key)
+                # Another writer may have evicted the key, but it can never hold another writer's result
+                self.assertIn(result, (None, {"thread": thread, "i": i}))
+
+        threads = [threading.Thread(target=write, args=(t,)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(store), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
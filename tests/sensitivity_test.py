@@ -0,0 +1,58 @@
+import copy
+import unittest
+
+from src import sensitivity
+from src.app import app
+from src.db_functions import db_functions
+from src.simulation import createSimulation
+from src.validation import build_junction_info
+from tests.fixtures import SCENARIOS, junction_spec
+
+
+class TestSensitivity(unittest.TestCase):
+    def setUp(self):
+        self.formatted = db_functions.metaphor(build_junction_info(SCENARIOS['many_lane']))
+
+    def test_reused_distributions_give_the_same_run(self):
+        distributions = {}
+        createSimulation(self.formatted, distributions=distributions)
+        self.assertEqual(len(distributions), 4)
+        for arm in sensitivity.ARMS:
+            perturbed = sensitivity.perturb(self.formatted, arm, "straight", 40)
+            self.assertEqual(createSimulation(perturbed, distributions=distributions), createSimulation(copy.deepcopy(perturbed)))
+        self.assertEqual(len(distributions), 8)
+
+    def test_curves(self):
+        result = sensitivity.analyse(self.formatted, [10, 50], workers=1)
+        self.assertEqual(result["base"], sensitivity.measure(createSimulation(copy.deepcopy(self.formatted))))
+        for arm in sensitivity.ARMS:
+            self.assertEqual(set(result["curves"][arm]), set(sensitivity.MOVEMENTS))
+            for movement, curve in result["curves"][arm].items():
+                self.assertEqual([point["increase"] for point in curve], [10, 50])
+                base_vph = self.formatted[5 + sensitivity.ARMS.index(arm)][sensitivity.MOVEMENTS.index(movement)]
+                self.assertEqual(curve[1]["vph"], round(base_vph * 1.5))
+                self.assertEqual(set(curve[1]["elasticity"]), set(sensitivity.METRICS))
+
+        # Unchanged metrics have an elasticity of 0, changes against a base of 0 have none
+        self.assertEqual(sensitivity.elasticity(5, 5, 110, 100), 0)
+        self.assertAlmostEqual(sensitivity.elasticity(6, 5, 110, 100), 2)
+        self.assertIsNone(sensitivity.elasticity(3, 0, 110, 100))
+
+    def test_shared_pool(self):
+        pool = sensitivity.shared_pool()
+        self.assertIs(sensitivity.shared_pool(), pool, "Every analysis should share one pool")
+        self.assertEqual(sensitivity.analyse(self.formatted, [10]), sensitivity.analyse(self.formatted, [10], workers=1))
+        self.assertIs(sensitivity.shared_pool(), pool)
+
+    def test_api(self):
+        client = app.test_client()
+        response = client.post('/api/v1/sensitivity?increases=20', json=junction_spec())
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["increases"], [20])
+        self.assertEqual(len(body["curves"]["north"]["straight"]), 1)
+
+        self.assertEqual(client.post('/api/v1/sensitivity?increases=x', json=junction_spec()).status_code, 400)
+        too_many = ",".join(["10"] * (sensitivity.MAX_INCREASES + 1))
+        self.assertEqual(client.post(f'/api/v1/sensitivity?increases={too_many}', json=junction_spec()).status_code, 400)
+        self.assertEqual(client.post('/api/v1/sensitivity', json={"arms": {}}).status_code, 400)
@@ -2,12 +2,19 @@ import unittest
 from queue import Queue
 import math
 import copy
+import os
+import tempfile
+from unittest import mock
 from src.junction import Junction
 from src.direction import Direction
 from src.lane import Lane, laneOrdering
-from src.simulation import createSimulation
-from src.vehicle import Vehicle
+from src.simulation import createSimulation, IncrementalSimulation, sameRanking, runSimulation, setLightTimes, setActuation, compilePhasePlan, NORMAL_RUN, OPPOSITE_LEFTS, GIVE_WAY
+from src.vehicle import Vehicle, VehicleQueue, VEHICLE_BYTES, VEHICLE_CLASSES, classPattern, parseClassMix
 from src.txt_creation import create_default_output
+from src.profiling import Profiler, MetricsRegistry
+from src.sketch import QuantileSketch
+from src.tracing import MAGIC, TraceRecorder, TraceReader
+from src.timeseries import QueueSeries
 
 
 class TestTrafficSimulation(unittest.TestCase):
@@ -28,6 +35,11 @@ class TestTrafficSimulation(unittest.TestCase):
             12: 50  # Pedestrian crossing requests per hour
         }
 
+    def assertCloseToFullRun(self, projected, simulated, name):
+        """Assert that the totals and maxima of a projected run are within a few percent of simulating the whole hour"""
+        for metric in ['avgWait', 'carsPassedThrough', 'maxQueue', 'maxWait']:
+            self.assertLessEqual(abs(projected[metric] - simulated[metric]), 0.05 * simulated[metric], f"The {name} junction's {metric} should be close to a full run")
+
     def test_lane_initialisation(self):
         """Test that Lane objects are created with correct initial values"""
         lane = Lane()
@@ -149,6 +161,281 @@ class TestTrafficSimulation(unittest.TestCase):
         self.assertEqual(vehicle.exitTime, exit_time)
         self.assertEqual(vehicle.totalWait, total_wait)
 
+    def test_vehicle_queue_arrays(self):
+        """Test that a queue keeps its vehicles in arrays and gives back exactly the entry times and classes that were put on it"""
+        queue = VehicleQueue()
+        headway = 3600 / 1441
+        times = []
+        time = 0.0
+        for i in range(3000):
+            time += headway
+            times.append((time, i % 4))
+            queue.putArrival(time, i % 4)
+        queue.put(Vehicle(10000.0, None, None, 2))
+        times.append((10000.0, 2))
+
+        self.assertIsInstance(queue, Queue)
+        self.assertEqual(queue.qsize(), 3001)
+        self.assertEqual(queue.memoryUsed(), 3001 * 9)
+        self.assertEqual(queue.frontClass(), 0)
+        vehicles = [queue.get() for _ in range(3001)]
+        self.assertEqual([(vehicle.entryTime, vehicle.vehicleClass) for vehicle in vehicles], times)
+        self.assertTrue(queue.empty())
+        self.assertLess(queue.memoryUsed(), 3001 * 9, "The arrays should be compacted as the vehicles leave")
+
+    def test_memory_budget(self):
+        """Test that a run whose queues outgrow the memory budget is stopped and reported as saturated"""
+        saturated_input = {1: ['S'], 2: ['S'], 3: ['S'], 4: ['S'], 5: [0, 1440, 0, 0], 6: [0, 1500, 0, 0], 7: [0, 720, 0, 0],
+                           8: [0, 1441, 0, 0], 9: False, 10: None, 11: False}
+
+        result = createSimulation(copy.deepcopy(saturated_input))
+        self.assertNotIn('saturation', result, "The arrays of the saturated queues should fit in the default budget")
+        self.assertGreater(result['maxQueue'], 500)
+
+        # The queues hold at most every vehicle of the hour, VEHICLE_BYTES each, far below the configured budget
+        arrivals = sum(sum(saturated_input[key]) for key in [5, 6, 7, 8])
+        bound = arrivals * VEHICLE_BYTES
+        self.assertLess(bound, Junction(copy.deepcopy(saturated_input)).memoryBudget / 1000)
+        result = createSimulation(copy.deepcopy(saturated_input), memoryBudget=bound)
+        self.assertNotIn('saturation', result, "A saturated hour should take no more than VEHICLE_BYTES a vehicle")
+
+        result = createSimulation(copy.deepcopy(saturated_input), memoryBudget=5000)
+        saturation = result['saturation']
+        self.assertLess(saturation['time'], 3600)
+        self.assertGreater(saturation['memoryUsed'], 5000)
+        self.assertEqual(saturation['memoryBudget'], 5000)
+        self.assertGreater(saturation['queuedVehicles'], 0)
+
+    def test_quantile_sketch(self):
+        """Test that the sketch estimates percentiles within its relative accuracy and that merged sketches equal one fed every wait"""
+        waits = [0.0] * 50 + [(i * 7919 % 1000) / 10 + 0.5 for i in range(2000)]
+        first, second, whole = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for i, wait in enumerate(waits):
+            (first if i % 2 else second).add(wait)
+            whole.add(wait)
+
+        ordered = sorted(waits)
+        for q in [0.5, 0.85, 0.95, 0.99]:
+            exact = ordered[int(q * (len(waits) - 1))]
+            self.assertAlmostEqual(whole.quantile(q), exact, delta=exact * whole.relativeAccuracy + 1e-9)
+        self.assertEqual(whole.quantile(0.01), 0.0, "The waits of vehicles that did not stop should count as no wait")
+
+        first.merge(second)
+        self.assertEqual(first.toDict(), whole.toDict())
+        self.assertEqual(QuantileSketch.fromDict(whole.toDict()).percentiles(), whole.percentiles())
+        self.assertEqual(QuantileSketch().percentiles(), {'p50': 0, 'p85': 0, 'p95': 0, 'p99': 0})
+        with self.assertRaises(ValueError):
+            whole.merge(QuantileSketch(relativeAccuracy=0.05))
+
+    def test_wait_percentiles(self):
+        """Test that every lane, direction and the junction report their wait percentiles"""
+        result = createSimulation(copy.deepcopy(self.sample_input | {11: False}))
+        self.assertEqual(QuantileSketch.fromDict(result['waitSketch']).count, result['carsPassedThrough'])
+        percentiles = result['waitPercentiles']
+        self.assertLessEqual(percentiles['p50'], percentiles['p85'])
+        self.assertLessEqual(percentiles['p95'], percentiles['p99'])
+        self.assertLessEqual(percentiles['p99'], result['maxWait'])
+        for direction in ['north', 'east', 'south', 'west']:
+            self.assertLessEqual(result[direction]['waitPercentiles']['p99'], result[direction]['maxWait'])
+            self.assertIn('waitPercentiles', result[direction][0])
+
+    def test_vehicle_trace(self):
+        """Test that a traced run records every vehicle once, and that the trace reads back through the memory map"""
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "run.trace")
+            with TraceRecorder(path, bufferRecords=100) as trace:
+                result = createSimulation(copy.deepcopy(self.sample_input | {11: False}), trace=trace)
+
+            with TraceReader(path) as reader:
+                self.assertEqual(len(reader), result['carsPassedThrough'])
+                self.assertEqual(reader.laneNames[:3], ['north 0 L', 'north 1 S', 'north 2 R'])
+                self.assertAlmostEqual(sum(exitTime - entryTime for _, entryTime, exitTime in reader), result['totalWait'])
+                self.assertEqual(reader[-1], list(reader)[-1])
+
+                exitTimes = reader.column('exitTime')
+                self.assertEqual(exitTimes[10], reader[10][2])
+                self.assertTrue(all(entryTime <= exitTime for entryTime, exitTime in zip(reader.column('entryTime'), exitTimes)))
+                exitTimes.release()
+
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(path, 'wb') as f:
+                f.write(data[:-5]) #a run stopped within its last record
+            with TraceReader(path) as reader:
+                self.assertEqual(len(reader), result['carsPassedThrough'] - 1)
+                self.assertEqual(len(list(reader)), len(reader))
+                exitTimes = reader.column('exitTime')
+                self.assertEqual(len(exitTimes), len(reader))
+                exitTimes.release()
+
+            for contents in [b'not a trace', MAGIC + b'\x01', data[:20], b'']:
+                with open(path, 'wb') as f:
+                    f.write(contents)
+                with self.assertRaises(ValueError):
+                    TraceReader(path)
+
+    def test_queue_series(self):
+        """Test that a queue series keeps at most its number of points, each holding the min, max and mean of its samples"""
+        series = QueueSeries(5, 10, 3600)
+        samples = [i % 7 for i in range(100)]
+        for sample in samples:
+            series.add(sample)
+        series.add(3, 5) #a run of equal samples
+        samples += [3] * 5
+
+        result = series.asDict()
+        self.assertEqual(series.span, 16)
+        self.assertEqual(result['interval'], 80)
+        self.assertEqual(len(result['min']), 7)
+        for point in range(7):
+            chunk = samples[16 * point:16 * (point + 1)]
+            self.assertEqual((result['min'][point], result['max'][point]), (min(chunk), max(chunk)))
+            self.assertAlmostEqual(result['mean'][point], sum(chunk) / len(chunk))
+
+        series = QueueSeries(5, 10, 30)
+        series.advance(12, 2)
+        series.advance(100, 4)
+        self.assertEqual(series.asDict()['max'], [2, 2, 2, 4, 4, 4], "Ticks before the change should see the old length, and none after the end")
+
+    def test_queue_series_output(self):
+        """Test that every lane reports its queue length over the hour"""
+        result = createSimulation(copy.deepcopy(self.sample_input | {11: False}))
+        for direction in ['north', 'east', 'south', 'west']:
+            lane = result[direction][0]
+            series = lane['queueSeries']
+            self.assertEqual(len(series['min']) * series['interval'], 3600)
+            self.assertLessEqual(max(series['max']), lane['maxQueue'])
+            self.assertTrue(all(low <= mean <= high for low, mean, high in zip(series['min'], series['mean'], series['max'])))
+
+    def test_phase_plan(self):
+        """Test that the phase plan lets the opposite left turn lanes run alongside the right-most lane only where it is safe"""
+        inputInformation = {1: ['L', 'S', 'R'], 2: ['L', 'CB', 'S'], 3: ['L', 'S', 'R'], 4: ['S', 'R', 'R'],
+                            5: [100, 200, 50, 0], 6: [100, 200, 0, 60], 7: [100, 200, 0, 0], 8: [100, 200, 50, 0], 9: False, 10: None, 11: False}
+        junction = Junction(inputInformation)
+        junction.distributeVehicles()
+        setLightTimes(junction, [1, 1, 1, 1])
+        plan = {direction.directionName: (CBLane, [mode for _, mode in laneSteps], oppositeLefts) for direction, CBLane, laneSteps, oppositeLefts, _, _, _ in compilePhasePlan(junction)}
+
+        self.assertEqual(plan['north'][1], [NORMAL_RUN, NORMAL_RUN, GIVE_WAY]) #the right turning traffic gives way to the south left lane
+        self.assertEqual(plan['south'][1], [NORMAL_RUN, NORMAL_RUN, OPPOSITE_LEFTS]) #no right turning traffic, so the north left lane runs freely
+        self.assertEqual(plan['west'][1], [NORMAL_RUN] * 3) #two right turning lanes cross the east left lane
+        self.assertEqual(plan['east'][1], [NORMAL_RUN] * 2) #west has no left turn lane
+        self.assertIs(plan['east'][0], junction.directions['east'].lanes['CB'][0])
+        self.assertEqual(plan['north'][2], tuple(junction.directions['south'].lanes['L']))
+
+    def test_queued_vehicle_counts(self):
+        """Test that every direction counts the vehicles left in its queues, including after an extrapolated run"""
+        oversaturated_input = {1: ['S'], 2: ['S'], 3: ['S'], 4: ['L', 'S'], 5: [0, 1440, 0, 0], 6: [0, 0, 0, 0], 7: [0, 720, 0, 0],
+                               8: [360, 1440, 0, 0], 9: False, 10: None, 11: False}
+        for extrapolate in [True, False]:
+            junction = Junction(copy.deepcopy(oversaturated_input))
+            junction.distributeVehicles()
+            setLightTimes(junction, junction.calculateDirectionPriority())
+            runSimulation(junction, extrapolate=extrapolate)
+            for direction in junction.directions.values():
+                queued = sum(lane.getQueueSize() for lanes in direction.lanes.values() for lane in lanes)
+                self.assertEqual(direction.queuedVehicles, queued)
+                self.assertEqual(direction.hasTraffic(), queued != 0)
+            self.assertFalse(junction.directions['east'].hasTraffic())
+
+    def test_gap_out_time(self):
+        """Test the time an actuated green light gaps out, against a lane stepped through vehicle by vehicle"""
+        lane = Lane()
+        lane.updateDirectionFlow(720, 1, 'rep') #a vehicle every 5 seconds
+        self.assertEqual(lane.gapOutTime(0.0, 1.0, 3.0), 3.0) #the first vehicle arrives after the passage time
+        self.assertEqual(lane.gapOutTime(0.0, 1.0, 6.0), math.inf) #every vehicle arrives within the passage time
+
+        lane.lastCarTime = 98.0 #the next vehicle arrives at 103
+        for _ in range(10):
+            lane.cars.putArrival(0.0)
+        #the queue clears at 112, after two more vehicles join it at 103 and 108, and the next vehicle crosses as it arrives at 113
+        self.assertEqual(lane.gapOutTime(100.0, 1.0, 3.0), 116.0)
+        self.assertEqual(lane.gapOutTime(100.0, 1.0, 0.5), 112.5)
+        lane.updateDirectionFlow(4000, 1, 'rep') #vehicles arrive faster than the queue discharges
+        self.assertEqual(lane.gapOutTime(100.0, 1.0, 3.0), math.inf)
+
+    def test_actuated_simulation(self):
+        """Test that actuated lights respect their min and max green and that a fixed time run of the same junction is projected"""
+        def build(inputInformation, actuation):
+            junction = Junction(copy.deepcopy(inputInformation))
+            junction.distributeVehicles()
+            setLightTimes(junction, junction.calculateDirectionPriority())
+            setActuation(junction, actuation)
+            return junction
+
+        actuation = {'north': {'minGreen': 5, 'maxGreen': 30, 'passageTime': 2}, 'south': {'maxGreen': 20}}
+        junction = build(self.sample_input | {11: False}, actuation)
+        self.assertTrue(junction.actuated)
+        self.assertEqual(junction.directions['north'].lightTime, 30)
+        self.assertEqual(junction.directions['south'].minGreen, junction.actuatedMinGreen)
+        self.assertEqual(junction.directions['east'].maxGreen, junction.actuatedMaxGreen)
+        result = runSimulation(junction)
+        self.assertGreater(result['north'][0]['carsPassedThrough'], 0)
+
+        steady_input = {1: ['S'], 2: ['R'], 3: ['LS'], 4: ['R'], 5: [240, 360, 240, 0], 6: [360, 144, 360, 0], 7: [360, 240, 360, 0],
+                        8: [72, 144, 720, 0], 9: False, 10: None, 11: False}
+        profiler = Profiler()
+        extrapolated = runSimulation(build(steady_input, {}), profiler)
+        self.assertGreater(profiler.counters.get('extrapolatedIterations', 0), 0)
+        self.assertCloseToFullRun(extrapolated, runSimulation(build(steady_input, {}), extrapolate=False), 'fixed time')
+
+        with self.assertRaises(ValueError):
+            build(self.sample_input | {11: False}, {'west': {'minGreen': 30, 'maxGreen': 20}})
+
+    def test_intergreen_and_start_up_lost_time(self):
+        """Test that the intergreen, start-up lost time and saturation headways reduce the capacity of the junction"""
+        oversaturated_input = {1: ['S'], 2: ['S'], 3: ['S'], 4: ['S'], 5: [0, 1440, 0, 0], 6: [0, 360, 0, 0], 7: [0, 720, 0, 0],
+                               8: [0, 1440, 0, 0], 9: False, 10: None, 11: False}
+        passed = []
+        for intergreenTime, startUpLostTime, saturationHeadways in [(0.0, 0.0, ()), (4.0, 2.0, (2.5, 2.0, 1.5))]:
+            junction = Junction(copy.deepcopy(oversaturated_input))
+            junction.distributeVehicles()
+            setLightTimes(junction, junction.calculateDirectionPriority())
+            junction.intergreenTime, junction.startUpLostTime, junction.saturationHeadways = intergreenTime, startUpLostTime, saturationHeadways
+            headways = compilePhasePlan(junction)[0][6][0] #the headways of a car
+            leaveTime = junction.vehicleLength / junction.trafficSpeed
+            expected = list(saturationHeadways + (leaveTime,) * 4)[:4]
+            expected[0] += startUpLostTime #the standing queue starts moving after the lost time
+            self.assertEqual(list(headways[:4]), expected)
+            self.assertGreaterEqual(len(headways), junction.directions['north'].lightTime / min(saturationHeadways + (leaveTime,)))
+
+            result = runSimulation(junction)
+            passed.append(sum(result[direction][0]['carsPassedThrough'] for direction in ['north', 'east', 'south', 'west']))
+        self.assertLess(passed[1], passed[0])
+
+    def test_vehicle_classes(self):
+        """Test that the classes of a mixed fleet are spread through a lane and that longer vehicles slow its queue"""
+        self.assertEqual(sorted(classPattern([0.9, 0, 0.1, 0])), [0] * 9 + [2])
+        self.assertEqual(classPattern([0.5, 0.25, 0, 0.25]), bytes([0, 1, 3, 0]))
+        self.assertEqual(classPattern([0, 0, 0, 0]), bytes([0]))
+        self.assertEqual(parseClassMix("car: 0.9, hgv: 0.1"), (0.9, 0.0, 0.1, 0.0))
+        with self.assertRaises(ValueError):
+            parseClassMix("car: 0.9, tram: 0.1")
+
+        busy_input = {1: ['L', 'S'], 2: ['S', 'CB'], 3: ['LS'], 4: ['S'], 5: [360, 720, 0, 0], 6: [0, 720, 0, 144], 7: [144, 720, 0, 0],
+                      8: [0, 720, 0, 0], 9: False, 10: None, 11: False}
+
+        def build(classMix):
+            junction = Junction(copy.deepcopy(busy_input))
+            junction.classMix |= classMix
+            junction.distributeVehicles()
+            setLightTimes(junction, junction.calculateDirectionPriority())
+            return junction
+
+        junction = build({})
+        self.assertEqual(junction.directions['east'].lanes['CB'][0].classPattern, bytes([VEHICLE_CLASSES.index('bus')]))
+        self.assertEqual(junction.directions['north'].lanes['S'][0].classPattern, bytes([0]))
+        cars = runSimulation(junction)
+
+        junction = build({'S': (0.5, 0.0, 0.5, 0.0)})
+        pattern = junction.directions['north'].lanes['S'][0].classPattern
+        self.assertEqual(pattern, bytes([0, 2]))
+        self.assertEqual(junction.directions['north'].lanes['S'][0].dischargeTime, sum(junction.classLeaveTimes[c] for c in pattern) / 2)
+        self.assertEqual(len(junction.directions['north'].lanes['L'][0].classPattern), 1, "The left turning vehicles should still be cars")
+        mixed = runSimulation(junction)
+        self.assertGreater(mixed['north'][1]['avgWait'], cars['north'][1]['avgWait'])
+        self.assertCloseToFullRun(mixed, runSimulation(build({'S': (0.5, 0.0, 0.5, 0.0)}), extrapolate=False), 'mixed')
+
     def test_distribute_vehicles_by_lane_simple(self):
         """Test vehicle distribution with a simple lane configuration"""
         flows = [100, 200, 50, 0]  # Left: 100, Straight: 200, Right: 50, Cycle/Bus: 0
@@ -435,4 +722,111 @@ class TestTrafficSimulation(unittest.TestCase):
         # Check wait times for each direction
         for direction_name in ['north', 'east', 'south', 'west']:
             direction_data = result[direction_name]
-            self.assertLess(direction_data['avgWait'], direction_data['maxWait'], f"Average wait in {direction_name} should be less than max wait")
\ No newline at end of file
+            self.assertLess(direction_data['avgWait'], direction_data['maxWait'], f"Average wait in {direction_name} should be less than max wait")
+
+    def test_profiled_simulation(self):
+        """Test that a profiled simulation reports the time of each phase and the counters"""
+        profiled_input = self.sample_input.copy()
+        profiled_input[11] = False  # Disable pedestrian crossing
+
+        profiler = Profiler()
+        result = createSimulation(profiled_input, profiler)
+
+        self.assertIn('profile', result, "A profiled run should attach its profile to the result")
+        for phase in ['distributeVehicles', 'calculateDirectionPriority', 'runSimulation', 'endSimulation']:
+            self.assertIn(phase, result['profile']['timings'], f"The {phase} phase should be timed")
+
+        counters = result['profile']['counters']
+        self.assertGreater(counters['mainLoopIterations'], 0)
+        self.assertLessEqual(counters['queuePuts'], counters['vehiclesCreated'])
+        self.assertLessEqual(counters['queueGets'], counters['queuePuts'])
+        if 'extrapolatedIterations' not in counters:
+            #every vehicle taken off a queue is counted where it leaves, so the rest are still queued
+            remaining = sum(result[direction][laneNum]['remainingVehicles'] for direction in ['north', 'east', 'south', 'west'] for laneNum in result[direction] if isinstance(laneNum, int))
+            self.assertEqual(counters['queuePuts'] - counters['queueGets'], remaining)
+
+        # An unprofiled run should produce the same simulation results without a profile
+        unprofiled = createSimulation(profiled_input)
+        self.assertNotIn('profile', unprofiled)
+        self.assertEqual(unprofiled['carsPassedThrough'], result['carsPassedThrough'])
+
+    def test_metrics_registry(self):
+        """Test that the metrics registry aggregates the profiles of several requests"""
+        registry = MetricsRegistry()
+        for seconds in [1.0, 3.0]:
+            profiler = Profiler()
+            profiler.addTime('runSimulation', seconds)
+            profiler.count('vehiclesCreated', 10)
+            registry.record(profiler)
+
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot['requests'], 2)
+        self.assertEqual(snapshot['timings']['runSimulation']['total'], 4.0)
+        self.assertEqual(snapshot['timings']['runSimulation']['mean'], 2.0)
+        self.assertEqual(snapshot['timings']['runSimulation']['max'], 3.0)
+        self.assertEqual(snapshot['counters']['vehiclesCreated'], 20)
+
+    def test_incremental_simulation(self):
+        """Test that changing one arm of an incremental simulation gives the same result as simulating the changed junction"""
+        base_input = self.sample_input.copy()
+        base_input[11] = False  # Disable pedestrian crossing
+
+        simulation = IncrementalSimulation(base_input)
+        base = simulation.run()
+        self.assertEqual(base, createSimulation(copy.deepcopy(base_input)))
+        self.assertEqual(len(simulation.distributions), 4)
+
+        for flows, lanes in [([100, 260, 50, 0], None), ([400, 200, 50, 0], None), (None, ['L', 'S', 'S', 'R'])]:
+            changed_input = copy.deepcopy(simulation.inputInformation)
+            if flows is not None:
+                changed_input[5] = flows
+            if lanes is not None:
+                changed_input[1] = lanes
+            result = simulation.changeArm('north', flows=flows, lanes=lanes)
+            self.assertEqual(result, createSimulation(changed_input), f"Changing north to {flows} {lanes} should match a full run")
+
+        # Only the north arm was distributed again, and going back to the base input is not simulated again
+        self.assertEqual(len(simulation.distributions), 7)
+        self.assertEqual(simulation.changeArm('north', flows=base_input[5], lanes=base_input[1]), base)
+        self.assertEqual(base_input, self.sample_input | {11: False}, "The base input should not be changed")
+
+        # Only the most recently used outputs are kept, and the base input was used last
+        simulation.changeArm('north', flows=[300, 100, 50, 0])
+        self.assertEqual(len(simulation.outputs), IncrementalSimulation.maxOutputs)
+        simulation.changeArm('north', flows=[100, 260, 50, 0], lanes=base_input[1])
+        self.assertEqual(len(simulation.outputs), IncrementalSimulation.maxOutputs)
+        with mock.patch('src.simulation.runSimulation') as run:
+            self.assertEqual(simulation.changeArm('north', flows=base_input[5]), base)
+            run.assert_not_called()
+
+    def test_same_ranking(self):
+        """Test that the priority is only reused when the directions rank the same way"""
+        self.assertTrue(sameRanking([100, 200, 200, 50], [150, 300, 300, 10]))
+        self.assertFalse(sameRanking([100, 200, 200, 50], [100, 200, 250, 50]))
+        self.assertFalse(sameRanking([100, 200, 300, 50], [100, 300, 300, 50]))
+
+    def test_steady_state_extrapolation(self):
+        """Test that projecting the steady trends of a junction comes close to simulating the whole hour"""
+        def build(inputInformation):
+            junction = Junction(copy.deepcopy(inputInformation))
+            junction.distributeVehicles()
+            junction.priorityNums = junction.calculateDirectionPriority()
+            setLightTimes(junction, junction.priorityNums)
+            return junction
+
+        steady_input = {1: ['S'], 2: ['R'], 3: ['LS'], 4: ['R'], 5: [240, 360, 240, 0], 6: [360, 144, 360, 0], 7: [360, 240, 360, 0],
+                        8: [72, 144, 720, 0], 9: False, 10: None, 11: False}
+        oversaturated_input = {1: ['S'], 2: ['S'], 3: ['S'], 4: ['S'], 5: [0, 1440, 0, 0], 6: [0, 360, 0, 0], 7: [0, 720, 0, 0],
+                               8: [0, 1440, 0, 0], 9: False, 10: None, 11: False}
+
+        # The sample junction's headways are not whole numbers of seconds, so its cycles never repeat exactly
+        for name, inputInformation in [('steady', steady_input), ('oversaturated', oversaturated_input), ('sample', self.sample_input | {11: False})]:
+            profiler = Profiler()
+            extrapolated = runSimulation(build(inputInformation), profiler)
+            self.assertGreater(profiler.counters.get('extrapolatedIterations', 0), 0, f"The {name} junction should settle")
+            self.assertCloseToFullRun(extrapolated, runSimulation(build(inputInformation), extrapolate=False), name)
+
+        # A direction that goes whole cycles without a vehicle is skipped in some of them, so its cycles never settle
+        profiler = Profiler()
+        runSimulation(build(self.sample_input | {8: [0, 0, 20, 0], 11: False}), profiler)
+        self.assertNotIn('extrapolatedIterations', profiler.counters)
@@ -0,0 +1,70 @@
+import random
+import unittest
+
+from src.validation import validate_form, validate_batch, int_column, spec_to_form, MAX_KEY_INT
+from tests.fixtures import SCENARIOS, junction_spec
+
+ARMS = ["north", "east", "south", "west"]
+LANE_FIELDS = ["cycle_lane", "bus_lane", "buses_per_hour", "left_right_lane", "left_right_straight_lane", "straight_left_lane", "straight_right_lane",
+               "left_lane_count", "right_lane_count", "straight_lane_count"]
+VALUES = ["", "x", "-3", "0", "1", "2", "true", "on", "-", None, "40", "7", "300", str(MAX_KEY_INT + 1)]
+
+
+class TestValidateBatch(unittest.TestCase):
+    def test_int_column(self):
+        self.assertEqual(int_column(["1", "2", "-3"]), ([1, 2, -3], None))
+        self.assertEqual(int_column(["1", "", "x", None]), ([1, 0, 0, 0], [None, "missing", "invalid", "missing"]))
+        self.assertEqual(int_column([]), ([], None))
+
+    def test_matches_validate_form(self):
+        """Random corruptions of the benchmark junctions get the same errors, in the same order, as from validate_form"""
+        rng = random.Random(7)
+        fields = sorted(set().union(*SCENARIOS.values()) | {f"{arm}_{field}" for arm in ARMS for field in LANE_FIELDS}
+                        | {"north_pedestrian_crossing", "crossing_requests_PH", "duration"})
+        forms = []
+        for _ in range(3000):
+            form = dict(rng.choice(list(SCENARIOS.values())))
+            for _ in range(rng.randint(0, 4)):
+                form[rng.choice(fields)] = rng.choice(VALUES)
+            # validate_form raises on a crossing without its fields
+            if form.get("north_pedestrian_crossing") == "true":
+                for field in ["crossing_requests_PH", "duration"]:
+                    if form.get(field) is None:
+                        form[field] = ""
+            forms.append(form)
+
+        batch = validate_batch(forms)
+        self.assertEqual(len(batch), len(forms))
+        self.assertTrue(any(batch) and not all(batch))
+        for form, errors in zip(forms, batch):
+            self.assertEqual(list(errors.items()), list(validate_form(form).items()), form)
+
+    def test_errors(self):
+        forms = [dict(SCENARIOS["light"]), dict(SCENARIOS["light"], northbound_vph="1", east_bus_lane="true", east_buses_per_hour="x"),
+                 dict(SCENARIOS["light"], north_pedestrian_crossing="true")]
+        errors = validate_batch(forms)
+        self.assertEqual(errors[0], {})
+        self.assertEqual(set(errors[1]), {"northbound_exits", "east_buses_per_hour"})
+        self.assertEqual(set(errors[2]), {"crossing_requests", "duration"})
+        self.assertEqual(validate_batch([]), [])
+
+    def test_key_bounds(self):
+        """Values too wide for the junction key are errors of both validators instead of failing when the junction is keyed"""
+        tooLarge = str(MAX_KEY_INT + 1)
+        forms = [dict(SCENARIOS["light"], north_pedestrian_crossing="true", crossing_requests_PH=tooLarge, duration="10"),
+                 dict(SCENARIOS["light"], east_bus_lane="true", east_buses_per_hour=tooLarge),
+                 dict(SCENARIOS["light"], north_priority="300"),
+                 dict(SCENARIOS["light"], west_left_lane_count="-1")]
+        expected = [{"crossing_requests"}, {"east_buses_per_hour"}, {"north_priority"}, {"west_total_lane_count"}]
+        for form, errors, keys in zip(forms, validate_batch(forms), expected):
+            self.assertEqual(set(errors), keys)
+            self.assertEqual(errors, validate_form(form))
+
+    def test_spec_key_bounds(self):
+        spec = junction_spec()
+        spec["arms"]["north"]["exits"]["east"] = MAX_KEY_INT + 1
+        spec["arms"]["east"]["lanes"]["left"] = 300
+        spec["pedestrian_crossing"] = {"requests_per_hour": MAX_KEY_INT + 1, "duration": 10}
+        _, errors = spec_to_form(spec)
+        self.assertEqual(set(errors), {"north.exits.east", "north.vph", "east.lanes.left", "pedestrian_crossing.requests_per_hour"})
+        self.assertEqual(errors["east.lanes.left"], "Must be at most 255.")